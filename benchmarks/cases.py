@@ -0,0 +1,335 @@
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np  # type: ignore
+
+import space4x.constants
+from space4x.hex_grid_core import HexGridCore
+from space4x.search_engine import SearchEngine
+from space4x.simulation import Simulation
+from space4x.star_data import generate_stars, mine_stars
+
+# A case prepares its data for a grid size and returns the function to
+# time, and the number of operations one call of it performs
+Case = Callable[[int, np.random.Generator], Tuple[Callable[[], None], int]]
+
+CASES: Dict[str, Case] = dict()
+
+# Number of lookups per call of the lookup and picking cases
+LOOKUPS = 10000
+# Ships of the simulation case
+SHIPS = 64
+# The random search cases draw enough pairs to search about this many
+# tiles per call, but at least MIN_PAIRS, so a call is long enough to
+# time reliably
+PAIR_TILES = 2000000
+MIN_PAIRS = 8
+
+
+def case(name: str) -> Callable[[Case], Case]:
+    """Registers a benchmark case.
+
+    Args:
+        name (str): name of the case
+
+    Returns:
+        Callable[[Case], Case]: decorator
+    """
+
+    def register(function: Case) -> Case:
+        CASES[name] = function
+        return function
+
+    return register
+
+
+def _star_grid(size: int, rng: np.random.Generator) -> HexGridCore:
+    """Creates a grid with stars as obstacles, like a new game.
+
+    Args:
+        size (int): width and height of the grid
+        rng (np.random.Generator): random generator
+
+    Returns:
+        HexGridCore: grid
+    """
+    core = HexGridCore(dim_x=size, dim_y=size)
+    tile_ids, _, _ = generate_stars(
+        rng=rng,
+        number_of_tiles=core.size,
+        number_of_stars=int(
+            space4x.constants.star_to_hex_ratio * core.size
+        ),
+        number_of_resource_types=len(
+            space4x.constants.star_resource_types
+        ),
+    )
+    core.set_stars(
+        tile_ids=tile_ids,
+        star_ids=np.arange(len(tile_ids), dtype=np.int32),
+    )
+    return core
+
+
+def _random_pairs(
+    core: HexGridCore, rng: np.random.Generator
+) -> List[Tuple[int, int]]:
+    """Draws connected pairs of passable tiles.
+
+    Fewer pairs are drawn on larger grids, each search takes longer,
+    see PAIR_TILES and MIN_PAIRS.
+
+    Args:
+        core (HexGridCore): grid
+        rng (np.random.Generator): random generator
+
+    Returns:
+        List[Tuple[int, int]]: start and end tile ids
+    """
+    number_of_pairs = max(MIN_PAIRS, PAIR_TILES // core.size)
+    passable = np.flatnonzero(core.passable)
+    pairs: List[Tuple[int, int]] = []
+    while len(pairs) < number_of_pairs:
+        start, end = rng.choice(passable, size=2).tolist()
+        if core.connected(start=start, end=end):
+            pairs.append((start, end))
+    return pairs
+
+
+def _worst_case_pair(size: int) -> Tuple[SearchEngine, int, int]:
+    """Creates a grid with a wall that misleads the searches.
+
+    The wall runs down the middle column and only has a gap at the top.
+    Start and end lie at the bottom on either side of it, so the
+    straight line is blocked and the path leads around the whole wall.
+
+    Args:
+        size (int): width and height of the grid
+
+    Returns:
+        Tuple[SearchEngine, int, int]: search engine, start and end
+    """
+    core = HexGridCore(dim_x=size, dim_y=size)
+    wall = core.tile_ids_from_offset(
+        x=np.full(size - 1, core.min_x + size // 2),
+        y=np.arange(core.min_y + 1, core.min_y + size),
+    )
+    core.set_stars(
+        tile_ids=wall, star_ids=np.arange(len(wall), dtype=np.int32)
+    )
+    bottom = core.min_y + size - 1
+    start = core.tile_id_from_offset(x=core.min_x, y=bottom)
+    end = core.tile_id_from_offset(x=core.min_x + size - 1, y=bottom)
+    return SearchEngine(core), start, end
+
+
+def _search_case(algorithm: str, worst_case: bool) -> Case:
+    """Creates a case that runs one search algorithm.
+
+    Args:
+        algorithm (str): name of the SearchEngine method
+        worst_case (bool): search around the wall instead of random pairs
+
+    Returns:
+        Case: benchmark case
+    """
+
+    def prepare(
+        size: int, rng: np.random.Generator
+    ) -> Tuple[Callable[[], None], int]:
+        if worst_case:
+            engine, start, end = _worst_case_pair(size)
+            pairs = [(start, end)]
+        else:
+            core = _star_grid(size, rng)
+            engine = SearchEngine(core)
+            pairs = _random_pairs(core, rng)
+        search = getattr(engine, algorithm)
+
+        def run() -> None:
+            for start, end in pairs:
+                search(start, end)
+
+        return run, len(pairs)
+
+    return prepare
+
+
+for _algorithm in (
+    "breadth_first_search",
+    "dijkstras_algorithm",
+    "a_star",
+):
+    case(f"{_algorithm}_random")(_search_case(_algorithm, False))
+    case(f"{_algorithm}_worst")(_search_case(_algorithm, True))
+
+
+@case("grid_construction")
+def grid_construction(
+    size: int, rng: np.random.Generator
+) -> Tuple[Callable[[], None], int]:
+    """Builds the grid columns (HexGrid construction)."""
+
+    def run() -> None:
+        HexGridCore(dim_x=size, dim_y=size)
+
+    return run, 1
+
+
+@case("tile_by_offset")
+def tile_by_offset(
+    size: int, rng: np.random.Generator
+) -> Tuple[Callable[[], None], int]:
+    """Looks tiles up by offset coordinate (get_Tile_by_xy)."""
+    core = HexGridCore(dim_x=size, dim_y=size)
+    tile_ids = rng.integers(core.size, size=LOOKUPS)
+    coordinates = list(
+        zip(
+            core.offset_x[tile_ids].tolist(),
+            core.offset_y[tile_ids].tolist(),
+        )
+    )
+
+    def run() -> None:
+        for x, y in coordinates:
+            core.tile_id_from_offset(x=x, y=y)
+
+    return run, LOOKUPS
+
+
+@case("tile_by_cube")
+def tile_by_cube(
+    size: int, rng: np.random.Generator
+) -> Tuple[Callable[[], None], int]:
+    """Looks tiles up by cube coordinate (get_Tile_by_xyz)."""
+    core = HexGridCore(dim_x=size, dim_y=size)
+    tile_ids = rng.integers(core.size, size=LOOKUPS)
+    coordinates = list(
+        zip(
+            core.cube_x[tile_ids].tolist(),
+            core.cube_y[tile_ids].tolist(),
+            core.cube_z[tile_ids].tolist(),
+        )
+    )
+
+    def run() -> None:
+        for x, y, z in coordinates:
+            core.tile_id_from_cube(x=x, y=y, z=z)
+
+    return run, LOOKUPS
+
+
+def _random_pixels(
+    core: HexGridCore, rng: np.random.Generator
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Draws pixel positions spread over the grid.
+
+    Args:
+        core (HexGridCore): grid
+        rng (np.random.Generator): random generator
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: x and y positions
+    """
+    return (
+        rng.uniform(core.center_x.min(), core.center_x.max(), LOOKUPS),
+        rng.uniform(core.center_y.min(), core.center_y.max(), LOOKUPS),
+    )
+
+
+@case("picking")
+def picking(
+    size: int, rng: np.random.Generator
+) -> Tuple[Callable[[], None], int]:
+    """Finds the tile under the cursor, one position at a time."""
+    core = HexGridCore(dim_x=size, dim_y=size)
+    x, y = _random_pixels(core, rng)
+    positions = list(zip(x.tolist(), y.tolist()))
+
+    def run() -> None:
+        for pixel_x, pixel_y in positions:
+            core.tile_id_at_pixel(x=pixel_x, y=pixel_y)
+
+    return run, LOOKUPS
+
+
+@case("picking_batch")
+def picking_batch(
+    size: int, rng: np.random.Generator
+) -> Tuple[Callable[[], None], int]:
+    """Finds the tiles under many positions at once."""
+    core = HexGridCore(dim_x=size, dim_y=size)
+    x, y = _random_pixels(core, rng)
+
+    def run() -> None:
+        core.tile_ids_at_pixels(x=x, y=y)
+
+    return run, LOOKUPS
+
+
+@case("star_generation")
+def star_generation(
+    size: int, rng: np.random.Generator
+) -> Tuple[Callable[[], None], int]:
+    """Generates the stars of a grid (StarField._create_stars)."""
+    number_of_tiles = size * size
+    number_of_stars = int(
+        space4x.constants.star_to_hex_ratio * number_of_tiles
+    )
+
+    def run() -> None:
+        generate_stars(
+            rng=np.random.default_rng(0),
+            number_of_tiles=number_of_tiles,
+            number_of_stars=number_of_stars,
+            number_of_resource_types=len(
+                space4x.constants.star_resource_types
+            ),
+        )
+
+    return run, 1
+
+
+@case("star_update")
+def star_update(
+    size: int, rng: np.random.Generator
+) -> Tuple[Callable[[], None], int]:
+    """Mines the stars of a grid for one frame (StarField.update)."""
+    number_of_tiles = size * size
+    _, _, resources = generate_stars(
+        rng=rng,
+        number_of_tiles=number_of_tiles,
+        number_of_stars=int(
+            space4x.constants.star_to_hex_ratio * number_of_tiles
+        ),
+        number_of_resource_types=len(
+            space4x.constants.star_resource_types
+        ),
+    )
+    timer = rng.uniform(0, 1, len(resources))
+
+    def run() -> None:
+        mine_stars(timer=timer, resources=resources, delta_time=1 / 60)
+
+    return run, 1
+
+
+@case("simulation_tick")
+def simulation_tick(
+    size: int, rng: np.random.Generator
+) -> Tuple[Callable[[], None], int]:
+    """Runs the headless tick loop, ships are sent on when they arrive."""
+    simulation = Simulation(dim_x=size, dim_y=size, seed=0)
+    for _ in range(SHIPS):
+        simulation.add_ship(simulation.random_passable_tile())
+    ticks = 60
+
+    def run() -> None:
+        for _ in range(ticks):
+            for ship in range(SHIPS):
+                if len(simulation.ship_paths[ship]) == 0:
+                    simulation.send_ship(
+                        ship=ship, goal=simulation.random_passable_tile()
+                    )
+            simulation.tick(1 / 60)
+
+    return run, ticks
@@ -0,0 +1,217 @@
+"""Replays recorded path queries against the search algorithms.
+
+    PYTHONPATH=src python -m benchmarks.replay space4x_paths.trace
+    PYTHONPATH=src python -m benchmarks.replay trace --grid space4x.sav
+
+Every query of the trace runs on every algorithm, on the grid version it
+ran on during the session. Exact algorithms must find paths as cheap as
+Dijkstra's algorithm, breadth first search must need no more moves, and
+every algorithm must find a path exactly when Dijkstra's algorithm does.
+Queries an algorithm ran during the session must still give paths of the
+recorded length. The times are reported relative to Dijkstra's algorithm;
+any mismatch fails the run. With --grid, all queries run on the saved
+grid instead and the recorded lengths are not checked.
+"""
+
+import argparse
+import sys
+import time
+from typing import Callable, Dict, List, Sequence, Tuple, Union
+
+import numpy as np  # type: ignore
+
+from space4x.hex_grid_core import HexGridCore
+from space4x.hierarchical import HierarchicalPathFinder
+from space4x.path_trace import load_trace
+from space4x.save_format import read_columns
+from space4x.search_engine import SearchEngine
+
+REFERENCE = "dijkstras_algorithm"
+# Algorithms that find the cheapest path
+EXACT = ("dijkstras_algorithm", "a_star", "bidirectional_search")
+ALGORITHMS = (
+    "breadth_first_search",
+    "dijkstras_algorithm",
+    "a_star",
+    "bidirectional_search",
+    "hierarchical_a_star",
+)
+
+Search = Callable[[int, int], List[int]]
+Engine = Union[SearchEngine, HierarchicalPathFinder]
+
+
+def searches(core: HexGridCore) -> Dict[str, Tuple[Search, Engine]]:
+    """Sets up every algorithm on a grid.
+
+    Args:
+        core (HexGridCore): grid
+
+    Returns:
+        Dict[str, Tuple[Search, Engine]]: search and the engine counting
+                                          its expansions per name
+    """
+    engine = SearchEngine(core)
+    hierarchical = HierarchicalPathFinder(engine=engine)
+    available: Dict[str, Tuple[Search, Engine]] = {
+        name: (getattr(engine, name), engine)
+        for name in ALGORITHMS
+        if name != "hierarchical_a_star"
+    }
+    available["hierarchical_a_star"] = (
+        hierarchical.find_path,
+        hierarchical,
+    )
+    return available
+
+
+def path_cost(core: HexGridCore, path: Sequence[int]) -> float:
+    """Sums the movement costs of a path.
+
+    Args:
+        core (HexGridCore): grid
+        path (Sequence[int]): tile ids
+
+    Returns:
+        float: cost of the tiles moved onto
+    """
+    return float(core.move_cost[list(path[1:])].sum())
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("trace", help="trace written during a session")
+    parser.add_argument(
+        "--grid",
+        help="save file to replay on, defaults to the grid of the trace",
+    )
+    parser.add_argument(
+        "--algorithms",
+        nargs="+",
+        default=ALGORITHMS,
+        choices=ALGORITHMS,
+        help="algorithms to replay",
+    )
+    args = parser.parse_args()
+
+    core, recorded_algorithms, queries, deltas = load_trace(args.trace)
+    check_lengths = True
+    if args.grid is not None:
+        meta, columns = read_columns(args.grid)
+        core = HexGridCore.from_columns(
+            dim_x=meta["dim_x"],
+            dim_y=meta["dim_y"],
+            star_id=columns["star_id"],
+            passable=columns["passable"],
+            move_cost=columns["move_cost"],
+            component_labels=columns["component_labels"],
+        )
+        # The recorded changes and lengths belong to another grid
+        deltas = []
+        check_lengths = False
+    pairs = list(zip(queries["start"].tolist(), queries["end"].tolist()))
+    print(
+        f"{len(pairs)} queries on {len(deltas) + 1} grid versions, "
+        f"grid {core.dim_x}x{core.dim_y}"
+    )
+
+    available = searches(core)
+    algorithms = [REFERENCE] + [
+        name for name in args.algorithms if name != REFERENCE
+    ]
+    paths: Dict[str, List[List[int]]] = {
+        name: [[] for _ in pairs] for name in algorithms
+    }
+    costs: Dict[str, List[float]] = {
+        name: [0.0] * len(pairs) for name in algorithms
+    }
+    seconds = {name: 0.0 for name in algorithms}
+    expansions = {name: 0 for name in algorithms}
+    # Queries run in the order of their grid versions, a query that
+    # started before the first observed version runs on that one
+    versions = queries["version"].tolist()
+    applied = 0
+    for index in np.argsort(queries["version"], kind="stable").tolist():
+        while (
+            applied < len(deltas)
+            and deltas[applied].version <= versions[index]
+        ):
+            core.apply_delta(deltas[applied])
+            applied += 1
+        start, end = pairs[index]
+        if not core.connected(start=start, end=end):
+            continue
+        for name in algorithms:
+            search, engine = available[name]
+            start_time = time.perf_counter()
+            path = search(start, end)
+            seconds[name] += time.perf_counter() - start_time
+            expansions[name] += engine.last_expansions
+            paths[name][index] = path
+            costs[name][index] = path_cost(core, path)
+
+    failures = []
+    reference = paths[REFERENCE]
+    reference_costs = costs[REFERENCE]
+    recorded_codes = queries["algorithm"].tolist()
+    recorded_lengths = queries["path_length"].tolist()
+    for name in algorithms:
+        cost_ratios = []
+        for index, path in enumerate(paths[name]):
+            expected = reference[index]
+            if (len(path) > 0) != (len(expected) > 0):
+                failures.append(f"{name}: query {index} reachability")
+                continue
+            if (
+                check_lengths
+                and recorded_algorithms[recorded_codes[index]] == name
+                and len(path) != recorded_lengths[index]
+            ):
+                failures.append(
+                    f"{name}: query {index} has {len(path)} tiles, "
+                    f"{recorded_lengths[index]} were recorded"
+                )
+            if len(path) == 0:
+                continue
+            cost = costs[name][index]
+            if reference_costs[index] > 0:
+                cost_ratios.append(cost / reference_costs[index])
+            if name in EXACT and not np.isclose(
+                cost, reference_costs[index]
+            ):
+                failures.append(
+                    f"{name}: query {index} costs {cost}, "
+                    f"{reference_costs[index]} expected"
+                )
+            if name == "breadth_first_search" and len(path) > len(
+                expected
+            ):
+                failures.append(
+                    f"{name}: query {index} needs more moves than "
+                    f"{REFERENCE}"
+                )
+        speedup = (
+            seconds[REFERENCE] / seconds[name]
+            if seconds[name] > 0
+            else float("inf")
+        )
+        print(
+            f"{name:<24} {seconds[name] * 1000:10.1f} ms "
+            f"{speedup:7.2f}x  "
+            f"{expansions[name] / max(len(pairs), 1):10.0f} tiles/query  "
+            f"cost {np.mean(cost_ratios) if cost_ratios else 1.0:.3f}x"
+        )
+
+    session = queries["latency"]
+    if len(session) > 0:
+        print(
+            f"session latency: p50 {np.percentile(session, 50) * 1000:.2f}"
+            f" ms, p99 {np.percentile(session, 99) * 1000:.2f} ms"
+        )
+    for failure in failures:
+        print(f"MISMATCH {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,252 @@
+"""Runs the benchmark suite and compares it against a baseline.
+
+    PYTHONPATH=src python -m benchmarks.run --sizes 100 500
+    PYTHONPATH=src python -m benchmarks.run --baseline benchmarks/baseline.json
+
+Every case is timed on every grid size with fixed seeds, in several
+rounds of repetitions. The median time per operation is reported. With a
+baseline, the run fails if a case got slower than the tolerance allows.
+Timings of another Python or numpy version are not comparable, so a
+baseline recorded with different versions is refused; record a new one
+with --update-baseline.
+"""
+
+import argparse
+import json
+import platform
+import sys
+import time
+from typing import Any, Dict, List, Sequence
+
+import numpy as np  # type: ignore
+
+from benchmarks.cases import CASES
+
+DEFAULT_SIZES = (100, 500, 1000, 2000)
+SEED = 42
+# Fast cases are called repeatedly until a repetition takes this long, so
+# the timer resolution and short hiccups do not dominate the result
+MIN_REPETITION_TIME = 0.2
+
+
+def measure(name: str, size: int, repeat: int) -> float:
+    """Times a case on a grid size.
+
+    The first call determines how often a repetition calls the case. It
+    counts as a repetition if it already took long enough.
+
+    Args:
+        name (str): name of the case
+        size (int): width and height of the grid
+        repeat (int): number of repetitions
+
+    Returns:
+        float: seconds per operation of the median repetition
+    """
+    run, operations = CASES[name](size, np.random.default_rng(SEED))
+    start_time = time.perf_counter()
+    run()
+    first_time = time.perf_counter() - start_time
+    loops = max(1, int(np.ceil(MIN_REPETITION_TIME / first_time)))
+    times = [first_time] if loops == 1 else []
+    while len(times) < repeat:
+        start_time = time.perf_counter()
+        for _ in range(loops):
+            run()
+        times.append(time.perf_counter() - start_time)
+    return float(np.median(times)) / (loops * operations)
+
+
+def environment() -> Dict[str, str]:
+    """Describes the machine the benchmarks run on.
+
+    Returns:
+        Dict[str, str]: Python and numpy version, platform and processor
+    """
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+    }
+
+
+def environment_differences(
+    machine: Dict[str, str], baseline: Dict[str, str]
+) -> List[str]:
+    """Finds the versions that differ from the ones of the baseline.
+
+    Only the Python minor version and the numpy version are compared, they
+    change the timings far more than the tolerance allows.
+
+    Args:
+        machine (Dict[str, str]): environment of this run
+        baseline (Dict[str, str]): environment of the baseline
+
+    Returns:
+        List[str]: description of every difference
+    """
+    differences = []
+    for key, version in (
+        ("python", ".".join(machine["python"].split(".")[:2])),
+        ("numpy", machine["numpy"]),
+    ):
+        baseline_version = baseline.get(key, "unknown")
+        if not baseline_version.startswith(version):
+            differences.append(
+                f"{key} {version}, the baseline used {baseline_version}"
+            )
+    return differences
+
+
+def run_suite(
+    names: Sequence[str], sizes: Sequence[int], repeat: int, rounds: int
+) -> Dict[str, Any]:
+    """Runs the cases on all grid sizes.
+
+    The whole suite is run several rounds and the median of the rounds is
+    reported, so a slow phase of the machine only affects one round of
+    every case instead of all repetitions of some cases.
+
+    Args:
+        names (Sequence[str]): names of the cases
+        sizes (Sequence[int]): widths and heights of the grids
+        repeat (int): number of repetitions per case, size and round
+        rounds (int): number of rounds
+
+    Returns:
+        Dict[str, Any]: machine, settings and seconds per operation of
+                        every "case[size]"
+    """
+    times: Dict[str, List[float]] = dict()
+    for round_number in range(1, rounds + 1):
+        for size in sizes:
+            for name in names:
+                key = f"{name}[{size}]"
+                seconds = measure(name=name, size=size, repeat=repeat)
+                times.setdefault(key, []).append(seconds)
+                print(
+                    f"{round_number}/{rounds} {key:<40} "
+                    f"{seconds * 1e6:14.2f} us",
+                    flush=True,
+                )
+    return {
+        "machine": environment(),
+        "seed": SEED,
+        "repeat": repeat,
+        "rounds": rounds,
+        "results": {
+            key: float(np.median(seconds))
+            for key, seconds in times.items()
+        },
+    }
+
+
+def compare(
+    results: Dict[str, float],
+    baseline: Dict[str, float],
+    tolerance: float,
+) -> List[str]:
+    """Finds the cases that got slower than the baseline.
+
+    Args:
+        results (Dict[str, float]): seconds per operation of this run
+        baseline (Dict[str, float]): seconds per operation of the baseline
+        tolerance (float): allowed slowdown, 0.5 allows 50% more time
+
+    Returns:
+        List[str]: description of every regression
+    """
+    regressions = []
+    for key, seconds in results.items():
+        if key not in baseline:
+            continue
+        ratio = seconds / baseline[key]
+        if ratio > 1 + tolerance:
+            regressions.append(
+                f"{key}: {seconds * 1e6:.2f} us, "
+                f"{ratio:.2f}x the baseline of {baseline[key] * 1e6:.2f} us"
+            )
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=DEFAULT_SIZES,
+        help="widths and heights of the grids",
+    )
+    parser.add_argument(
+        "--cases",
+        nargs="+",
+        default=sorted(CASES),
+        choices=sorted(CASES),
+        help="cases to run",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=3,
+        help="repetitions per case and round",
+    )
+    parser.add_argument(
+        "--rounds", type=int, default=3, help="rounds of the whole suite"
+    )
+    parser.add_argument("--output", help="file the results are written to")
+    parser.add_argument("--baseline", help="results to compare against")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=1.0,
+        help="allowed slowdown against the baseline, 1.0 allows 100%%",
+    )
+    parser.add_argument(
+        "--update-baseline",
+        action="store_true",
+        help="write the results to the baseline instead of comparing",
+    )
+    args = parser.parse_args()
+
+    baseline = None
+    if args.baseline is not None and not args.update_baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        differences = environment_differences(
+            machine=environment(), baseline=baseline["machine"]
+        )
+        if differences:
+            for difference in differences:
+                print(f"ENVIRONMENT {difference}")
+            print("The baseline is not comparable, record a new one.")
+            return 1
+
+    report = run_suite(
+        names=args.cases,
+        sizes=args.sizes,
+        repeat=args.repeat,
+        rounds=args.rounds,
+    )
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(report, output_file, indent=2, sort_keys=True)
+
+    if args.update_baseline and args.baseline is not None:
+        with open(args.baseline, "w") as baseline_file:
+            json.dump(report, baseline_file, indent=2, sort_keys=True)
+    if baseline is None:
+        return 0
+    regressions = compare(
+        results=report["results"],
+        baseline=baseline["results"],
+        tolerance=args.tolerance,
+    )
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -29,7 +29,12 @@ def format(session):
 def flake8(session):
     args = session.posargs or locations
     session.install("flake8", "flake8-import-order", "flake8-annotations")
-    session.run("flake8", "--ignore=ANN101,W503", *args)
+    session.run(
+        "flake8",
+        "--ignore=ANN101,W503",
+        "--application-import-names=space4x,benchmarks,tests",
+        *args,
+    )
 
 
 @nox.session(python=python_version)
@@ -44,3 +49,25 @@ def pylama(session):
     args = session.posargs or locations
     session.install("pylama")
     session.run("pylama", *args)
+
+
+@nox.session(python=python_version)
+def tests(session):
+    args = session.posargs or ["tests"]
+    session.install("pytest", "numpy==1.19.2")
+    session.run("pytest", *args, env={"PYTHONPATH": "src"})
+
+
+@nox.session(python=python_version)
+def benchmarks(session):
+    args = session.posargs or ["--baseline", "benchmarks/baseline.json"]
+    session.install("numpy==1.19.2")
+    session.run(
+        "python",
+        "-m",
+        "benchmarks.run",
+        "--output",
+        "benchmark_results.json",
+        *args,
+        env={"PYTHONPATH": "src"},
+    )
@@ -1,14 +1,60 @@
 # Integrated packages
-# TODO: Fill
-
-# Installed packages
-import arcade  # type: ignore
+import argparse
+import json
+from typing import List, Union
 
 # Own packages
-from space4x.app import Application
+import space4x.constants
+
+
+def main(argv: Union[None, List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog="space4x")
+    parser.add_argument(
+        "--headless",
+        action="store_true",
+        help="run the simulation without a window",
+    )
+    parser.add_argument(
+        "--world",
+        action="store_true",
+        help="fly the ships of a headless run through a streamed galaxy",
+    )
+    parser.add_argument(
+        "--ticks",
+        type=int,
+        default=600,
+        help="number of ticks of a headless run",
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=None,
+        help="seed of the random generator",
+    )
+    parser.add_argument(
+        "--ships",
+        type=int,
+        default=space4x.constants.headless_ships,
+        help="number of ships of a headless run",
+    )
+    args = parser.parse_args(argv)
+
+    if args.headless:
+        # Keeps arcade, and with it OpenGL, out of headless runs
+        from space4x.simulation import run_headless, run_world
+
+        run = run_world if args.world else run_headless
+        statistics = run(
+            ticks=args.ticks, seed=args.seed, ships=args.ships
+        )
+        print(json.dumps(statistics, indent=2))
+        return
+
+    # Installed packages
+    import arcade  # type: ignore
 
+    from space4x.app import Application
 
-def main() -> None:
     screen_width, screen_height = [
         int(0.8 * dim) for dim in arcade.get_display_size()
     ]
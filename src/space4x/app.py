@@ -1,4 +1,5 @@
 # Installed packages
+import random
 from typing import List, Tuple, Union
 
 import arcade  # type: ignore
@@ -9,9 +10,15 @@ from arcade.texture import Texture  # type: ignore
 
 import space4x.constants
 import space4x.resources
+from space4x.chunked_world import ChunkedWorld
 from space4x.hex_grid import HexGrid, HexTile
 from space4x.path_finder import PathFinder
+from space4x.path_pool import PathRequest
+from space4x.path_trace import PathTraceRecorder
 from space4x.popup_menu import PopupMenu
+from space4x.profiler import FrameProfiler
+from space4x.save_game import load_game, save_game
+from space4x.simulation import Simulation
 from space4x.spaceship import Spaceship
 from space4x.star_field import StarField
 
@@ -61,30 +68,116 @@ class Application(arcade.Window):
             space4x.resources.bg_img
         )
 
-        self.hex_grid: HexGrid = HexGrid()
-        self.star_field: StarField = StarField(self.hex_grid)
-        self.path_finder: PathFinder = PathFinder(self.hex_grid)
+        # Grid, stars and ships, the sprites below only show them. The
+        # stars are streamed around the camera and the spaceship.
+        self.simulation = Simulation(
+            dim_x=space4x.constants.world_grid_dim_x,
+            dim_y=space4x.constants.world_grid_dim_y,
+            world=ChunkedWorld(seed=random.randrange(2**31)),
+        )
+        self.hex_grid: HexGrid = HexGrid(core=self.simulation.core)
+        self.star_field: StarField = StarField(
+            self.hex_grid,
+            seed=self.simulation.seed,
+            columns=self.simulation.star_columns,
+        )
+        self.path_finder: PathFinder = PathFinder(
+            self.hex_grid, service=self.simulation.path_service
+        )
+        # Times sections of every frame, toggled with F3
+        self.profiler = FrameProfiler()
+        self.path_finder.profiler = self.profiler
+        # Records the path queries while it is set, toggled with F6
+        self.path_recorder: Union[None, PathTraceRecorder] = None
+        # Lines of the timing overlay, refreshed every few frames
+        self._profiler_lines: List[str] = []
+        self._profiler_frame = 0
         self.last_path: List[HexTile] = []
+        # Cursor position and spaceship hex of the last hover update
+        self._hover_key: Union[None, Tuple[float, float, int]] = None
+        # Spaceship hex, hovered hex and grid version of the latest path
+        # request
+        self._hover_path_key: Union[None, Tuple[int, int, int]] = None
+        # Path search running in the background for the hovered hex
+        self._hover_request: Union[None, PathRequest] = None
 
+        self.popup_menu: Union[None, PopupMenu] = None
+
+        ship = self.simulation.add_ship(
+            self.hex_grid.core.tile_id_from_offset(x=7, y=5)
+        )
+        # The stars around the spaceship, none is placed under it
+        self._stream(ship_tile_ids=self.simulation.ship_tiles)
         self.space_ship: Spaceship = Spaceship(
-            hex_grid=self.hex_grid,
-            x=7,
-            y=5,
+            hex_grid=self.hex_grid, simulation=self.simulation, ship=ship
         )
 
-        self.popup_menu: Union[None, PopupMenu] = None
-
     def setup(self) -> None:
         """Performs neccessary setup steps."""
         pass
 
+    def load(self, path: str) -> None:
+        """Replaces the running game with a saved one.
+
+        Args:
+            path (str): path of the save file
+        """
+        simulation, hex_grid, star_field, ships = load_game(path)
+        self.path_finder.close()
+        self.simulation = simulation
+        self.hex_grid = hex_grid
+        self.star_field = star_field
+        self.path_finder = PathFinder(
+            self.hex_grid, service=simulation.path_service
+        )
+        self.path_finder.profiler = self.profiler
+        if self.path_recorder is not None:
+            # The recorded queries ran on the replaced grid
+            self.path_recorder.clear()
+        self.path_finder.recorder = self.path_recorder
+        self.space_ship = ships[0]
+        self.last_path = []
+        self._hover_key = None
+        self._hover_path_key = None
+        self._hover_request = None
+
+    def _stream(self, ship_tile_ids: List[int]) -> None:
+        """Streams the stars around the camera and the spaceships.
+
+        The sprites of the stars and tiles that left the grid are dropped.
+
+        Args:
+            ship_tile_ids (List[int]): tiles of the spaceships
+        """
+        if self.simulation.world is None:
+            return
+        left, bottom = self.camera.scroll
+        camera_tile_id = self.hex_grid.core.tile_id_at_pixel(
+            x=left + self.screen_size[0] / 2,
+            y=bottom + self.screen_size[1] / 2,
+        )
+        streamed = self.simulation.stream([camera_tile_id] + ship_tile_ids)
+        if streamed is None:
+            return
+        self.star_field.replace_stars(
+            removed_star_ids=streamed.removed_star_ids,
+            added_tile_ids=streamed.added_tile_ids,
+        )
+        self.hex_grid.release_tiles(streamed.dropped_tile_ids)
+        if self.popup_menu and (
+            self.popup_menu.star.index in streamed.removed_star_ids
+        ):
+            self.popup_menu = None
+
     def on_draw(self) -> None:
         """Gets called everytime something can be drawn to the screen."""
         self.camera.use()
         self.clear()
+        left, bottom = self.camera.scroll
+        width, height = self.screen_size
 
         arcade.draw_lrwh_rectangle_textured(
-            *self.camera.scroll, *self.screen_size, self.background
+            left, bottom, width, height, self.background
         )
 
         # for hex_tile in self.hex_grid:
@@ -97,12 +190,61 @@ class Application(arcade.Window):
         #         f"({x}, {y}, {z})", x_pos, y_pos, color=arcade.color.WHITE
         #     )
 
-        self.hex_grid.draw()
-        self.star_field.draw()
-        self.space_ship.draw()
+        profiler = self.profiler
+        with profiler.section("draw.grid"):
+            self.hex_grid.create_tiles_in_rect(
+                left=left, bottom=bottom, width=width, height=height
+            )
+            self.hex_grid.draw(
+                left=left, bottom=bottom, width=width, height=height
+            )
+        with profiler.section("draw.stars"):
+            self.star_field.create_stars_in_rect(
+                left=left, bottom=bottom, width=width, height=height
+            )
+            self.star_field.draw(
+                left=left, bottom=bottom, width=width, height=height
+            )
+        with profiler.section("draw.ship"):
+            self.space_ship.draw()
         if self.popup_menu:
-            self.popup_menu.draw()
+            with profiler.section("draw.popup"):
+                self.popup_menu.draw()
         self.cursor.draw()
+        if profiler.enabled:
+            self._draw_profiler_overlay()
+
+    def _draw_profiler_overlay(self) -> None:
+        """Draws the median and 99th percentile of every timed section.
+
+        The text only changes every few frames, so the overlay itself
+        does not distort the timings much.
+        """
+        if (
+            self._profiler_frame
+            % space4x.constants.profiler_overlay_interval
+            == 0
+        ):
+            self._profiler_lines = [
+                f"{name:<32} p50 {p50 * 1000:7.2f} ms  "
+                f"p99 {p99 * 1000:7.2f} ms"
+                + (f"  {count:9.0f} tiles" if count > 0 else "")
+                for name, p50, p99, count in self.profiler.summary()
+            ]
+        self._profiler_frame += 1
+        left, top = (
+            self.camera.scroll[0] + 10,
+            self.camera.scroll[1] + self.screen_size[1] - 30,
+        )
+        for index, line in enumerate(self._profiler_lines):
+            arcade.draw_text(
+                text=line,
+                start_x=left,
+                start_y=top - 20 * index,
+                color=arcade.color.WHITE,
+                font_size=12,
+                font_name="Courier New",
+            )
 
     def on_update(self, delta_time: float) -> None:
         """Gets called every delta_time seconds."""
@@ -112,41 +254,139 @@ class Application(arcade.Window):
         if self.popup_menu:
             self.popup_menu.update()
 
-        if self.space_ship.path == []:
-            if (
-                len(
-                    collisions := arcade.check_for_collision_with_list(
-                        self.cursor, self.hex_grid
-                    )
+        profiler = self.profiler
+        with profiler.section("update.stream"):
+            self._stream(ship_tile_ids=self.simulation.ship_tiles)
+        with profiler.section("update.hover_path"):
+            if self.space_ship.path == []:
+                self._update_hover_path()
+            self._apply_hover_path()
+        with profiler.section("update.simulation"):
+            self.simulation.tick(delta_time=delta_time)
+        with profiler.section("update.ship"):
+            self.space_ship.update(delta_time=delta_time)
+
+    def _update_hover_path(self, wait: bool = False) -> None:
+        """Requests the path from the spaceship to the hovered hex.
+
+        Nothing is done, as long as neither the cursor nor the spaceship
+        moved. The path is only searched again, if the hovered hex or the
+        hex of the spaceship changed. The search runs in the background,
+        a request for a previously hovered hex is cancelled.
+
+        Args:
+            wait (bool, optional): Search in this process and highlight
+                the path right away, also if a background search is still
+                running. Defaults to False.
+        """
+        if wait and self._hover_request is not None:
+            # Search the path of the running request again right here
+            self._hover_request.cancel()
+            self._hover_request = None
+            self._hover_key = None
+            self._hover_path_key = None
+        ship_tile_id = self.hex_grid.core.tile_id_from_offset(
+            x=self.space_ship.offset_coordinate.x,
+            y=self.space_ship.offset_coordinate.y,
+        )
+        hover_key = (
+            self.cursor.center_x,
+            self.cursor.center_y,
+            ship_tile_id,
+        )
+        if hover_key == self._hover_key:
+            return
+        self._hover_key = hover_key
+
+        hovered_tile = self.hex_grid.tile_at_pixel(
+            x=self.cursor.center_x, y=self.cursor.center_y
+        )
+        if hovered_tile is None:
+            return
+        if hovered_tile.has_star():
+            return
+        path_key = (
+            ship_tile_id,
+            hovered_tile.tile_id,
+            self.hex_grid.core.version,
+        )
+        if path_key == self._hover_path_key:
+            return
+        self._hover_path_key = path_key
+
+        # TODO: seperate path validation into its own function or class
+        # Also for for considering range
+
+        if self._hover_request is not None:
+            self._hover_request.cancel()
+            self._hover_request = None
+        if wait:
+            self._highlight_path(
+                self.path_finder.a_star(
+                    start_hex=self.hex_grid.get_Tile_by_id(ship_tile_id),
+                    end_hex=hovered_tile,
                 )
-                == 0
-            ):
-                return
-            if collisions[0].has_star():  # type: ignore
-                return
-
-            # TODO: seperate path validation into its own function or class
-            # Also for for considering range
-
-            # Unmark old path
-            for hex_tile in self.last_path:
-                hex_tile.set_texture(0)
-            # Get new path
-            start_hex = self.hex_grid.get_Tile_by_xy(
-                x=self.space_ship.offset_coordinate.x,
-                y=self.space_ship.offset_coordinate.y,
             )
-            path = self.path_finder.a_star(
-                start_hex=start_hex,  # type: ignore
-                end_hex=collisions[0],  # type: ignore
+            return
+        self._hover_request = self.path_finder.submit(
+            algorithm="a_star",
+            start_hex=self.hex_grid.get_Tile_by_id(ship_tile_id),
+            end_hex=hovered_tile,
+        )
+
+    def _apply_hover_path(self) -> None:
+        """Highlights the path of the hover request, once it finished.
+
+        Results that are out of date are dropped and searched again on
+        the next update. If the search failed, the path is searched right
+        here instead.
+        """
+        if self._hover_request is None or not self._hover_request.done():
+            return
+        request = self._hover_request
+        self._hover_request = None
+        path = self.path_finder.collect(request)
+        if path is not None:
+            self._highlight_path(path)
+            return
+        if request.future.cancelled():
+            return
+        self._hover_key = None
+        self._hover_path_key = None
+        if request.version == self.hex_grid.core.version:
+            self._update_hover_path(wait=True)
+
+    def _highlight_path(self, path: List[HexTile]) -> None:
+        """Replaces the highlighted path.
+
+        Only the tiles that enter or leave the path are marked or unmarked.
+
+        Args:
+            path (List[HexTile]): new path to the hovered hex
+        """
+        old_tiles = set(self.last_path)
+        new_tiles = set(path)
+        # Unmark tiles leaving the path
+        for hex_tile in old_tiles - new_tiles:
+            hex_tile.set_highlighted(False)
+        # Mark tiles entering the path
+        for hex_tile in new_tiles - old_tiles:
+            hex_tile.set_highlighted(True)
+        self.last_path = path
+
+    def _save_path_trace(self) -> None:
+        """Writes the recorded path queries, if any are recorded."""
+        if self.path_recorder is not None:
+            self.path_recorder.save(
+                path=space4x.constants.path_trace_path,
+                core=self.hex_grid.core,
             )
-            # Mark new path
-            for hex_tile in path:
-                hex_tile.set_texture(1)  # type: ignore
-            self.last_path = path
 
-        self.space_ship.update(delta_time=delta_time)
-        self.star_field.update(delta_time=delta_time)
+    def on_close(self) -> None:
+        """Gets called when the window is closed."""
+        self._save_path_trace()
+        self.path_finder.close()
+        super().on_close()
 
     def on_mouse_motion(
         self, x: float, y: float, dx: float, dy: float
@@ -163,22 +403,28 @@ class Application(arcade.Window):
             if self.popup_menu:
                 if self.popup_menu.process_mouse_click():
                     return
+            if self.space_ship.path == []:
+                # The path to the hex under the cursor, even if its search
+                # has not finished yet
+                self._update_hover_path(wait=True)
             self.hex_grid.get_Tile_by_xy(  # type: ignore
                 self.space_ship.offset_coordinate.x,
                 self.space_ship.offset_coordinate.y,
-            ).set_texture(0)
+            ).set_highlighted(False)
+            if self._hover_request is not None:
+                self._hover_request.cancel()
+                self._hover_request = None
             self.space_ship.set_path(self.last_path)
+            # The spaceship unmarks the tiles of the path while following it
+            self.last_path = []
+            self._hover_path_key = None
         if button == arcade.MOUSE_BUTTON_RIGHT:
             if (
-                len(
-                    collisions := arcade.check_for_collision_with_list(
-                        self.cursor, self.hex_grid
-                    )
+                clicked_tile := self.hex_grid.tile_at_pixel(
+                    x=self.cursor.center_x, y=self.cursor.center_y
                 )
-                == 1
-            ):
-                if collisions[0].has_star():  # type: ignore
-                    star = collisions[0].get_star()  # type: ignore
+            ) is not None:
+                if (star := clicked_tile.get_star()) is not None:
                     self.popup_menu = PopupMenu(
                         cursor=self.cursor, camera=self.camera, star=star
                     )
@@ -260,7 +506,37 @@ class Application(arcade.Window):
                 self.scroll_direction[1],
             )
 
+        if key == arcade.key.F5:
+            save_game(
+                path=space4x.constants.save_game_path,
+                simulation=self.simulation,
+                ships=[self.space_ship],
+            )
+
+        if key == arcade.key.F9:
+            self.load(space4x.constants.save_game_path)
+
+        if key == arcade.key.F3:
+            self.profiler.enabled = not self.profiler.enabled
+            if self.profiler.enabled:
+                self.profiler.clear()
+                self._profiler_lines = []
+                self._profiler_frame = 0
+
+        if key == arcade.key.F4:
+            self.profiler.dump(space4x.constants.profiler_trace_path)
+
+        if key == arcade.key.F6:
+            if self.path_recorder is None:
+                self.path_recorder = PathTraceRecorder()
+            else:
+                self._save_path_trace()
+                self.path_recorder = None
+            self.path_finder.recorder = self.path_recorder
+
         if key == arcade.key.ESCAPE:
+            self._save_path_trace()
+            self.path_finder.close()
             arcade.close_window()
 
     def on_key_release(self, key: int, _modifiers: int) -> None:
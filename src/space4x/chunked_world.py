@@ -0,0 +1,416 @@
+import os
+from collections import OrderedDict
+from typing import Iterator, List, Sequence, Tuple, Union
+
+import numpy as np  # type: ignore
+
+import space4x.constants
+from space4x.star_data import generate_stars, mine_stars
+
+ChunkKey = Tuple[int, int]
+
+
+class Chunk:
+    """A square block of hexes and the stars on them.
+
+    Tiles are addressed by a local id, column * size + row, relative to
+    the first offset coordinate of the chunk.
+    """
+
+    def __init__(
+        self,
+        chunk_x: int,
+        chunk_y: int,
+        size: int,
+        star_tiles: np.ndarray,
+        names: np.ndarray,
+        resources: np.ndarray,
+        timer: np.ndarray,
+    ) -> None:
+        """Wraps the columns of a chunk.
+
+        Args:
+            chunk_x (int): chunk coordinate x
+            chunk_y (int): chunk coordinate y
+            size (int): width and height of the chunk in hexes
+            star_tiles (np.ndarray): local tile id of every star
+            names (np.ndarray): name of every star
+            resources (np.ndarray): resource amounts, one row per star
+            timer (np.ndarray): time since each star was last mined
+        """
+        self.chunk_x = chunk_x
+        self.chunk_y = chunk_y
+        self.size = size
+        self.star_tiles = star_tiles
+        self.names = names
+        self.resources = resources
+        self.timer = timer
+        # Star id per local tile, -1 for tiles without a star
+        self.star_id = np.full(size * size, -1, dtype=np.int32)
+        self.star_id[star_tiles] = np.arange(
+            len(star_tiles), dtype=np.int32
+        )
+        # Set, once the resources differ from the generated ones. The
+        # timers alone do not count, a chunk generated again starts with
+        # fresh timers.
+        self.dirty = False
+
+    @property
+    def origin(self) -> Tuple[int, int]:
+        """Offset coordinate of the first tile of the chunk.
+
+        Returns:
+            Tuple[int, int]: x and y
+        """
+        return self.chunk_x * self.size, self.chunk_y * self.size
+
+    def star_offsets(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Returns the offset coordinates of the stars of the chunk.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: x and y per star
+        """
+        origin_x, origin_y = self.origin
+        return (
+            self.star_tiles // self.size + origin_x,
+            self.star_tiles % self.size + origin_y,
+        )
+
+    @property
+    def nbytes(self) -> int:
+        """Memory consumed by the columns in bytes.
+
+        Returns:
+            int: Number of bytes
+        """
+        return sum(
+            column.nbytes
+            for column in (
+                self.star_tiles,
+                self.names,
+                self.resources,
+                self.timer,
+                self.star_id,
+            )
+        )
+
+
+class ChunkedWorld:
+    """An unbounded galaxy, generated chunk by chunk when it is needed.
+
+    Every chunk is generated from the world seed and its chunk coordinate
+    alone, so it looks the same whenever and in whatever order it is
+    generated. The chunks near the streamed positions, the camera and the
+    ships, are kept in memory. Chunks that fall behind are evicted, and
+    never more than max_chunks are kept: the chunks farthest from every
+    position go first. If a spill directory is given, changed chunks are
+    written there on eviction and read back instead of being generated
+    again, otherwise their changes are lost.
+    """
+
+    def __init__(
+        self,
+        seed: int,
+        chunk_size: int = space4x.constants.world_chunk_size,
+        max_chunks: int = space4x.constants.world_max_chunks,
+        spill_dir: Union[None, str] = None,
+    ) -> None:
+        """Creates an empty world.
+
+        Args:
+            seed (int): world seed
+            chunk_size (int, optional): Width and height of a chunk in
+                hexes. Defaults to constants.world_chunk_size.
+            max_chunks (int, optional): Number of chunks kept in memory.
+                Defaults to constants.world_max_chunks.
+            spill_dir (Union[None, str], optional): Directory for evicted
+                chunks. Defaults to None, which drops them.
+        """
+        self.seed = seed
+        self.chunk_size = chunk_size
+        self.max_chunks = max_chunks
+        self.spill_dir = spill_dir
+        if spill_dir is not None:
+            os.makedirs(spill_dir, exist_ok=True)
+        self.stars_per_chunk = int(
+            space4x.constants.star_to_hex_ratio * chunk_size * chunk_size
+        )
+        # Least recently used first, which breaks ties on eviction
+        self._chunks: OrderedDict[ChunkKey, Chunk] = OrderedDict()
+        # Offset coordinates the chunks are kept around
+        self._positions: List[Tuple[int, int]] = []
+
+        self.chunks_generated = 0
+        self.chunks_spilled = 0
+
+    def __len__(self) -> int:
+        """Returns the number of chunks in memory.
+
+        Returns:
+            int: Number of chunks
+        """
+        return len(self._chunks)
+
+    def __iter__(self) -> Iterator[Chunk]:
+        """Return an iterable object of the chunks in memory."""
+        return iter(self._chunks.values())
+
+    def chunk_of(self, x: int, y: int) -> ChunkKey:
+        """Returns the coordinate of the chunk containing a hex.
+
+        Args:
+            x (int): x-Position (offset)
+            y (int): y-Position (offset)
+
+        Returns:
+            ChunkKey: chunk coordinate x and y
+        """
+        return x // self.chunk_size, y // self.chunk_size
+
+    def _spill_path(self, key: ChunkKey) -> str:
+        """Returns the file an evicted chunk is written to.
+
+        Args:
+            key (ChunkKey): chunk coordinate
+
+        Returns:
+            str: path of the file
+        """
+        return os.path.join(
+            self.spill_dir, f"chunk_{key[0]}_{key[1]}.npz"  # type: ignore
+        )
+
+    def _generate(self, key: ChunkKey) -> Chunk:
+        """Generates a chunk from the world seed and its coordinate.
+
+        Args:
+            key (ChunkKey): chunk coordinate
+
+        Returns:
+            Chunk: new chunk
+        """
+        # Negative coordinates are mapped onto unsigned 32 bit entropy
+        rng = np.random.default_rng(
+            np.random.SeedSequence(
+                [self.seed, key[0] & 0xFFFFFFFF, key[1] & 0xFFFFFFFF]
+            )
+        )
+        star_tiles, names, resources = generate_stars(
+            rng=rng,
+            number_of_tiles=self.chunk_size * self.chunk_size,
+            number_of_stars=self.stars_per_chunk,
+            number_of_resource_types=len(
+                space4x.constants.star_resource_types
+            ),
+        )
+        self.chunks_generated += 1
+        return Chunk(
+            chunk_x=key[0],
+            chunk_y=key[1],
+            size=self.chunk_size,
+            star_tiles=star_tiles,
+            names=names,
+            resources=resources,
+            timer=np.zeros(len(star_tiles), dtype=np.float64),
+        )
+
+    def _load(self, key: ChunkKey) -> Chunk:
+        """Reads a spilled chunk back or generates it.
+
+        Args:
+            key (ChunkKey): chunk coordinate
+
+        Returns:
+            Chunk: chunk
+        """
+        if self.spill_dir is not None:
+            path = self._spill_path(key)
+            if os.path.exists(path):
+                with np.load(path) as columns:
+                    chunk = Chunk(
+                        chunk_x=key[0],
+                        chunk_y=key[1],
+                        size=self.chunk_size,
+                        star_tiles=columns["star_tiles"],
+                        names=columns["names"],
+                        resources=columns["resources"],
+                        timer=columns["timer"],
+                    )
+                chunk.dirty = True
+                return chunk
+        return self._generate(key)
+
+    def distance(self, key: ChunkKey) -> int:
+        """Returns the distance of a chunk to the closest streamed position.
+
+        Args:
+            key (ChunkKey): chunk coordinate
+
+        Returns:
+            int: Number of rows or columns between the position and the
+                 closest hex of the chunk, 0 if nothing is streamed
+        """
+        first_x = key[0] * self.chunk_size
+        first_y = key[1] * self.chunk_size
+        last_x = first_x + self.chunk_size - 1
+        last_y = first_y + self.chunk_size - 1
+        return min(
+            (
+                max(first_x - x, x - last_x, first_y - y, y - last_y, 0)
+                for x, y in self._positions
+            ),
+            default=0,
+        )
+
+    def _drop(self, key: ChunkKey) -> None:
+        """Evicts a chunk, writing it to the spill directory if it changed.
+
+        Args:
+            key (ChunkKey): chunk coordinate
+        """
+        chunk = self._chunks.pop(key)
+        if self.spill_dir is not None and chunk.dirty:
+            np.savez(
+                self._spill_path(key),
+                star_tiles=chunk.star_tiles,
+                names=chunk.names,
+                resources=chunk.resources,
+                timer=chunk.timer,
+            )
+            self.chunks_spilled += 1
+
+    def _evict(self, keep: ChunkKey) -> None:
+        """Drops the chunks farthest from the positions beyond the limit.
+
+        Args:
+            keep (ChunkKey): chunk coordinate of the chunk just loaded,
+                             which is never dropped
+        """
+        while len(self._chunks) > self.max_chunks:
+            self._drop(
+                max(
+                    (key for key in self._chunks if key != keep),
+                    key=self.distance,
+                )
+            )
+
+    def get_chunk(self, chunk_x: int, chunk_y: int) -> Chunk:
+        """Returns a chunk, loading or generating it if necessary.
+
+        Args:
+            chunk_x (int): chunk coordinate x
+            chunk_y (int): chunk coordinate y
+
+        Returns:
+            Chunk: chunk
+        """
+        key = (chunk_x, chunk_y)
+        try:
+            chunk = self._chunks[key]
+        except KeyError:
+            chunk = self._load(key)
+            self._chunks[key] = chunk
+            self._evict(keep=key)
+        else:
+            self._chunks.move_to_end(key)
+        return chunk
+
+    def load_rect(
+        self, x_low: int, y_low: int, x_high: int, y_high: int
+    ) -> None:
+        """Makes sure all chunks overlapping a block of hexes are loaded.
+
+        Args:
+            x_low (int): first column (offset)
+            y_low (int): first row (offset)
+            x_high (int): last column (offset)
+            y_high (int): last row (offset)
+        """
+        first_x, first_y = self.chunk_of(x_low, y_low)
+        last_x, last_y = self.chunk_of(x_high, y_high)
+        for chunk_x in range(first_x, last_x + 1):
+            for chunk_y in range(first_y, last_y + 1):
+                self.get_chunk(chunk_x, chunk_y)
+
+    def load_around(
+        self,
+        x: int,
+        y: int,
+        radius: int = space4x.constants.world_load_radius,
+    ) -> None:
+        """Makes sure the chunks near a hex are loaded.
+
+        Args:
+            x (int): x-Position (offset)
+            y (int): y-Position (offset)
+            radius (int, optional): Number of hexes around the position.
+                Defaults to constants.world_load_radius.
+        """
+        self.load_rect(x - radius, y - radius, x + radius, y + radius)
+
+    def stream(
+        self,
+        positions: Sequence[Tuple[int, int]],
+        radius: int = space4x.constants.world_load_radius,
+    ) -> None:
+        """Keeps the chunks around the camera and the ships in memory.
+
+        Meant to be called whenever the camera or a ship moved. The chunks
+        within the radius of a position are loaded. Chunks more than one
+        chunk beyond the radius of every position are evicted, the margin
+        keeps chunks at the border from being evicted and loaded again.
+
+        Args:
+            positions (Sequence[Tuple[int, int]]): offset coordinates of
+                                                   the camera and the ships
+            radius (int, optional): Number of hexes around a position.
+                Defaults to constants.world_load_radius.
+        """
+        self._positions = list(positions)
+        for key in [
+            key
+            for key in self._chunks
+            if self.distance(key) > radius + self.chunk_size
+        ]:
+            self._drop(key)
+        for x, y in self._positions:
+            self.load_around(x=x, y=y, radius=radius)
+
+    def has_star(self, x: int, y: int) -> bool:
+        """Returns if a hex has a star on it.
+
+        Args:
+            x (int): x-Position (offset)
+            y (int): y-Position (offset)
+
+        Returns:
+            bool: True, if there is a star, otherwise False.
+        """
+        chunk = self.get_chunk(*self.chunk_of(x, y))
+        origin_x, origin_y = chunk.origin
+        local_id = (x - origin_x) * self.chunk_size + (y - origin_y)
+        return bool(chunk.star_id[local_id] >= 0)
+
+    def update(self, delta_time: float = 1 / 60) -> None:
+        """Simulates the stars of all chunks in memory.
+
+        Args:
+            delta_time (float, optional): Time elapsed since last call.
+                                          Defaults to 1/60.
+        """
+        for chunk in self._chunks.values():
+            if mine_stars(
+                timer=chunk.timer,
+                resources=chunk.resources,
+                delta_time=delta_time,
+            ):
+                chunk.dirty = True
+
+    @property
+    def nbytes(self) -> int:
+        """Memory consumed by the chunks in memory in bytes.
+
+        Returns:
+            int: Number of bytes
+        """
+        return sum(chunk.nbytes for chunk in self._chunks.values())
@@ -16,6 +16,52 @@ scroll_speed = 5
 
 star_img_scale = 0.5
 star_to_hex_ratio = 0.1
+star_resource_types = ("iron_ore", "bio_mass")
+
+# Streaming world: chunk width/height in hexes, chunks kept in memory and
+# hexes around the camera and ships that are kept loaded
+world_chunk_size = 64
+world_max_chunks = 256
+world_load_radius = 96
+# Grid of the game and of headless world runs, whose stars are streamed
+world_grid_dim_x = 512
+world_grid_dim_y = 512
+
+# Ships of a headless run (space4x --headless)
+headless_ships = 16
+
+# Width and height in hexes of the chunks sprites are drawn in
+render_chunk_size = 8
+# Chunks kept rendered in offscreen textures per layer, about 3 MB each
+render_cache_size = 32
+
+# Written with F5, read with F9
+save_game_path = "space4x.sav"
+
+# Frame profiler: samples kept per section, frames between updates of the
+# overlay (F3) and the trace file written with F4
+profiler_capacity = 1024
+profiler_overlay_interval = 30
+profiler_trace_path = "space4x_trace.json"
+# Path queries recorded while F6 is on, replayed by benchmarks/replay.py
+path_trace_path = "space4x_paths.trace"
+
+grid_change_log_size = 1024
+
+path_cache_size = 256
+flow_field_cache_size = 8
+hierarchical_cluster_size = 16
+# Border runs of at least this length (in tiles, minus one) between two
+# clusters get an entrance at both ends besides the one in the middle
+hierarchical_long_entrance = 5
+# Smaller batches are searched without the process pool
+path_pool_min_batch = 64
+# Processes running path searches off the game loop
+path_service_workers = 1
+# More changed tiles than this make incremental planners start over
+incremental_replan_limit = 256
+# Ticks coordinated by cooperative path finding
+cooperative_horizon = 32
 
 space_ship_img_scale = 0.3
 space_ship_speed = 10  # hexes per second
@@ -0,0 +1,271 @@
+from heapq import heappop, heappush
+from typing import Dict, List, Sequence, Set, Tuple
+
+import space4x.constants
+from space4x.search_engine import SearchEngine
+
+
+class ReservationTable:
+    """Tiles claimed by ships per tick.
+
+    A reservation is stored under the single integer tick * size + tile,
+    so the table only holds one dict entry per claimed (tile, tick).
+    """
+
+    def __init__(self, size: int, horizon: int) -> None:
+        """Creates an empty table.
+
+        Args:
+            size (int): number of tiles of the grid
+            horizon (int): last tick that can be reserved
+        """
+        self.size = size
+        self.horizon = horizon
+        self._occupant: Dict[int, int] = dict()
+
+    def __len__(self) -> int:
+        """Returns the number of reservations.
+
+        Returns:
+            int: number of reserved (tile, tick) pairs
+        """
+        return len(self._occupant)
+
+    def occupant(self, tick: int, tile_id: int) -> int:
+        """Returns the ship that reserved a tile at a tick.
+
+        Args:
+            tick (int): tick
+            tile_id (int): id of the tile
+
+        Returns:
+            int: id of the ship, -1 if the tile is free
+        """
+        return self._occupant.get(tick * self.size + tile_id, -1)
+
+    def can_move(self, tick: int, source: int, target: int) -> bool:
+        """Checks if a ship may move from one tile to another.
+
+        The target has to be free at the next tick, and no ship may come
+        the other way at the same time.
+
+        Args:
+            tick (int): tick the move starts at
+            source (int): id of the tile moved from
+            target (int): id of the tile moved onto, the source for a wait
+
+        Returns:
+            bool: True, if the move does not collide with a reservation.
+        """
+        if tick >= self.horizon:
+            return True
+        oncoming = self.occupant(tick, target)
+        if self.occupant(tick + 1, target) >= 0:
+            return False
+        return oncoming < 0 or self.occupant(tick + 1, source) != oncoming
+
+    def free_from(self, tick: int, tile_id: int) -> bool:
+        """Checks if a tile stays free from a tick up to the horizon.
+
+        Args:
+            tick (int): first tick
+            tile_id (int): id of the tile
+
+        Returns:
+            bool: True, if no ship passes the tile from that tick on.
+        """
+        return all(
+            self.occupant(later, tile_id) < 0
+            for later in range(tick, self.horizon + 1)
+        )
+
+    def reserve(self, path: Sequence[int], ship: int) -> None:
+        """Reserves the tiles of a ship's path, one tile per tick.
+
+        The last tile stays reserved up to the horizon, since the ship
+        stops there.
+
+        Args:
+            path (Sequence[int]): tile ids per tick, starting at tick 0
+            ship (int): id of the ship
+        """
+        if len(path) == 0:
+            return
+        for tick in range(self.horizon + 1):
+            tile_id = path[min(tick, len(path) - 1)]
+            self._occupant[tick * self.size + tile_id] = ship
+
+    def release(self, tile_id: int, ship: int) -> None:
+        """Removes the reservations of a ship on a tile.
+
+        Args:
+            tile_id (int): id of the tile
+            ship (int): id of the ship
+        """
+        for tick in range(self.horizon + 1):
+            key = tick * self.size + tile_id
+            if self._occupant.get(key) == ship:
+                del self._occupant[key]
+
+    def clear(self) -> None:
+        """Removes all reservations."""
+        self._occupant.clear()
+
+
+class CooperativePlanner:
+    """Plans collision free paths for several ships (windowed HCA*).
+
+    Ships are planned one after another in priority order. Each ship
+    searches over (tile, tick) states, may wait on its tile, and avoids
+    the tiles reserved by the ships planned before it. Only the first
+    ticks up to the horizon are coordinated, the rest of a path is a
+    plain A-Star path.
+    """
+
+    def __init__(
+        self,
+        engine: SearchEngine,
+        horizon: int = space4x.constants.cooperative_horizon,
+    ) -> None:
+        """Initializes the planner.
+
+        Args:
+            engine (SearchEngine): flat search engine of the grid
+            horizon (int, optional): Number of ticks to coordinate.
+                Defaults to constants.cooperative_horizon.
+        """
+        self.engine = engine
+        self.core = engine.core
+        self.horizon = horizon
+        self.reservations = ReservationTable(
+            size=self.core.size, horizon=horizon
+        )
+
+        self._indptr = memoryview(engine.indptr)
+        self._indices = memoryview(engine.indices)
+        self._passable = memoryview(self.core.passable)
+        self._move_cost = memoryview(self.core.move_cost)
+        self._cube_x = memoryview(self.core.cube_x)
+        self._cube_y = memoryview(self.core.cube_y)
+        self._cube_z = memoryview(self.core.cube_z)
+
+        # Number of (tile, tick) states expanded by the last plan
+        self.last_expansions = 0
+
+    def plan_all(
+        self, pairs: Sequence[Tuple[int, int]]
+    ) -> List[List[int]]:
+        """Plans the paths of several ships, first pair first.
+
+        Args:
+            pairs (Sequence[Tuple[int, int]]): ids of the start and goal
+                                               tile of every ship
+
+        Returns:
+            List[List[int]]: tile id per tick of every ship, a repeated
+                             tile is a wait. Empty, if the goal cannot be
+                             reached.
+        """
+        self.reservations.clear()
+        # Ships that have not been planned yet still sit on their start
+        for ship, (start, _) in enumerate(pairs):
+            self.reservations.reserve([start], ship)
+        paths = []
+        for ship, (start, goal) in enumerate(pairs):
+            self.reservations.release(start, ship)
+            path = self.plan(start, goal)
+            # A ship without a path stays where it is
+            self.reservations.reserve(path or [start], ship)
+            paths.append(path)
+        return paths
+
+    def plan(self, start: int, goal: int) -> List[int]:
+        """Plans the path of a ship around the existing reservations.
+
+        Args:
+            start (int): id of the start tile
+            goal (int): id of the goal tile
+
+        Returns:
+            List[int]: tile id per tick, a repeated tile is a wait. Empty,
+                       if the goal cannot be reached.
+        """
+        if not self.core.connected(start=start, end=goal):
+            self.last_expansions = 0
+            return []
+        indptr, indices = self._indptr, self._indices
+        passable, move_cost = self._passable, self._move_cost
+        cube_x, cube_y, cube_z = self._cube_x, self._cube_y, self._cube_z
+        goal_x, goal_y, goal_z = cube_x[goal], cube_y[goal], cube_z[goal]
+        reservations = self.reservations
+        size = self.core.size
+        # Waiting costs as much as the cheapest move
+        scale = wait_cost = self.core.min_move_cost
+
+        cost: Dict[int, float] = {start: 0.0}
+        parent: Dict[int, int] = {start: -1}
+        closed: Set[int] = set()
+        frontier: List[Tuple[float, int]] = [(0.0, start)]
+        expansions = 0
+        while frontier:
+            state = heappop(frontier)[1]
+            if state in closed:
+                continue
+            closed.add(state)
+            expansions += 1
+            tick, current = divmod(state, size)
+            if current == goal and reservations.free_from(tick, goal):
+                self.last_expansions = expansions
+                return self._reconstruct_path(parent, state)
+            if tick == self.horizon:
+                # Beyond the horizon the ships are not coordinated
+                rest = self.engine.a_star(current, goal)
+                if len(rest) > 0:
+                    self.last_expansions = expansions
+                    return self._reconstruct_path(parent, state) + rest[1:]
+                continue
+            current_cost = cost[state]
+            first, last = indptr[current], indptr[current + 1]
+            for neighbor in [current, *indices[first:last]]:
+                if not passable[neighbor] and neighbor != current:
+                    continue
+                if not reservations.can_move(tick, current, neighbor):
+                    continue
+                next_state = state + size - current + neighbor
+                new_cost = current_cost + (
+                    wait_cost
+                    if neighbor == current
+                    else move_cost[neighbor]
+                )
+                if next_state in cost and new_cost >= cost[next_state]:
+                    continue
+                cost[next_state] = new_cost
+                parent[next_state] = state
+                priority = new_cost + scale * max(
+                    abs(cube_x[neighbor] - goal_x),
+                    abs(cube_y[neighbor] - goal_y),
+                    abs(cube_z[neighbor] - goal_z),
+                )
+                heappush(frontier, (priority, next_state))
+        self.last_expansions = expansions
+        return []
+
+    def _reconstruct_path(
+        self, parent: Dict[int, int], state: int
+    ) -> List[int]:
+        """Walks the parents back from a (tile, tick) state.
+
+        Args:
+            parent (Dict[int, int]): parent state per state
+            state (int): last state, tick * size + tile
+
+        Returns:
+            List[int]: tile id per tick, from tick 0 on
+        """
+        size = self.core.size
+        path = []
+        while state >= 0:
+            path.append(state % size)
+            state = parent[state]
+        path.reverse()
+        return path
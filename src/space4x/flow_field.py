@@ -0,0 +1,65 @@
+from typing import List, Sequence
+
+import numpy as np  # type: ignore
+
+
+class FlowField:
+    """Distance to a destination and next hop for every tile of a grid.
+
+    A flow field is computed once per destination and can then be read by
+    any number of ships: each ship only looks up the next hop of the tile
+    it is on.
+    """
+
+    def __init__(
+        self,
+        targets: Sequence[int],
+        distance: np.ndarray,
+        next_hop: np.ndarray,
+        version: int,
+    ) -> None:
+        """Wraps the arrays of a computed flow field.
+
+        Args:
+            targets (Sequence[int]): ids of the destination tiles
+            distance (np.ndarray): distance to the nearest destination
+                                   tile, inf if it cannot be reached
+            next_hop (np.ndarray): id of the tile to move to next, -1 on
+                                   the destination and where it cannot
+                                   be reached
+            version (int): grid version the field was computed for
+        """
+        self.targets = tuple(targets)
+        self.distance = distance
+        self.next_hop = next_hop
+        self.version = version
+
+    def reachable(self, tile_id: int) -> bool:
+        """Checks if a destination tile can be reached from a tile.
+
+        Args:
+            tile_id (int): id of the tile
+
+        Returns:
+            bool: True, if a destination tile can be reached.
+        """
+        return bool(np.isfinite(self.distance[tile_id]))
+
+    def path(self, start: int) -> List[int]:
+        """Follows the next hops from a tile to the destination.
+
+        Args:
+            start (int): id of the start tile
+
+        Returns:
+            List[int]: tile ids from start to destination, empty if no
+                       destination tile can be reached
+        """
+        if not self.reachable(start):
+            return []
+        path = [start]
+        current = int(self.next_hop[start])
+        while current >= 0:
+            path.append(current)
+            current = int(self.next_hop[current])
+        return path
@@ -1,11 +1,15 @@
 from __future__ import annotations
 
-from typing import Iterator, Type, Union
+from typing import Callable, Dict, Iterator, Type, Union
 
 import arcade  # type: ignore
 
+import numpy as np  # type: ignore
+
 import space4x.constants
 import space4x.resources
+from space4x.hex_grid_core import HexGridCore
+from space4x.sprite_chunks import SpriteChunks
 from space4x.star import Star
 
 
@@ -23,22 +27,6 @@ class OffsetCoordinate:
         self.y = y
 
 
-class OffsetHash(dict):
-    """A HashTable inheriting from dict for offset coordinates."""
-
-    def get_identifier(self, x: int, y: int) -> str:
-        """Returns a unique identifier for offset coordinates.
-
-        Args:
-            x (int): x-Position
-            y (int): y-Position
-
-        Returns:
-            str: Identifier
-        """
-        return f"x:{x},y:{y}"
-
-
 class CubeCoordinate:
     """Simple Wrapper class for 3D Coordinates."""
 
@@ -75,87 +63,77 @@ class CubeCoordinate:
         return cls(x, y, z)
 
 
-class CubeHash(dict):
-    """A HashTable inheriting from dict for cube coordinates."""
-
-    def get_identifier(self, x: int, y: int, z: int) -> str:
-        """Returns a unique identifier for cube coordinates.
-
-        Args:
-            x (int): x-Position
-            y (int): y-Position
-            z (int): z-Position
-
-        Returns:
-            str: Identifier
-        """
-        return f"x:{x},y:{y},z:{z}"
-
-
 class HexTile(arcade.Sprite):
-    """A HexTile is the basic unit the game field consists of."""
+    """A HexTile is the basic unit the game field consists of.
 
-    def __init__(self, x: int, y: int) -> None:
-        """Creates a HexTile for a given offset coordinate.
+    It is a thin view on one row of the HexGrid's columnar storage and is
+    only created when it is needed, e.g. for drawing.
+    """
 
-        The texture is loaded and the position on the screen is calculated.
+    def __init__(self, hex_grid: HexGrid, tile_id: int) -> None:
+        """Creates the HexTile view for a given tile id.
+
+        The texture is loaded and the position on the screen is read from
+        the grid.
 
         Args:
-            x (int): x-Position
-            y (int): y-Position
+            hex_grid (HexGrid): grid the tile belongs to
+            tile_id (int): dense id of the tile
         """
         super().__init__(
             filename=space4x.resources.hex_img,
             scale=space4x.constants.hex_tile_scale,
         )
-        self.append_texture(
-            arcade.load_texture(space4x.resources.hex_highlighted_img)
-        )
 
-        self._star: Union[None, Star] = None
+        self.hex_grid = hex_grid
+        self.tile_id = tile_id
+
+        self.center_x = float(hex_grid.core.center_x[tile_id])
+        self.center_y = float(hex_grid.core.center_y[tile_id])
 
-        self.offset_coordinate = OffsetCoordinate(x, y)
-        self.cube_coordinate = CubeCoordinate.from_offset_coordinate(
-            offset_coordinate=self.offset_coordinate
+    @property
+    def offset_coordinate(self) -> OffsetCoordinate:
+        """Offset coordinate of the tile.
+
+        Returns:
+            OffsetCoordinate: x, y coordinates (2D)
+        """
+        core = self.hex_grid.core
+        return OffsetCoordinate(
+            x=int(core.offset_x[self.tile_id]),
+            y=int(core.offset_y[self.tile_id]),
         )
 
-        if self.offset_coordinate.y & 1 == 0:
-            self.center_x = (
-                self.offset_coordinate.x
-                * (
-                    space4x.constants.hex_tile_width
-                    + space4x.constants.hex_grid_margin_x
-                )
-                + space4x.constants.hex_tile_width // 2
-                + space4x.constants.hex_grid_correction_x
-            )
-        else:
-            self.center_x = self.offset_coordinate.x * (
-                space4x.constants.hex_tile_width
-                + space4x.constants.hex_grid_margin_x
-            )
-        self.center_y = (
-            space4x.constants.hex_grid_origin_offset
-            - self.offset_coordinate.y
-            * (
-                space4x.constants.hex_tile_height
-                - (
-                    space4x.constants.hex_grid_margin_y
-                    + space4x.constants.hex_grid_correction_y
-                )
-            )
+    @property
+    def cube_coordinate(self) -> CubeCoordinate:
+        """Cube coordinate of the tile.
+
+        Returns:
+            CubeCoordinate: x, y, z (3D)
+        """
+        core = self.hex_grid.core
+        return CubeCoordinate(
+            x=int(core.cube_x[self.tile_id]),
+            y=int(core.cube_y[self.tile_id]),
+            z=int(core.cube_z[self.tile_id]),
         )
 
+    @property
+    def move_cost(self) -> float:
+        """Cost of moving onto the tile.
+
+        Returns:
+            float: movement cost
+        """
+        return float(self.hex_grid.core.move_cost[self.tile_id])
+
     def has_star(self) -> bool:
         """Returns if the HexTile has a star on it.
 
         Returns:
             bool: True, if there is a star, otherwise False.
         """
-        if self._star:
-            return True
-        else:
-            return False
+        return self.hex_grid.core.has_star(self.tile_id)
 
     def get_star(self) -> Union[None, Star]:
         """Returns the star occupying the Hex, if it exists.
@@ -163,7 +141,7 @@ class HexTile(arcade.Sprite):
         Returns:
             Union[None, Star]: Occupying star or None
         """
-        return self._star
+        return self.hex_grid.get_star(self.tile_id)
 
     def set_star(self, star: Star) -> None:
         """Sets the star for the hex.
@@ -171,48 +149,82 @@ class HexTile(arcade.Sprite):
         Args:
             star (Star): a star that should live on the hex.
         """
-        self._star = star
+        self.hex_grid.set_star(tile_id=self.tile_id, star=star)
 
+    def remove_star(self) -> None:
+        """Removes the star of the hex."""
+        self.hex_grid.remove_star(tile_id=self.tile_id)
 
-class HexGrid(arcade.SpriteList):
+    def set_highlighted(self, highlighted: bool) -> None:
+        """Marks the hex as part of a path or removes the mark.
+
+        Args:
+            highlighted (bool): True to mark the hex, False to unmark it
+        """
+        self.hex_grid.set_highlighted(
+            tile_id=self.tile_id, highlighted=highlighted
+        )
+
+
+class HexGrid:
     """A HexGrid is a collection of HexTiles that make up the game's field.
 
+    The tiles are stored in a HexGridCore. HexTiles are only created for
+    the chunks of the grid that have been on screen, and only the chunks
+    on screen are drawn. The HexTiles never change their look, so their
+    chunks stay cached in offscreen textures; highlighted hexes are drawn
+    on top of them by a small overlay.
+
     Uses the 'even-r' horizontal layout.
     """
 
-    def __init__(self) -> None:
-        """A Hex grid is iniatilized by creating [dim_x]x[dim_y] HexTiles.
+    def __init__(self, core: Union[None, HexGridCore] = None) -> None:
+        """A Hex grid is iniatilized with [dim_x]x[dim_y] tiles.
 
         For values see constants.
+
+        Args:
+            core (Union[None, HexGridCore], optional): Existing tiles, e.g.
+                of a loaded game. Defaults to None, which creates a new
+                grid.
         """
-        super().__init__()
-        self.dim_x = space4x.constants.hex_grid_dim_x
-        self.dim_y = space4x.constants.hex_grid_dim_y
-        self.offset_hash = OffsetHash()
-        self.cube_hash = CubeHash()
-        self._setup_grid()
-        # TODO: Get boundaries (pixel) in _setup_grid,
+        if core is None:
+            core = HexGridCore(
+                dim_x=space4x.constants.hex_grid_dim_x,
+                dim_y=space4x.constants.hex_grid_dim_y,
+            )
+        self.dim_x = core.dim_x
+        self.dim_y = core.dim_y
+        self.core = core
+        self._tiles: Dict[int, HexTile] = dict()
+        self.sprites = SpriteChunks(core)
+        # Overlay sprites of the highlighted tiles
+        self.highlights = arcade.SpriteList(use_spatial_hash=False)
+        self._highlights: Dict[int, arcade.Sprite] = dict()
+        # Returns the Star for a star id stored in the core, set by the
+        # star field
+        self.star_lookup: Union[None, Callable[[int], Star]] = None
+        # TODO: Get boundaries (pixel) from the core,
         # so camera cannot scroll off the game board
 
-    def _setup_grid(self) -> None:
-        """Creates the HexTiles and appends them to the HexGrid."""
-        for x in range(-self.dim_x // 2, self.dim_x // 2):
-            for y in range(-self.dim_y // 2, self.dim_y // 2):
-                new_tile = HexTile(x=x, y=y)
-                self.append(new_tile)
-                self.offset_hash[
-                    self.offset_hash.get_identifier(
-                        x=new_tile.offset_coordinate.x,
-                        y=new_tile.offset_coordinate.y,
-                    )
-                ] = new_tile
-                self.cube_hash[
-                    self.cube_hash.get_identifier(
-                        x=new_tile.cube_coordinate.x,
-                        y=new_tile.cube_coordinate.y,
-                        z=new_tile.cube_coordinate.z,
-                    )
-                ] = new_tile
+    def get_Tile_by_id(self, tile_id: int) -> HexTile:
+        """Returns the HexTile for a given tile id.
+
+        The HexTile is created and appended to the grid on first access.
+
+        Args:
+            tile_id (int): dense id of the tile
+
+        Returns:
+            HexTile: HexTile with that id
+        """
+        try:
+            return self._tiles[tile_id]
+        except KeyError:
+            new_tile = HexTile(hex_grid=self, tile_id=tile_id)
+            self._tiles[tile_id] = new_tile
+            self.sprites.add(new_tile, tile_id)
+            return new_tile
 
     def get_Tile_by_xy(self, x: int, y: int) -> Union[None, HexTile]:
         """Returns the HexTile for a given offset coordinate.
@@ -225,12 +237,10 @@ class HexGrid(arcade.SpriteList):
             Union[None, HexTile]: Returns the HexFile at the position or
                                   None, if it does not exist.
         """
-        try:
-            return self.offset_hash[
-                self.offset_hash.get_identifier(x=x, y=y)
-            ]
-        except KeyError:
+        tile_id = self.core.tile_id_from_offset(x=x, y=y)
+        if tile_id < 0:
             return None
+        return self.get_Tile_by_id(tile_id)
 
     def get_Tile_by_xyz(
         self, x: int, y: int, z: int
@@ -246,13 +256,156 @@ class HexGrid(arcade.SpriteList):
             Union[None, HexTile]: Returns the HexFile at the position or
                                   None, if it does not exist.
         """
-        try:
-            return self.cube_hash[
-                self.cube_hash.get_identifier(x=x, y=y, z=z)
-            ]
-        except KeyError:
+        tile_id = self.core.tile_id_from_cube(x=x, y=y, z=z)
+        if tile_id < 0:
             return None
+        return self.get_Tile_by_id(tile_id)
+
+    def tile_at_pixel(self, x: float, y: float) -> Union[None, HexTile]:
+        """Returns the HexTile at a pixel position.
+
+        Args:
+            x (float): pixel position x
+            y (float): pixel position y
+
+        Returns:
+            Union[None, HexTile]: Returns the HexTile at the position or
+                                  None, if it does not exist.
+        """
+        tile_id = self.core.tile_id_at_pixel(x=x, y=y)
+        if tile_id < 0:
+            return None
+        return self.get_Tile_by_id(tile_id)
+
+    def get_star(self, tile_id: int) -> Union[None, Star]:
+        """Returns the star occupying a tile, if it exists.
+
+        Args:
+            tile_id (int): id of the tile
+
+        Returns:
+            Union[None, Star]: Occupying star or None
+        """
+        star_id = self.core.star_id[tile_id]
+        if star_id < 0 or self.star_lookup is None:
+            return None
+        return self.star_lookup(int(star_id))
+
+    def set_star(self, tile_id: int, star: Star) -> None:
+        """Sets the star for a tile.
+
+        Args:
+            tile_id (int): id of the tile
+            star (Star): a star that should live on the tile.
+        """
+        self.core.set_star(tile_id=tile_id, star_id=star.index)
+
+    def set_move_cost(self, tile_id: int, cost: float) -> None:
+        """Sets the cost of moving onto a tile.
+
+        Args:
+            tile_id (int): id of the tile
+            cost (float): movement cost, must be positive
+        """
+        self.core.set_move_cost(tile_ids=tile_id, costs=cost)
+
+    def remove_star(self, tile_id: int) -> None:
+        """Removes the star of a tile.
+
+        Args:
+            tile_id (int): id of the tile
+        """
+        self.core.remove_star(tile_id=tile_id)
+
+    def set_highlighted(self, tile_id: int, highlighted: bool) -> None:
+        """Marks a tile as part of a path or removes the mark.
+
+        Args:
+            tile_id (int): id of the tile
+            highlighted (bool): True to mark the tile, False to unmark it
+        """
+        if highlighted:
+            if tile_id in self._highlights:
+                return
+            highlight = arcade.Sprite(
+                filename=space4x.resources.hex_highlighted_img,
+                scale=space4x.constants.hex_tile_scale,
+            )
+            highlight.center_x = float(self.core.center_x[tile_id])
+            highlight.center_y = float(self.core.center_y[tile_id])
+            self._highlights[tile_id] = highlight
+            self.highlights.append(highlight)
+        elif tile_id in self._highlights:
+            self.highlights.remove(self._highlights.pop(tile_id))
+
+    def release_tiles(self, tile_ids: np.ndarray) -> None:
+        """Drops the HexTiles of the chunks containing some tiles.
+
+        Used for the parts of a streamed world that are far away, the
+        HexTiles are created again once they are on screen.
+
+        Args:
+            tile_ids (np.ndarray): ids of the tiles
+        """
+        sprites = self.sprites
+        for chunk in {
+            sprites.chunk_of(tile_id) for tile_id in tile_ids.tolist()
+        }:
+            for tile_id in sprites.tile_ids(chunk).tolist():
+                self._tiles.pop(tile_id, None)
+            sprites.clear(chunk)
+
+    def create_tiles_in_rect(
+        self, left: float, bottom: float, width: float, height: float
+    ) -> None:
+        """Makes sure all HexTiles inside a rectangle exist.
+
+        The tiles are created for whole chunks, so a chunk is only checked
+        once.
+
+        Args:
+            left (float): left border (pixel)
+            bottom (float): bottom border (pixel)
+            width (float): width of the rectangle (pixel)
+            height (float): height of the rectangle (pixel)
+        """
+        sprites = self.sprites
+        for chunk in sprites.chunks_in_rect(
+            left=left, bottom=bottom, width=width, height=height
+        ).tolist():
+            if chunk in sprites.populated:
+                continue
+            for tile_id in sprites.tile_ids(chunk).tolist():
+                if tile_id not in self._tiles:
+                    self.get_Tile_by_id(tile_id)
+            sprites.populated.add(chunk)
+
+    def draw(
+        self, left: float, bottom: float, width: float, height: float
+    ) -> None:
+        """Draws the HexTiles of the chunks inside the viewport.
+
+        The highlighted tiles are drawn on top.
+
+        Args:
+            left (float): left border of the viewport (pixel)
+            bottom (float): bottom border of the viewport (pixel)
+            width (float): width of the viewport (pixel)
+            height (float): height of the viewport (pixel)
+        """
+        self.sprites.draw(
+            left=left, bottom=bottom, width=width, height=height
+        )
+        self.highlights.draw()
+
+    def __len__(self) -> int:
+        """Returns the number of HexTiles created so far.
+
+        Returns:
+            int: Number of HexTiles
+        """
+        return len(self._tiles)
 
     def __iter__(self) -> Iterator[HexTile]:
         """Return an iterable object of sprites."""
-        return iter(self.sprite_list)
+        return iter(self.sprites)
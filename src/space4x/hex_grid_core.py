@@ -0,0 +1,706 @@
+from collections import deque
+from typing import Deque, List, NamedTuple, Tuple, Type, Union
+
+import numpy as np  # type: ignore
+
+import space4x.constants
+
+
+class GridSnapshot(NamedTuple):
+    """The state of a grid that path searches depend on.
+
+    Holds no sprites, so it is cheap to pickle and send to other
+    processes.
+    """
+
+    dim_x: int
+    dim_y: int
+    version: int
+    passable: np.ndarray
+    move_cost: np.ndarray
+
+
+class GridDelta(NamedTuple):
+    """The tiles of a grid that changed since an earlier version.
+
+    Holds the new state of those tiles, so applying it to a copy of the
+    grid at any version in between brings the copy up to date.
+    """
+
+    version: int
+    tile_ids: np.ndarray
+    passable: np.ndarray
+    move_cost: np.ndarray
+
+
+class HexGridCore:
+    """Columnar storage of the hex grid.
+
+    Every tile is addressed by a dense tile id. All per-tile data is kept
+    in contiguous NumPy arrays indexed by that id, so a tile costs a few
+    dozen bytes instead of a full sprite. The ids follow the order in
+    which the HexGrid has always created its tiles (x outer, y inner).
+
+    Uses the 'even-r' horizontal layout.
+    """
+
+    # (x, z) steps of the six cube directions, y follows from x + y + z = 0
+    axial_directions = [(1, 0), (1, -1), (0, -1), (-1, 0), (-1, 1), (0, 1)]
+
+    def __init__(self, dim_x: int, dim_y: int) -> None:
+        """Creates the columns for a [dim_x]x[dim_y] grid.
+
+        Args:
+            dim_x (int): Number of columns
+            dim_y (int): Number of rows
+        """
+        self.dim_x = dim_x
+        self.dim_y = dim_y
+        self.size = dim_x * dim_y
+        self.min_x = -dim_x // 2
+        self.min_y = -dim_y // 2
+
+        self.column_step = (
+            space4x.constants.hex_tile_width
+            + space4x.constants.hex_grid_margin_x
+        )
+        self.even_row_shift = (
+            space4x.constants.hex_tile_width // 2
+            + space4x.constants.hex_grid_correction_x
+        )
+        self.row_step = space4x.constants.hex_tile_height - (
+            space4x.constants.hex_grid_margin_y
+            + space4x.constants.hex_grid_correction_y
+        )
+
+        tile_ids = np.arange(self.size, dtype=np.int32)
+        self.offset_x = tile_ids // dim_y + np.int32(self.min_x)
+        self.offset_y = tile_ids % dim_y + np.int32(self.min_y)
+
+        self.cube_x = self.offset_x - (
+            self.offset_y + (self.offset_y & 1)
+        ) // np.int32(2)
+        self.cube_z = self.offset_y.copy()
+        self.cube_y = -self.cube_x - self.cube_z
+
+        self.center_x, self.center_y = self.offset_to_pixel(
+            self.offset_x, self.offset_y
+        )
+
+        # -1 marks a tile without a star
+        self.star_id = np.full(self.size, -1, dtype=np.int32)
+        self.passable = np.ones(self.size, dtype=np.bool_)
+        # Cost of moving onto a tile (nebulae, gravity wells, ...)
+        self.move_cost = np.ones(self.size, dtype=np.float32)
+        self._min_move_cost: Union[None, float] = 1.0
+
+        # Incremented whenever the obstacles on the grid change
+        self.version = 0
+        # Tiles changed by the most recent versions, oldest first
+        self._changes: Deque[np.ndarray] = deque(
+            maxlen=space4x.constants.grid_change_log_size
+        )
+
+        # Connected components of the passable tiles, -1 for impassable
+        # tiles. Kept up to date on every change where that is cheap,
+        # otherwise they are marked dirty and relabeled on the next query.
+        self.component_labels = np.zeros(self.size, dtype=np.int32)
+        self._components_dirty = False
+        self._next_component_label = self.size
+
+        self._neighbors: Union[None, np.ndarray] = None
+
+    def tile_id_from_offset(self, x: int, y: int) -> int:
+        """Returns the tile id for an offset coordinate.
+
+        Args:
+            x (int): x-Position
+            y (int): y-Position
+
+        Returns:
+            int: tile id or -1, if the coordinate is not on the grid.
+        """
+        column = x - self.min_x
+        row = y - self.min_y
+        if 0 <= column < self.dim_x and 0 <= row < self.dim_y:
+            return column * self.dim_y + row
+        return -1
+
+    def tile_id_from_cube(self, x: int, y: int, z: int) -> int:
+        """Returns the tile id for a cube coordinate.
+
+        Args:
+            x (int): x-Position
+            y (int): y-Position
+            z (int): z-Position
+
+        Returns:
+            int: tile id or -1, if the coordinate is not on the grid.
+        """
+        if x + y + z != 0:
+            return -1
+        return self.tile_id_from_offset(x=x + (z + (z & 1)) // 2, y=z)
+
+    def tile_ids_from_offset(
+        self, x: np.ndarray, y: np.ndarray
+    ) -> np.ndarray:
+        """Returns the tile ids for arrays of offset coordinates.
+
+        Args:
+            x (np.ndarray): x-Positions
+            y (np.ndarray): y-Positions
+
+        Returns:
+            np.ndarray: tile ids, -1 for coordinates not on the grid.
+        """
+        column = np.asarray(x, dtype=np.int64) - self.min_x
+        row = np.asarray(y, dtype=np.int64) - self.min_y
+        valid = (
+            (column >= 0)
+            & (column < self.dim_x)
+            & (row >= 0)
+            & (row < self.dim_y)
+        )
+        return np.where(valid, column * self.dim_y + row, -1).astype(
+            np.int32
+        )
+
+    def tile_ids_from_cube(
+        self, x: np.ndarray, y: np.ndarray, z: np.ndarray
+    ) -> np.ndarray:
+        """Returns the tile ids for arrays of cube coordinates.
+
+        Args:
+            x (np.ndarray): x-Positions
+            y (np.ndarray): y-Positions
+            z (np.ndarray): z-Positions
+
+        Returns:
+            np.ndarray: tile ids, -1 for coordinates not on the grid.
+        """
+        x = np.asarray(x, dtype=np.int64)
+        z = np.asarray(z, dtype=np.int64)
+        tile_ids = self.tile_ids_from_offset(x=x + (z + (z & 1)) // 2, y=z)
+        return np.where(x + np.asarray(y) + z == 0, tile_ids, -1).astype(
+            np.int32
+        )
+
+    def neighbor_ids(self, tile_id: int) -> List[int]:
+        """Returns the ids of the tiles adjacent to a tile.
+
+        Args:
+            tile_id (int): id of the tile
+
+        Returns:
+            List[int]: ids of the neighbors that are on the grid
+        """
+        x = int(self.cube_x[tile_id])
+        z = int(self.cube_z[tile_id])
+        neighbors = []
+        for direction_x, direction_z in self.axial_directions:
+            neighbor_z = z + direction_z
+            neighbor_id = self.tile_id_from_offset(
+                x=x + direction_x + (neighbor_z + (neighbor_z & 1)) // 2,
+                y=neighbor_z,
+            )
+            if neighbor_id >= 0:
+                neighbors.append(neighbor_id)
+        return neighbors
+
+    def neighbor_table(self) -> np.ndarray:
+        """Returns the ids of the adjacent tiles for every tile.
+
+        Returns:
+            np.ndarray: [size]x[6] table of tile ids, -1 where a neighbor
+                        is not on the grid
+        """
+        columns = []
+        for direction_x, direction_z in self.axial_directions:
+            neighbor_z = self.cube_z + direction_z
+            columns.append(
+                self.tile_ids_from_offset(
+                    x=self.cube_x
+                    + direction_x
+                    + (neighbor_z + (neighbor_z & 1)) // 2,
+                    y=neighbor_z,
+                )
+            )
+        return np.stack(columns, axis=1)
+
+    @property
+    def neighbors(self) -> np.ndarray:
+        """Neighbor table of the grid, see neighbor_table.
+
+        It is built on first access and then kept.
+
+        Returns:
+            np.ndarray: [size]x[6] table of tile ids
+        """
+        if self._neighbors is None:
+            self._neighbors = self.neighbor_table()
+        return self._neighbors
+
+    def offset_to_pixel(
+        self, x: np.ndarray, y: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Calculates the pixel centers of tiles given by offset coordinate.
+
+        Args:
+            x (np.ndarray): x-Positions
+            y (np.ndarray): y-Positions
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: center x and center y
+        """
+        center_x = x * self.column_step + np.where(
+            y & 1 == 0, self.even_row_shift, 0
+        )
+        center_y = (
+            space4x.constants.hex_grid_origin_offset - y * self.row_step
+        )
+        return (
+            center_x.astype(np.float32),
+            center_y.astype(np.float32),
+        )
+
+    def tile_id_at_pixel(self, x: float, y: float) -> int:
+        """Returns the id of the tile containing a pixel position.
+
+        Inverts the layout of offset_to_pixel and rounds the resulting
+        fractional cube coordinate to the nearest tile. The constants
+        shift even rows by half a column step, so the tiles form a
+        regular (if slightly stretched) hexagonal lattice.
+
+        Args:
+            x (float): pixel position x
+            y (float): pixel position y
+
+        Returns:
+            int: tile id or -1, if the position is not on the grid.
+        """
+        row = (
+            space4x.constants.hex_grid_origin_offset - y
+        ) / self.row_step
+        cube_x = (x - self.even_row_shift) / self.column_step - row / 2
+        cube_z = row
+        cube_y = -cube_x - cube_z
+        rounded_x, rounded_y, rounded_z = (
+            round(cube_x),
+            round(cube_y),
+            round(cube_z),
+        )
+        delta_x = abs(rounded_x - cube_x)
+        delta_y = abs(rounded_y - cube_y)
+        delta_z = abs(rounded_z - cube_z)
+        if delta_x > delta_y and delta_x > delta_z:
+            rounded_x = -rounded_y - rounded_z
+        elif delta_y > delta_z:
+            rounded_y = -rounded_x - rounded_z
+        else:
+            rounded_z = -rounded_x - rounded_y
+        return self.tile_id_from_cube(
+            x=rounded_x, y=rounded_y, z=rounded_z
+        )
+
+    def tile_ids_at_pixels(
+        self, x: np.ndarray, y: np.ndarray
+    ) -> np.ndarray:
+        """Returns the ids of the tiles containing arrays of pixel positions.
+
+        Args:
+            x (np.ndarray): pixel positions x
+            y (np.ndarray): pixel positions y
+
+        Returns:
+            np.ndarray: tile ids, -1 for positions not on the grid.
+        """
+        row = (
+            space4x.constants.hex_grid_origin_offset
+            - np.asarray(y, dtype=np.float64)
+        ) / self.row_step
+        cube_x = (
+            np.asarray(x, dtype=np.float64) - self.even_row_shift
+        ) / self.column_step - row / 2
+        cube_z = row
+        cube_y = -cube_x - cube_z
+        rounded_x = np.round(cube_x)
+        rounded_y = np.round(cube_y)
+        rounded_z = np.round(cube_z)
+        delta_x = np.abs(rounded_x - cube_x)
+        delta_y = np.abs(rounded_y - cube_y)
+        delta_z = np.abs(rounded_z - cube_z)
+        fix_x = (delta_x > delta_y) & (delta_x > delta_z)
+        fix_y = ~fix_x & (delta_y > delta_z)
+        fix_z = ~fix_x & ~fix_y
+        rounded_x = np.where(fix_x, -rounded_y - rounded_z, rounded_x)
+        rounded_y = np.where(fix_y, -rounded_x - rounded_z, rounded_y)
+        rounded_z = np.where(fix_z, -rounded_x - rounded_y, rounded_z)
+        return self.tile_ids_from_cube(
+            x=rounded_x.astype(np.int64),
+            y=rounded_y.astype(np.int64),
+            z=rounded_z.astype(np.int64),
+        )
+
+    def _record_change(self, tile_ids: Union[int, np.ndarray]) -> None:
+        """Starts a new version of the grid after tiles changed.
+
+        Args:
+            tile_ids (Union[int, np.ndarray]): id(s) of the changed tile(s)
+        """
+        self.version += 1
+        self._changes.append(np.array(tile_ids, dtype=np.int32, ndmin=1))
+
+    def snapshot(self) -> GridSnapshot:
+        """Copies the state of the grid that path searches depend on.
+
+        Returns:
+            GridSnapshot: copy of the passability and movement costs
+        """
+        return GridSnapshot(
+            dim_x=self.dim_x,
+            dim_y=self.dim_y,
+            version=self.version,
+            passable=self.passable.copy(),
+            move_cost=self.move_cost.copy(),
+        )
+
+    @classmethod
+    def from_snapshot(
+        cls: Type["HexGridCore"], snapshot: GridSnapshot
+    ) -> "HexGridCore":
+        """Creates a grid from a snapshot.
+
+        Star ids are not part of a snapshot, tiles are only impassable.
+
+        Args:
+            snapshot (GridSnapshot): snapshot of a grid
+
+        Returns:
+            HexGridCore: grid with the passability and movement costs of
+                         the snapshot
+        """
+        core = cls(dim_x=snapshot.dim_x, dim_y=snapshot.dim_y)
+        core.passable[:] = snapshot.passable
+        core.move_cost[:] = snapshot.move_cost
+        core._min_move_cost = None
+        core.version = snapshot.version
+        core._components_dirty = True
+        return core
+
+    @classmethod
+    def from_columns(
+        cls: Type["HexGridCore"],
+        dim_x: int,
+        dim_y: int,
+        star_id: np.ndarray,
+        passable: np.ndarray,
+        move_cost: np.ndarray,
+        component_labels: np.ndarray,
+    ) -> "HexGridCore":
+        """Creates a grid that uses existing columns, e.g. of a save file.
+
+        The columns are used as they are, not copied.
+
+        Args:
+            dim_x (int): Number of columns
+            dim_y (int): Number of rows
+            star_id (np.ndarray): star id per tile, -1 for none
+            passable (np.ndarray): passability per tile
+            move_cost (np.ndarray): movement cost per tile
+            component_labels (np.ndarray): connected component per tile
+
+        Returns:
+            HexGridCore: grid with the given columns
+        """
+        core = cls(dim_x=dim_x, dim_y=dim_y)
+        core.star_id = star_id
+        core.passable = passable
+        core.move_cost = move_cost
+        core._min_move_cost = None
+        core.component_labels = component_labels
+        core._next_component_label = max(
+            int(component_labels.max(initial=-1)) + 1, core.size
+        )
+        return core
+
+    def changes_since(self, version: int) -> Union[None, np.ndarray]:
+        """Returns the tiles changed since a version of the grid.
+
+        Args:
+            version (int): version of the grid
+
+        Returns:
+            Union[None, np.ndarray]: ids of the changed tiles or None, if
+                                     the version is too old to be covered
+                                     by the change log
+        """
+        missed = self.version - version
+        if missed == 0:
+            return np.empty(0, dtype=np.int32)
+        if missed > len(self._changes):
+            return None
+        return np.unique(np.concatenate(list(self._changes)[-missed:]))
+
+    def delta_since(self, version: int) -> Union[None, GridDelta]:
+        """Collects the state of the tiles changed since a version.
+
+        Args:
+            version (int): version of the grid
+
+        Returns:
+            Union[None, GridDelta]: changed tiles or None, if the version is
+                                    too old to be covered by the change log
+        """
+        tile_ids = self.changes_since(version)
+        if tile_ids is None:
+            return None
+        return GridDelta(
+            version=self.version,
+            tile_ids=tile_ids,
+            passable=self.passable[tile_ids],
+            move_cost=self.move_cost[tile_ids],
+        )
+
+    def apply_delta(self, delta: GridDelta) -> None:
+        """Brings a copy of a grid up to the version of a delta.
+
+        Star ids are not part of a delta, tiles are only impassable.
+
+        Args:
+            delta (GridDelta): changes of the original grid
+        """
+        if not np.array_equal(
+            self.passable[delta.tile_ids], delta.passable
+        ):
+            self.passable[delta.tile_ids] = delta.passable
+            self._components_dirty = True
+        self.move_cost[delta.tile_ids] = delta.move_cost
+        self._min_move_cost = None
+        self.version = delta.version
+
+    def has_star(self, tile_id: int) -> bool:
+        """Returns if a tile has a star on it.
+
+        Args:
+            tile_id (int): id of the tile
+
+        Returns:
+            bool: True, if there is a star, otherwise False.
+        """
+        return bool(self.star_id[tile_id] >= 0)
+
+    def set_star(self, tile_id: int, star_id: int) -> None:
+        """Places a star on a tile, which makes the tile impassable.
+
+        Args:
+            tile_id (int): id of the tile
+            star_id (int): id of the star
+        """
+        was_passable = self.passable[tile_id]
+        self.star_id[tile_id] = star_id
+        self.passable[tile_id] = False
+        self._record_change(tile_id)
+        if not was_passable:
+            return
+        self.component_labels[tile_id] = -1
+        if not self._components_dirty and self._may_split(tile_id):
+            self._components_dirty = True
+
+    def set_stars(
+        self, tile_ids: np.ndarray, star_ids: np.ndarray
+    ) -> None:
+        """Places many stars at once, which makes their tiles impassable.
+
+        The connected components are relabeled on the next query.
+
+        Args:
+            tile_ids (np.ndarray): ids of the tiles
+            star_ids (np.ndarray): ids of the stars
+        """
+        self.star_id[tile_ids] = star_ids
+        self.passable[tile_ids] = False
+        self._record_change(tile_ids)
+        self._components_dirty = True
+
+    def set_move_cost(
+        self,
+        tile_ids: Union[int, np.ndarray],
+        costs: Union[float, np.ndarray],
+    ) -> None:
+        """Sets the cost of moving onto one or more tiles.
+
+        Args:
+            tile_ids (Union[int, np.ndarray]): id(s) of the tile(s)
+            costs (Union[float, np.ndarray]): cost(s), must be positive
+
+        Raises:
+            ValueError: If a cost is not positive.
+        """
+        if np.any(np.asarray(costs) <= 0):
+            raise ValueError("Movement costs must be positive.")
+        self.move_cost[tile_ids] = costs
+        self._min_move_cost = None
+        self._record_change(tile_ids)
+
+    @property
+    def min_move_cost(self) -> float:
+        """Lowest movement cost on the grid.
+
+        Scaling a distance by it keeps path finding heuristics admissible.
+
+        Returns:
+            float: lowest movement cost
+        """
+        if self._min_move_cost is None:
+            self._min_move_cost = float(self.move_cost.min())
+        return self._min_move_cost
+
+    def remove_star(self, tile_id: int) -> None:
+        """Removes the star of a tile, which makes the tile passable.
+
+        Args:
+            tile_id (int): id of the tile
+        """
+        if self.star_id[tile_id] < 0:
+            return
+        self.star_id[tile_id] = -1
+        self.passable[tile_id] = True
+        self._record_change(tile_id)
+        labels = {
+            int(self.component_labels[neighbor_id])
+            for neighbor_id in self.neighbor_ids(tile_id)
+            if self.passable[neighbor_id]
+        }
+        if len(labels) == 0:
+            self.component_labels[tile_id] = self._next_component_label
+            self._next_component_label += 1
+        elif len(labels) == 1:
+            self.component_labels[tile_id] = labels.pop()
+        else:
+            # The tile joins several components
+            self._components_dirty = True
+
+    def remove_stars(self, tile_ids: np.ndarray) -> None:
+        """Removes many stars at once, which makes their tiles passable.
+
+        The connected components are relabeled on the next query.
+
+        Args:
+            tile_ids (np.ndarray): ids of the tiles
+        """
+        self.star_id[tile_ids] = -1
+        self.passable[tile_ids] = True
+        self._record_change(tile_ids)
+        self._components_dirty = True
+
+    def _may_split(self, tile_id: int) -> bool:
+        """Checks if blocking a tile may split its component.
+
+        The neighbors of a tile form a ring, in which consecutive tiles
+        are adjacent to each other. As long as the passable neighbors form
+        at most one unbroken arc of that ring, they stay connected.
+
+        Args:
+            tile_id (int): id of the blocked tile
+
+        Returns:
+            bool: True, if the component may have been split.
+        """
+        is_open = [
+            neighbor_id >= 0 and bool(self.passable[neighbor_id])
+            for neighbor_id in self.neighbors[tile_id].tolist()
+        ]
+        arcs = sum(
+            1
+            for direction in range(6)
+            if is_open[direction] and not is_open[direction - 1]
+        )
+        return arcs > 1
+
+    def _label_components(self) -> None:
+        """Labels the connected components of all passable tiles.
+
+        Every tile starts as its own component. Components connected by an
+        edge are hooked onto the one with the smaller label, followed by
+        pointer jumping, until no edge connects two components anymore.
+        """
+        tile_ids = np.arange(self.size, dtype=np.int64)
+        # The first three directions are the opposites of the last three,
+        # so they reach every edge exactly once.
+        sources = np.repeat(tile_ids, 3)
+        targets = self.neighbors[:, :3].ravel().astype(np.int64)
+        valid = targets >= 0
+        sources, targets = sources[valid], targets[valid]
+        valid = self.passable[sources] & self.passable[targets]
+        sources, targets = sources[valid], targets[valid]
+
+        labels = tile_ids.copy()
+        while True:
+            source_labels = labels[sources]
+            target_labels = labels[targets]
+            differ = source_labels != target_labels
+            if not differ.any():
+                break
+            np.minimum.at(
+                labels,
+                np.maximum(source_labels[differ], target_labels[differ]),
+                np.minimum(source_labels[differ], target_labels[differ]),
+            )
+            while True:
+                jumped = labels[labels]
+                if np.array_equal(jumped, labels):
+                    break
+                labels = jumped
+
+        self.component_labels = np.where(self.passable, labels, -1).astype(
+            np.int32
+        )
+        self._next_component_label = self.size
+        self._components_dirty = False
+
+    def components(self) -> np.ndarray:
+        """Returns the connected component label of every tile.
+
+        Returns:
+            np.ndarray: component labels, -1 for impassable tiles
+        """
+        if self._components_dirty:
+            self._label_components()
+        return self.component_labels
+
+    def connected(self, start: int, end: int) -> bool:
+        """Checks if a path between two tiles exists.
+
+        Args:
+            start (int): id of the start tile
+            end (int): id of the end tile
+
+        Returns:
+            bool: True, if both tiles are passable and connected.
+        """
+        labels = self.components()
+        return bool(labels[start] >= 0 and labels[start] == labels[end])
+
+    @property
+    def nbytes(self) -> int:
+        """Memory consumed by the columns in bytes.
+
+        Returns:
+            int: Number of bytes
+        """
+        return sum(
+            column.nbytes
+            for column in (
+                self.offset_x,
+                self.offset_y,
+                self.cube_x,
+                self.cube_y,
+                self.cube_z,
+                self.center_x,
+                self.center_y,
+                self.star_id,
+                self.passable,
+                self.move_cost,
+                self.component_labels,
+            )
+        )
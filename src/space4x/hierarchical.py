@@ -0,0 +1,430 @@
+from heapq import heappop, heappush
+from typing import Dict, List, Tuple
+
+import numpy as np  # type: ignore
+
+import space4x.constants
+from space4x.search_engine import SearchEngine
+
+Edges = Dict[int, List[Tuple[int, float]]]
+
+
+class HierarchicalPathFinder:
+    """Hierarchical path finding (HPA*) on the tile ids of a grid.
+
+    The grid is partitioned into square clusters of offset coordinates.
+    Every run of passable tile pairs along the border of two clusters gets
+    one entrance (three for long runs). A query first searches the
+    abstract graph of entrances and then only searches the clusters on the
+    abstract path on tile level.
+
+    The abstract edges between the entrances are precomputed for the
+    whole grid. Whenever tiles change, only the entrances and edges of the
+    affected clusters are rebuilt, when a search next reaches them.
+    """
+
+    def __init__(
+        self,
+        engine: SearchEngine,
+        cluster_size: int = space4x.constants.hierarchical_cluster_size,
+    ) -> None:
+        """Partitions the grid and finds the entrances of all clusters.
+
+        Args:
+            engine (SearchEngine): flat search engine of the grid
+            cluster_size (int, optional): Width and height of a cluster.
+                Defaults to constants.hierarchical_cluster_size.
+        """
+        self.engine = engine
+        self.core = engine.core
+        self.cluster_size = cluster_size
+
+        tile_ids = np.arange(self.core.size, dtype=np.int64)
+        columns = tile_ids // self.core.dim_y
+        rows = tile_ids % self.core.dim_y
+        cluster_rows = -(-self.core.dim_y // cluster_size)
+        self.cluster_of = (
+            (columns // cluster_size) * cluster_rows + rows // cluster_size
+        ).astype(np.int32)
+
+        # Every pair of adjacent tiles in different clusters, once
+        sources = np.repeat(tile_ids, 6)
+        targets = engine.neighbor_table.ravel().astype(np.int64)
+        valid = targets >= 0
+        sources, targets = sources[valid], targets[valid]
+        crossing = self.cluster_of[sources] < self.cluster_of[targets]
+        sources, targets = sources[crossing], targets[crossing]
+        # Position along the border of the two clusters
+        positions = np.where(
+            columns[sources] // cluster_size
+            == columns[targets] // cluster_size,
+            columns[sources],
+            rows[sources],
+        )
+        order = np.lexsort(
+            (
+                positions,
+                self.cluster_of[targets],
+                self.cluster_of[sources],
+            )
+        )
+        self._border_sources = sources[order].astype(np.int32)
+        self._border_targets = targets[order].astype(np.int32)
+        self._border_positions = positions[order].astype(np.int32)
+
+        source_clusters = self.cluster_of[self._border_sources]
+        target_clusters = self.cluster_of[self._border_targets]
+        starts = np.flatnonzero(
+            np.diff(source_clusters, prepend=-1)
+            | np.diff(target_clusters, prepend=-1)
+        )
+        ends = np.append(starts[1:], source_clusters.size)
+        self._pair_slices: Dict[Tuple[int, int], slice] = dict()
+        self._cluster_pairs: Dict[int, List[Tuple[int, int]]] = dict()
+        for first, last in zip(starts.tolist(), ends.tolist()):
+            pair = (
+                int(source_clusters[first]),
+                int(target_clusters[first]),
+            )
+            self._pair_slices[pair] = slice(first, last)
+            self._cluster_pairs.setdefault(pair[0], []).append(pair)
+            self._cluster_pairs.setdefault(pair[1], []).append(pair)
+
+        self._pair_entrances: Dict[Tuple[int, int], List[Tuple[int, int]]]
+        self._graphs: Dict[int, Edges]
+        self._build_entrances()
+        self._version = self.core.version
+
+        # Number of abstract nodes and tiles expanded by the last query,
+        # including the searches inside of the clusters
+        self.last_expansions = 0
+
+    def _build_entrances(self) -> None:
+        """Finds the entrances and abstract edges of all clusters.
+
+        The edges inside of the clusters are found with one vectorized
+        distance field per entrance rank: the k-th entrance of every
+        cluster is a source of the k-th field, and moves across cluster
+        borders are not allowed.
+        """
+        self._pair_entrances = {
+            pair: self._find_entrances(pair) for pair in self._pair_slices
+        }
+        self._graphs = {
+            cluster: self._border_edges(cluster)
+            for cluster in self._cluster_pairs
+        }
+        clusters = list(self._graphs)
+        entrances = [list(self._graphs[cluster]) for cluster in clusters]
+        entrance_tiles = np.array(
+            [tile_id for tiles in entrances for tile_id in tiles],
+            dtype=np.int32,
+        )
+        offsets = np.cumsum([0] + [len(tiles) for tiles in entrances])
+        ranks = max((len(tiles) for tiles in entrances), default=0)
+        for rank in range(ranks):
+            ranked = [
+                index
+                for index, tiles in enumerate(entrances)
+                if len(tiles) > rank
+            ]
+            distance = self.engine.distance_field(
+                sources=[entrances[index][rank] for index in ranked],
+                regions=self.cluster_of,
+            )
+            entrance_distance = distance[entrance_tiles].tolist()
+            for index in ranked:
+                tiles = entrances[index]
+                edges = self._graphs[clusters[index]][tiles[rank]]
+                first = offsets[index]
+                edges.extend(
+                    (tile_id, entrance_distance[first + position])
+                    for position, tile_id in enumerate(tiles)
+                    if position != rank
+                    and entrance_distance[first + position] != np.inf
+                )
+
+    def _find_entrances(
+        self, pair: Tuple[int, int]
+    ) -> List[Tuple[int, int]]:
+        """Finds the entrances between two adjacent clusters.
+
+        Args:
+            pair (Tuple[int, int]): ids of the clusters
+
+        Returns:
+            List[Tuple[int, int]]: pairs of adjacent tiles, the first of
+                                   which lies in the first cluster
+        """
+        border = self._pair_slices[pair]
+        sources = self._border_sources[border]
+        targets = self._border_targets[border]
+        positions = self._border_positions[border]
+        passable = (
+            self.core.passable[sources] & self.core.passable[targets]
+        )
+        sources = sources[passable]
+        targets = targets[passable]
+        positions = positions[passable]
+        if sources.size == 0:
+            return []
+
+        entrances: List[Tuple[int, int]] = []
+        breaks = np.flatnonzero(np.diff(positions) > 1) + 1
+        for run in np.split(np.arange(sources.size), breaks):
+            picks = {int(run[len(run) // 2])}
+            if (
+                positions[run[-1]] - positions[run[0]]
+                >= space4x.constants.hierarchical_long_entrance
+            ):
+                picks.update((int(run[0]), int(run[-1])))
+            entrances.extend(
+                (int(sources[pick]), int(targets[pick]))
+                for pick in sorted(picks)
+            )
+        return entrances
+
+    def _update(self) -> None:
+        """Rebuilds the clusters whose tiles changed since the last query."""
+        changes = self.core.changes_since(self._version)
+        self._version = self.core.version
+        if changes is None:
+            self._build_entrances()
+            return
+        clusters = set(self.cluster_of[changes].tolist())
+        pairs = {
+            pair
+            for cluster in clusters
+            for pair in self._cluster_pairs.get(cluster, [])
+        }
+        for pair in pairs:
+            self._pair_entrances[pair] = self._find_entrances(pair)
+            self._graphs.pop(pair[0], None)
+            self._graphs.pop(pair[1], None)
+        for cluster in clusters:
+            self._graphs.pop(cluster, None)
+
+    def _cluster_graph(self, cluster: int) -> Edges:
+        """Returns the abstract edges leaving the entrances of a cluster.
+
+        Args:
+            cluster (int): id of the cluster
+
+        Returns:
+            Edges: edges (target, cost) per entrance tile
+        """
+        try:
+            return self._graphs[cluster]
+        except KeyError:
+            pass
+        graph = self._border_edges(cluster)
+        entrances = list(graph)
+        for entrance in entrances:
+            costs, _ = self._search_cluster(
+                cluster=cluster, source=entrance
+            )
+            graph[entrance].extend(
+                (other, costs[other])
+                for other in entrances
+                if other != entrance and other in costs
+            )
+        self._graphs[cluster] = graph
+        return graph
+
+    def _border_edges(self, cluster: int) -> Edges:
+        """Returns the abstract edges crossing the border of a cluster.
+
+        Args:
+            cluster (int): id of the cluster
+
+        Returns:
+            Edges: edges (target, cost) per entrance tile of the cluster
+        """
+        move_cost = self.core.move_cost
+        graph: Edges = dict()
+        for pair in self._cluster_pairs.get(cluster, []):
+            for source, target in self._pair_entrances[pair]:
+                if self.cluster_of[source] != cluster:
+                    source, target = target, source
+                graph.setdefault(source, []).append(
+                    (target, float(move_cost[target]))
+                )
+        return graph
+
+    def _search_cluster(
+        self,
+        cluster: int,
+        source: int,
+        target: int = -1,
+        reverse: bool = False,
+    ) -> Tuple[Dict[int, float], Dict[int, int]]:
+        """Runs Dijkstra's algorithm restricted to the tiles of a cluster.
+
+        The expanded tiles are added to last_expansions.
+
+        Args:
+            cluster (int): id of the cluster
+            source (int): id of the tile to start from
+            target (int, optional): id of a tile to stop at. Defaults to
+                                    -1, which searches the whole cluster.
+            reverse (bool, optional): If True, the costs of moving from
+                                      every tile to the source are
+                                      calculated. Defaults to False.
+
+        Returns:
+            Tuple[Dict[int, float], Dict[int, int]]: path costs and
+                                                     parents per tile
+        """
+        indptr = memoryview(self.engine.indptr)
+        indices = memoryview(self.engine.indices)
+        cluster_of = memoryview(self.cluster_of)
+        passable = memoryview(self.core.passable)
+        move_cost = memoryview(self.core.move_cost)
+
+        cost = {source: 0.0}
+        parent = {source: -1}
+        closed = set()
+        frontier: List[Tuple[float, int]] = [(0.0, source)]
+        while frontier:
+            current_cost, current = heappop(frontier)
+            if current in closed:
+                continue
+            closed.add(current)
+            if current == target:
+                break
+            first, last = indptr[current], indptr[current + 1]
+            for neighbor in indices[first:last]:
+                if (
+                    cluster_of[neighbor] != cluster
+                    or not passable[neighbor]
+                ):
+                    continue
+                new_cost = current_cost + (
+                    move_cost[current] if reverse else move_cost[neighbor]
+                )
+                if neighbor not in cost or new_cost < cost[neighbor]:
+                    cost[neighbor] = new_cost
+                    parent[neighbor] = current
+                    heappush(frontier, (new_cost, neighbor))
+        self.last_expansions += len(closed)
+        return cost, parent
+
+    def _heuristic(self, start: int, end: int) -> float:
+        """Hex distance scaled by the lowest movement cost.
+
+        Args:
+            start (int): id of the start tile
+            end (int): id of the end tile
+
+        Returns:
+            float: Lower bound of the path cost
+        """
+        core = self.core
+        return core.min_move_cost * max(
+            abs(int(core.cube_x[start]) - int(core.cube_x[end])),
+            abs(int(core.cube_y[start]) - int(core.cube_y[end])),
+            abs(int(core.cube_z[start]) - int(core.cube_z[end])),
+        )
+
+    def find_path(self, start: int, end: int) -> List[int]:
+        """Calculates a path between two tiles.
+
+        The path is optimal on the abstract graph, which makes it close to
+        the shortest path on the grid.
+
+        Args:
+            start (int): id of the start tile
+            end (int): id of the end tile
+
+        Returns:
+            List[int]: tile ids that make up the path, empty if the end
+                       cannot be reached
+        """
+        self._update()
+        self.last_expansions = 0
+        if not self.core.connected(start=start, end=end):
+            return []
+        if start == end:
+            return [start]
+
+        start_cluster = int(self.cluster_of[start])
+        end_cluster = int(self.cluster_of[end])
+        start_costs, _ = self._search_cluster(
+            cluster=start_cluster, source=start
+        )
+        end_costs, _ = self._search_cluster(
+            cluster=end_cluster, source=end, reverse=True
+        )
+        start_edges = [
+            (entrance, start_costs[entrance])
+            for entrance in self._cluster_graph(start_cluster)
+            if entrance in start_costs
+        ]
+        if end in start_costs:
+            start_edges.append((end, start_costs[end]))
+
+        cost = {start: 0.0}
+        parent = {start: -1}
+        closed = set()
+        frontier = [(self._heuristic(start, end), start)]
+        while frontier:
+            node = heappop(frontier)[1]
+            if node in closed:
+                continue
+            closed.add(node)
+            self.last_expansions += 1
+            if node == end:
+                break
+            cluster = int(self.cluster_of[node])
+            edges = list(self._cluster_graph(cluster).get(node, []))
+            if node == start:
+                edges.extend(start_edges)
+            if cluster == end_cluster and node in end_costs:
+                edges.append((end, end_costs[node]))
+            for neighbor, edge_cost in edges:
+                new_cost = cost[node] + edge_cost
+                if neighbor not in cost or new_cost < cost[neighbor]:
+                    cost[neighbor] = new_cost
+                    parent[neighbor] = node
+                    heappush(
+                        frontier,
+                        (
+                            new_cost + self._heuristic(neighbor, end),
+                            neighbor,
+                        ),
+                    )
+        else:
+            # The entrances do not cover every connection of the tiles
+            path = self.engine.a_star(start=start, end=end)
+            self.last_expansions += self.engine.last_expansions
+            return path
+
+        abstract_path = [end]
+        while abstract_path[-1] != start:
+            abstract_path.append(parent[abstract_path[-1]])
+        abstract_path.reverse()
+        return self._refine(abstract_path)
+
+    def _refine(self, abstract_path: List[int]) -> List[int]:
+        """Replaces the edges inside of clusters by paths of tiles.
+
+        Args:
+            abstract_path (List[int]): nodes of the abstract path
+
+        Returns:
+            List[int]: tile ids that make up the path
+        """
+        path = [abstract_path[0]]
+        for source, target in zip(abstract_path, abstract_path[1:]):
+            cluster = int(self.cluster_of[source])
+            if cluster != self.cluster_of[target]:
+                path.append(target)
+                continue
+            _, parent = self._search_cluster(
+                cluster=cluster, source=source, target=target
+            )
+            segment = [target]
+            while segment[-1] != source:
+                segment.append(parent[segment[-1]])
+            path.extend(reversed(segment[:-1]))
+        return path
@@ -0,0 +1,246 @@
+from heapq import heappop, heappush
+from typing import Dict, List, Tuple
+
+import space4x.constants
+from space4x.search_engine import SearchEngine
+
+Key = Tuple[float, float]
+
+INFINITY = float("inf")
+
+
+class IncrementalPlanner:
+    """Keeps the path of a single ship up to date (D* Lite).
+
+    The search runs backwards from the goal, so the costs to the goal
+    stay valid while the ship moves towards it. When tiles change, only
+    the costs that depend on them are repaired, instead of searching the
+    whole path again. If too many tiles changed, or the changes are no
+    longer covered by the change log of the grid, the planner starts over
+    with a full search.
+    """
+
+    def __init__(
+        self, engine: SearchEngine, start: int, goal: int
+    ) -> None:
+        """Initializes the planner, the first search runs on first use.
+
+        Args:
+            engine (SearchEngine): flat search engine of the grid
+            start (int): id of the tile of the ship
+            goal (int): id of the target tile
+        """
+        self.engine = engine
+        self.core = engine.core
+        self.start = start
+        self.goal = goal
+        self.replan_limit = space4x.constants.incremental_replan_limit
+
+        self._indptr = memoryview(engine.indptr)
+        self._indices = memoryview(engine.indices)
+        self._passable = memoryview(self.core.passable)
+        self._move_cost = memoryview(self.core.move_cost)
+        self._cube_x = memoryview(self.core.cube_x)
+        self._cube_y = memoryview(self.core.cube_y)
+        self._cube_z = memoryview(self.core.cube_z)
+
+        self._g: Dict[int, float] = dict()
+        self._rhs: Dict[int, float] = dict()
+        # Current key of every queued tile, heap entries with another key
+        # are outdated
+        self._queued: Dict[int, Key] = dict()
+        self._queue: List[Tuple[Key, int]] = []
+        self._km = 0.0
+        self._last = start
+        self._scale = 0.0
+        self._version = -1
+        self._initialized = False
+
+        # Number of tiles expanded by the last call of path
+        self.last_expansions = 0
+
+    def _reset(self) -> None:
+        """Drops the search state and queues the goal, like at the start."""
+        self._g.clear()
+        self._rhs.clear()
+        self._queued.clear()
+        self._queue.clear()
+        self._km = 0.0
+        self._last = self.start
+        self._scale = self.core.min_move_cost
+        self._rhs[self.goal] = 0.0
+        self._push(self.goal, self._key(self.goal))
+        self._version = self.core.version
+        self._initialized = True
+
+    def _heuristic(self, tile_id: int) -> float:
+        """Lower bound of the cost between the ship and a tile.
+
+        Args:
+            tile_id (int): id of the tile
+
+        Returns:
+            float: hex distance scaled by the lowest movement cost
+        """
+        cube_x, cube_y, cube_z = self._cube_x, self._cube_y, self._cube_z
+        start = self.start
+        return self._scale * max(
+            abs(cube_x[tile_id] - cube_x[start]),
+            abs(cube_y[tile_id] - cube_y[start]),
+            abs(cube_z[tile_id] - cube_z[start]),
+        )
+
+    def _key(self, tile_id: int) -> Key:
+        """Calculates the queue priority of a tile.
+
+        Args:
+            tile_id (int): id of the tile
+
+        Returns:
+            Key: priority, smaller is processed first
+        """
+        cost = min(
+            self._g.get(tile_id, INFINITY),
+            self._rhs.get(tile_id, INFINITY),
+        )
+        return (cost + self._heuristic(tile_id) + self._km, cost)
+
+    def _push(self, tile_id: int, key: Key) -> None:
+        """Queues a tile or changes its priority.
+
+        Args:
+            tile_id (int): id of the tile
+            key (Key): priority
+        """
+        self._queued[tile_id] = key
+        heappush(self._queue, (key, tile_id))
+
+    def _top_key(self) -> Key:
+        """Returns the smallest priority in the queue.
+
+        Returns:
+            Key: priority, infinite if the queue is empty
+        """
+        queue = self._queue
+        while queue and self._queued.get(queue[0][1]) != queue[0][0]:
+            heappop(queue)
+        return queue[0][0] if queue else (INFINITY, INFINITY)
+
+    def _update_tile(self, tile_id: int) -> None:
+        """Recalculates the cost to the goal of a tile from its neighbors.
+
+        Args:
+            tile_id (int): id of the tile
+        """
+        if tile_id != self.goal:
+            indptr, indices = self._indptr, self._indices
+            passable, move_cost = self._passable, self._move_cost
+            g = self._g
+            best = INFINITY
+            first, last = indptr[tile_id], indptr[tile_id + 1]
+            for neighbor in indices[first:last]:
+                if passable[neighbor]:
+                    cost = move_cost[neighbor] + g.get(neighbor, INFINITY)
+                    if cost < best:
+                        best = cost
+            self._rhs[tile_id] = best
+        self._queued.pop(tile_id, None)
+        if self._g.get(tile_id, INFINITY) != self._rhs.get(
+            tile_id, INFINITY
+        ):
+            self._push(tile_id, self._key(tile_id))
+
+    def _compute_path(self) -> None:
+        """Processes the queue until the cost of the ship tile is settled."""
+        indptr, indices = self._indptr, self._indices
+        passable = self._passable
+        g, rhs = self._g, self._rhs
+        start = self.start
+        expansions = 0
+        while self._top_key() < self._key(start) or g.get(
+            start, INFINITY
+        ) != rhs.get(start, INFINITY):
+            if not self._queue:
+                break
+            old_key, current = heappop(self._queue)
+            del self._queued[current]
+            expansions += 1
+            new_key = self._key(current)
+            if old_key < new_key:
+                self._push(current, new_key)
+                continue
+            if g.get(current, INFINITY) > rhs.get(current, INFINITY):
+                g[current] = rhs[current]
+            else:
+                g[current] = INFINITY
+                self._update_tile(current)
+            first, last = indptr[current], indptr[current + 1]
+            for neighbor in indices[first:last]:
+                if passable[neighbor] or neighbor == start:
+                    self._update_tile(neighbor)
+        self.last_expansions = expansions
+
+    def _apply_changes(self) -> None:
+        """Repairs the search state after tiles of the grid changed."""
+        if not self._initialized or self.core.min_move_cost < self._scale:
+            # A lower movement cost invalidates the heuristic
+            self._reset()
+            return
+        changes = self.core.changes_since(self._version)
+        if changes is None or changes.size > self.replan_limit:
+            self._reset()
+            return
+        self._version = self.core.version
+        indptr, indices = self._indptr, self._indices
+        for tile_id in changes.tolist():
+            # Moving onto a changed tile got cheaper or more expensive
+            self._update_tile(tile_id)
+            first, last = indptr[tile_id], indptr[tile_id + 1]
+            for neighbor in indices[first:last]:
+                self._update_tile(neighbor)
+
+    def move_to(self, tile_id: int) -> None:
+        """Tells the planner that the ship moved.
+
+        Args:
+            tile_id (int): id of the new tile of the ship
+        """
+        if tile_id == self.start:
+            return
+        self.start = tile_id
+        # Raises the priorities of all queued tiles at once, as if the
+        # heuristic was calculated from the previous tile
+        self._km += self._heuristic(self._last)
+        self._last = tile_id
+
+    def path(self) -> List[int]:
+        """Returns the cheapest path from the ship to the goal.
+
+        Returns:
+            List[int]: tile ids from the ship to the goal, empty if the
+                       goal cannot be reached
+        """
+        if not self.core.connected(start=self.start, end=self.goal):
+            self.last_expansions = 0
+            return []
+        self._apply_changes()
+        self._compute_path()
+
+        indptr, indices = self._indptr, self._indices
+        passable, move_cost = self._passable, self._move_cost
+        g = self._g
+        path = [self.start]
+        current = self.start
+        while current != self.goal:
+            best, best_cost = -1, INFINITY
+            first, last = indptr[current], indptr[current + 1]
+            for neighbor in indices[first:last]:
+                if passable[neighbor]:
+                    cost = move_cost[neighbor] + g.get(neighbor, INFINITY)
+                    if cost < best_cost:
+                        best, best_cost = neighbor, cost
+            if best < 0 or len(path) > self.core.size:
+                return []
+            path.append(best)
+            current = best
+        return path
@@ -1,42 +1,64 @@
-from dataclasses import dataclass, field
-from queue import PriorityQueue, Queue
-from typing import Dict, List, Union
-
-from space4x.hex_grid import HexGrid, HexTile
+from typing import List, Sequence, Tuple, Union
 
+import numpy as np  # type: ignore
 
-# This class is necessary, as PriorityQueue tries to
-# compare not only the priorities, but also the items,
-# but arcade.Sprite has no suitable comparator.
-# This makes PriorityQueue compare only the priority.
-# See: https://docs.python.org/3/library/queue.html
-@dataclass(order=True)
-class PrioritizedHex:
-    priority: float
-    item: HexTile = field(compare=False)
+import space4x.constants
+from space4x.flow_field import FlowField
+from space4x.hex_grid import HexGrid, HexTile
+from space4x.incremental_planner import IncrementalPlanner
+from space4x.path_pool import PathRequest
+from space4x.path_service import PathService
+from space4x.path_trace import PathTraceRecorder
+from space4x.profiler import FrameProfiler
 
 
 class PathFinder:
     """Implements different path finding algorithms."""
 
-    cube_directions = [
-        [1, -1, 0],
-        [1, 0, -1],
-        [0, 1, -1],
-        [-1, 1, 0],
-        [-1, 0, 1],
-        [0, -1, 1],
-    ]
-
-    def __init__(self, hex_grid: HexGrid) -> None:
+    def __init__(
+        self,
+        hex_grid: HexGrid,
+        cache_size: int = space4x.constants.path_cache_size,
+        service: Union[None, PathService] = None,
+    ) -> None:
         """Initializes the PathFinder class.
 
-        It needs the games HexGrid.
+        It needs the games HexGrid. The searches run in a PathService on
+        the tile ids, this class converts between HexTiles and tile ids.
 
         Args:
             hex_grid (HexGrid): current HexGrid of the game.
+            cache_size (int, optional): Maximum number of cached paths.
+                                        Defaults to constants.path_cache_size.
+            service (Union[None, PathService], optional): PathService on
+                the core of the grid, e.g. the one of the Simulation, whose
+                cache is shared. Defaults to None, which creates one with
+                cache_size.
         """
         self.hex_grid = hex_grid
+        if service is None:
+            service = PathService(
+                core=hex_grid.core, cache_size=cache_size
+            )
+        self.service = service
+
+    @property
+    def profiler(self) -> Union[None, FrameProfiler]:
+        """Times the searches and counts their expansions, if set."""
+        return self.service.profiler
+
+    @profiler.setter
+    def profiler(self, profiler: Union[None, FrameProfiler]) -> None:
+        self.service.profiler = profiler
+
+    @property
+    def recorder(self) -> Union[None, PathTraceRecorder]:
+        """Records every query for a later replay, if set."""
+        return self.service.recorder
+
+    @recorder.setter
+    def recorder(self, recorder: Union[None, PathTraceRecorder]) -> None:
+        self.service.recorder = recorder
 
     def get_neighbors(self, hex_tile: HexTile) -> List[HexTile]:
         """Determines the direct neighbors of a given HexTile.
@@ -48,16 +70,11 @@ class PathFinder:
             List[HexTile]: List of neighboring tiles
         """
         neighbors = []
-        for direction in self.cube_directions:
-            if (
-                neighbor := self.hex_grid.get_Tile_by_xyz(
-                    x=hex_tile.cube_coordinate.x + direction[0],
-                    y=hex_tile.cube_coordinate.y + direction[1],
-                    z=hex_tile.cube_coordinate.z + direction[2],
-                )
-            ) is not None:
-                if not neighbor.has_star():
-                    neighbors.append(neighbor)
+        for neighbor_id in self.hex_grid.core.neighbor_ids(
+            hex_tile.tile_id
+        ):
+            if self.hex_grid.core.passable[neighbor_id]:
+                neighbors.append(self.hex_grid.get_Tile_by_id(neighbor_id))
         return neighbors
 
     def heuristic(self, start_hex: HexTile, end_hex: HexTile) -> float:
@@ -76,47 +93,60 @@ class PathFinder:
             + abs(start_hex.cube_coordinate.z - end_hex.cube_coordinate.z)
         ) / 2
 
+    def _find_path(
+        self, algorithm: str, start_hex: HexTile, end_hex: HexTile
+    ) -> List[HexTile]:
+        """Runs a search of the PathService or answers it from its cache.
+
+        Args:
+            algorithm (str): name of the search, see PathService.find_path
+            start_hex (HexTile): Start position
+            end_hex (HexTile): Target position
+
+        Returns:
+            List[HexTile]: HexTiles that make up the path, empty if the
+                           target cannot be reached
+        """
+        return self._to_tiles(
+            self.service.find_path(
+                algorithm=algorithm,
+                start=start_hex.tile_id,
+                end=end_hex.tile_id,
+            )
+        )
+
+    def _to_tiles(self, path: Sequence[int]) -> List[HexTile]:
+        """Converts a path of tile ids into a path of HexTiles.
+
+        Args:
+            path (Sequence[int]): tile ids
+
+        Returns:
+            List[HexTile]: HexTiles
+        """
+        return [self.hex_grid.get_Tile_by_id(tile_id) for tile_id in path]
+
     def breadth_first_search(
         self, start_hex: HexTile, end_hex: HexTile
     ) -> List[HexTile]:
-        """Calculates the shortest path between two HexTiles.
+        """Calculates the path with the fewest moves between two HexTiles.
 
-        Uses the Breadth first search.
+        Uses the Breadth first search, which ignores movement costs.
 
         Args:
             start_hex (HexTile): Start position
             end_hex (HexTile): Target position
 
         Returns:
-            List[HexTile]: HexTiles that make up the path
-        """
-        frontier: Queue[HexTile] = Queue(maxsize=0)
-        frontier.put(start_hex)
-        came_from: Dict[HexTile, Union[None, HexTile]] = dict()
-        came_from[start_hex] = None
-        while not frontier.empty():
-            current_tile = frontier.get()
-            # Early exit
-            if current_tile == end_hex:
-                break
-            for next_tile in self.get_neighbors(hex_tile=current_tile):
-                if next_tile not in came_from:
-                    frontier.put(next_tile)
-                    came_from[next_tile] = current_tile
-
-        current_tile = end_hex
-        path = []
-        while current_tile != start_hex:
-            path.append((current_tile))
-            current_tile = came_from[current_tile]  # type: ignore
-        path.append(start_hex)
-        path.reverse()
-        return path
+            List[HexTile]: HexTiles that make up the path, empty if the
+                           target cannot be reached
+        """
+        return self._find_path("breadth_first_search", start_hex, end_hex)
 
     def dijkstras_algorithm(
         self, start_hex: HexTile, end_hex: HexTile
     ) -> List[HexTile]:
-        """Calculates the shortest path between two HexTiles.
+        """Calculates the cheapest path between two HexTiles.
 
         Uses the Dijkstra's algorithm.
 
@@ -125,47 +155,15 @@ class PathFinder:
             end_hex (HexTile): Target position
 
         Returns:
-            List[HexTile]: HexTiles that make up the path
-        """
-        frontier: PriorityQueue[PrioritizedHex] = PriorityQueue(maxsize=0)
-        frontier.put(PrioritizedHex(priority=0, item=start_hex))
-        came_from: Dict[HexTile, Union[None, HexTile]] = dict()
-        cost_so_far: Dict[HexTile, int] = dict()
-        came_from[start_hex] = None
-        cost_so_far[start_hex] = 0
-        while not frontier.empty():
-            current_tile = frontier.get().item
-            # Early exit
-            if current_tile == end_hex:
-                break
-            for next_tile in self.get_neighbors(hex_tile=current_tile):
-                new_cost = (
-                    cost_so_far[current_tile] + 1
-                )  # TODO: Think about implementing path cost
-                if (
-                    next_tile not in cost_so_far
-                    or new_cost < cost_so_far[next_tile]
-                ):
-                    cost_so_far[next_tile] = new_cost
-                    priority = new_cost
-                    frontier.put(
-                        PrioritizedHex(priority=priority, item=next_tile)
-                    )
-                    came_from[next_tile] = current_tile
-
-        current_tile = end_hex
-        path = []
-        while current_tile != start_hex:
-            path.append((current_tile))
-            current_tile = came_from[current_tile]  # type: ignore
-        path.append(start_hex)
-        path.reverse()
-        return path
+            List[HexTile]: HexTiles that make up the path, empty if the
+                           target cannot be reached
+        """
+        return self._find_path("dijkstras_algorithm", start_hex, end_hex)
 
     def a_star(
         self, start_hex: HexTile, end_hex: HexTile
     ) -> List[HexTile]:
-        """Calculates the shortest path between two HexTiles.
+        """Calculates the cheapest path between two HexTiles.
 
         Uses the A-Star algorithm.
 
@@ -174,41 +172,236 @@ class PathFinder:
             end_hex (HexTile): Target position
 
         Returns:
-            List[HexTile]: HexTiles that make up the path
-        """
-        frontier: PriorityQueue[PrioritizedHex] = PriorityQueue(maxsize=0)
-        frontier.put(PrioritizedHex(priority=0, item=start_hex))
-        came_from: Dict[HexTile, Union[None, HexTile]] = dict()
-        cost_so_far: Dict[HexTile, int] = dict()
-        came_from[start_hex] = None
-        cost_so_far[start_hex] = 0
-        while not frontier.empty():
-            current_tile = frontier.get().item
-            # Early exit
-            if current_tile == end_hex:
-                break
-            for next_tile in self.get_neighbors(hex_tile=current_tile):
-                new_cost = (
-                    cost_so_far[current_tile] + 1
-                )  # TODO: Think about implementing path cost
-                if (
-                    next_tile not in cost_so_far
-                    or new_cost < cost_so_far[next_tile]
-                ):
-                    cost_so_far[next_tile] = new_cost
-                    priority = new_cost + self.heuristic(
-                        start_hex=next_tile, end_hex=end_hex
-                    )
-                    frontier.put(
-                        PrioritizedHex(priority=priority, item=next_tile)
-                    )
-                    came_from[next_tile] = current_tile
-
-        current_tile = end_hex
-        path = []
-        while current_tile != start_hex:
-            path.append((current_tile))
-            current_tile = came_from[current_tile]  # type: ignore
-        path.append(start_hex)
-        path.reverse()
-        return path
+            List[HexTile]: HexTiles that make up the path, empty if the
+                           target cannot be reached
+        """
+        return self._find_path("a_star", start_hex, end_hex)
+
+    def hierarchical_a_star(
+        self, start_hex: HexTile, end_hex: HexTile
+    ) -> List[HexTile]:
+        """Calculates a nearly cheapest path between two HexTiles.
+
+        Uses hierarchical path finding (HPA*), which only searches a
+        small part of the grid on long distances. The clusters are set up
+        on first use.
+
+        Args:
+            start_hex (HexTile): Start position
+            end_hex (HexTile): Target position
+
+        Returns:
+            List[HexTile]: HexTiles that make up the path, empty if the
+                           target cannot be reached
+        """
+        return self._find_path("hierarchical_a_star", start_hex, end_hex)
+
+    def incremental_planner(
+        self, start_hex: HexTile, end_hex: HexTile
+    ) -> IncrementalPlanner:
+        """Creates a planner that keeps a path up to date cheaply.
+
+        Meant for ships that follow a path while the grid changes, see
+        IncrementalPlanner.
+
+        Args:
+            start_hex (HexTile): Start position
+            end_hex (HexTile): Target position
+
+        Returns:
+            IncrementalPlanner: planner for the path
+        """
+        return self.service.incremental_planner(
+            start=start_hex.tile_id, end=end_hex.tile_id
+        )
+
+    def bidirectional_search(
+        self, start_hex: HexTile, end_hex: HexTile
+    ) -> List[HexTile]:
+        """Calculates the cheapest path between two HexTiles.
+
+        Uses A-Star from both ends at once.
+
+        Args:
+            start_hex (HexTile): Start position
+            end_hex (HexTile): Target position
+
+        Returns:
+            List[HexTile]: HexTiles that make up the path, empty if the
+                           target cannot be reached
+        """
+        return self._find_path("bidirectional_search", start_hex, end_hex)
+
+    def batch_paths(
+        self,
+        pairs: Sequence[Tuple[HexTile, HexTile]],
+        workers: int = 1,
+    ) -> List[List[HexTile]]:
+        """Calculates the cheapest paths for many pairs of HexTiles.
+
+        Every distinct pair is searched once with a bidirectional search,
+        pairs without a connection are answered without searching. The
+        paths do not go through the path cache.
+
+        Args:
+            pairs (Sequence[Tuple[HexTile, HexTile]]): Start and target
+                                                       positions
+            workers (int, optional): Number of processes to spread the
+                searches over. The processes are kept for following
+                batches, also when the grid changes. Defaults to 1, which
+                searches in this process.
+
+        Returns:
+            List[List[HexTile]]: paths in the order of the pairs, empty if
+                                 the target cannot be reached
+        """
+        paths = self.service.batch_paths(
+            [
+                (start_hex.tile_id, end_hex.tile_id)
+                for start_hex, end_hex in pairs
+            ],
+            workers=workers,
+        )
+        return [self._to_tiles(path) for path in paths]
+
+    def cooperative_paths(
+        self,
+        pairs: Sequence[Tuple[HexTile, HexTile]],
+        horizon: int = space4x.constants.cooperative_horizon,
+    ) -> List[List[HexTile]]:
+        """Calculates paths for a fleet, on which no two ships collide.
+
+        The ships are planned in the order of the pairs, so earlier ships
+        have priority. A path holds one HexTile per tick, a ship waits
+        where a HexTile repeats. Ships never share a hex on the same tick
+        or swap hexes within the first ticks up to the horizon.
+
+        Args:
+            pairs (Sequence[Tuple[HexTile, HexTile]]): Start and target
+                                                       position per ship
+            horizon (int, optional): Number of ticks to coordinate.
+                Defaults to constants.cooperative_horizon.
+
+        Returns:
+            List[List[HexTile]]: path per ship, empty if the target cannot
+                                 be reached
+        """
+        paths = self.service.cooperative_paths(
+            [
+                (start_hex.tile_id, end_hex.tile_id)
+                for start_hex, end_hex in pairs
+            ],
+            horizon=horizon,
+        )
+        return [self._to_tiles(path) for path in paths]
+
+    def submit(
+        self, algorithm: str, start_hex: HexTile, end_hex: HexTile
+    ) -> PathRequest:
+        """Starts a path search in a background process.
+
+        The game loop stays responsive no matter how long the search takes.
+        Cached paths and targets that cannot be reached are answered right
+        away.
+
+        Args:
+            algorithm (str): name of the search, e.g. "a_star"
+            start_hex (HexTile): Start position
+            end_hex (HexTile): Target position
+
+        Returns:
+            PathRequest: request to poll with collect
+        """
+        return self.service.submit(
+            algorithm=algorithm,
+            start=start_hex.tile_id,
+            end=end_hex.tile_id,
+        )
+
+    def collect(self, request: PathRequest) -> Union[None, List[HexTile]]:
+        """Returns the path of a finished background search.
+
+        Args:
+            request (PathRequest): request returned by submit
+
+        A failed search is logged. If its process died, new processes are
+        started by the next submit.
+
+        Returns:
+            Union[None, List[HexTile]]: HexTiles that make up the path or
+                                        None, if the search is still
+                                        running, was cancelled, failed or
+                                        the grid changed since it started
+        """
+        path = self.service.collect(request)
+        if path is None:
+            return None
+        return self._to_tiles(path)
+
+    def close(self) -> None:
+        """Stops the worker processes, if there are any."""
+        self.service.close()
+
+    def reachable_within(
+        self, start_hex: HexTile, steps: int
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Determines every tile reachable within a number of moves.
+
+        Args:
+            start_hex (HexTile): Start position
+            steps (int): Maximum number of moves
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: ids of the reachable tiles and
+                                           the number of moves to each
+        """
+        return self.service.reachable_within(
+            start=start_hex.tile_id, steps=steps
+        )
+
+    def flow_field(self, end_hexes: Sequence[HexTile]) -> FlowField:
+        """Returns the flow field towards a destination.
+
+        The field is computed once per destination and cached until the
+        obstacles on the grid change.
+
+        Args:
+            end_hexes (Sequence[HexTile]): HexTiles of the destination,
+                                           e.g. the hexes around a star
+
+        Returns:
+            FlowField: distances and next hops towards the destination
+        """
+        return self.service.flow_field(
+            targets=[hex_tile.tile_id for hex_tile in end_hexes]
+        )
+
+    def next_hop(
+        self, flow_field: FlowField, hex_tile: HexTile
+    ) -> Union[None, HexTile]:
+        """Returns the HexTile to move to next when following a flow field.
+
+        Args:
+            flow_field (FlowField): flow field towards the destination
+            hex_tile (HexTile): current position
+
+        Returns:
+            Union[None, HexTile]: next HexTile or None, if the position is
+                                  part of the destination or the
+                                  destination cannot be reached
+        """
+        next_id = int(flow_field.next_hop[hex_tile.tile_id])
+        if next_id < 0:
+            return None
+        return self.hex_grid.get_Tile_by_id(next_id)
+
+    def distance_field(self, start_hex: HexTile) -> np.ndarray:
+        """Calculates the cost of the cheapest path to every tile.
+
+        Args:
+            start_hex (HexTile): Start position
+
+        Returns:
+            np.ndarray: path cost per tile id, inf if it cannot be reached
+        """
+        return self.service.distance_field(start=start_hex.tile_id)
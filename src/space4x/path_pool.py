@@ -0,0 +1,237 @@
+import os
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from itertools import repeat
+from typing import List, Sequence, Tuple, Union
+
+from space4x.hex_grid_core import GridDelta, GridSnapshot, HexGridCore
+from space4x.search_engine import SearchEngine
+
+# Search engine of a worker process, set up once by _initialize_worker
+_engine: Union[None, SearchEngine] = None
+
+
+def _initialize_worker(snapshot: GridSnapshot) -> None:
+    """Builds the search engine of a worker process from a snapshot.
+
+    Args:
+        snapshot (GridSnapshot): snapshot of the grid
+    """
+    global _engine
+    _engine = SearchEngine(HexGridCore.from_snapshot(snapshot))
+
+
+def _worker_engine(delta: Union[None, GridDelta]) -> SearchEngine:
+    """Returns the search engine of a worker process, up to date.
+
+    Args:
+        delta (Union[None, GridDelta]): changes since the snapshot the
+                                        worker started with, if any
+
+    Returns:
+        SearchEngine: engine of the worker
+    """
+    engine: SearchEngine = _engine  # type: ignore
+    if delta is not None and delta.version > engine.core.version:
+        engine.core.apply_delta(delta)
+    return engine
+
+
+def _search_chunk(
+    pairs: Sequence[Tuple[int, int]], delta: Union[None, GridDelta]
+) -> List[List[int]]:
+    """Searches the paths of a chunk of queries in a worker process.
+
+    Args:
+        pairs (Sequence[Tuple[int, int]]): ids of start and end tiles
+        delta (Union[None, GridDelta]): changes of the grid since the
+                                        snapshot of the pool
+
+    Returns:
+        List[List[int]]: tile ids of the paths, in the order of the pairs
+    """
+    engine = _worker_engine(delta)
+    return [
+        engine.bidirectional_search(start, end) for start, end in pairs
+    ]
+
+
+def _search_one(
+    algorithm: str, start: int, end: int, delta: Union[None, GridDelta]
+) -> Tuple[List[int], int]:
+    """Searches a single path in a worker process.
+
+    Args:
+        algorithm (str): name of the search method of the engine
+        start (int): id of the start tile
+        end (int): id of the end tile
+        delta (Union[None, GridDelta]): changes of the grid since the
+                                        snapshot of the pool
+
+    Returns:
+        Tuple[List[int], int]: tile ids of the path, empty if the end
+                               cannot be reached, and the number of
+                               tiles expanded
+    """
+    engine = _worker_engine(delta)
+    path = getattr(engine, algorithm)(start, end)
+    return path, engine.last_expansions
+
+
+class PathRequest:
+    """A path search submitted to run in the background."""
+
+    def __init__(
+        self,
+        algorithm: str,
+        start: int,
+        end: int,
+        version: int,
+        future: "Future[Tuple[List[int], int]]",
+    ) -> None:
+        """Wraps the future of a submitted search.
+
+        Args:
+            algorithm (str): name of the search method
+            start (int): id of the start tile
+            end (int): id of the end tile
+            version (int): grid version the search runs on
+            future (Future[Tuple[List[int], int]]): future of the tile ids
+                of the path and the number of tiles expanded
+        """
+        self.algorithm = algorithm
+        self.start = start
+        self.end = end
+        self.version = version
+        self.future = future
+        self.submitted_at = time.perf_counter()
+
+    def done(self) -> bool:
+        """Checks if the search finished or was cancelled.
+
+        Returns:
+            bool: True, if no more waiting is needed.
+        """
+        return self.future.done()
+
+    def cancel(self) -> None:
+        """Cancels the search.
+
+        A search that is already running finishes in the background, but
+        its result is dropped.
+        """
+        self.future.cancel()
+
+
+class PathPool:
+    """Runs path searches in a pool of worker processes.
+
+    Every worker receives a snapshot of the grid once, when the pool is
+    started, and reuses it for all following queries. Once the grid
+    changed, every query carries the tiles changed since the snapshot,
+    which the workers apply to their copy. The pool is only restarted when
+    the change log of the grid no longer reaches back to the snapshot.
+    """
+
+    def __init__(
+        self, core: HexGridCore, workers: Union[None, int] = None
+    ) -> None:
+        """Initializes the pool, the processes are started on first use.
+
+        Args:
+            core (HexGridCore): columnar storage of the grid
+            workers (Union[None, int], optional): Number of processes.
+                Defaults to None, which uses one per CPU core.
+        """
+        self.core = core
+        self.workers = workers or os.cpu_count() or 1
+        self._executor: Union[None, ProcessPoolExecutor] = None
+        # Grid version of the snapshot the workers started with
+        self._version = -1
+        # Changes since that snapshot, sent along with every query
+        self._delta: Union[None, GridDelta] = None
+
+    def _start(self) -> Tuple[ProcessPoolExecutor, Union[None, GridDelta]]:
+        """Starts the processes, if they are not running yet.
+
+        Returns:
+            Tuple[ProcessPoolExecutor, Union[None, GridDelta]]: executor
+                and the changes of the grid since its snapshot, None if
+                there are none
+        """
+        if (
+            self._executor is not None
+            and self._version != self.core.version
+        ):
+            if (
+                self._delta is None
+                or self._delta.version != self.core.version
+            ):
+                self._delta = self.core.delta_since(self._version)
+            if self._delta is None:
+                # Too many changes, start over from a new snapshot
+                self.close()
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=_initialize_worker,
+                initargs=(self.core.snapshot(),),
+            )
+            self._version = self.core.version
+            self._delta = None
+        return self._executor, self._delta
+
+    def search(self, pairs: Sequence[Tuple[int, int]]) -> List[List[int]]:
+        """Searches the paths between pairs of tiles.
+
+        The pairs are split into a few chunks per process, so sending the
+        queries and paths costs little compared to the searches.
+
+        Args:
+            pairs (Sequence[Tuple[int, int]]): ids of start and end tiles
+
+        Returns:
+            List[List[int]]: tile ids of the paths, in the order of the
+                             pairs, empty if an end cannot be reached
+        """
+        if len(pairs) == 0:
+            return []
+        executor, delta = self._start()
+        chunk_size = -(-len(pairs) // (4 * self.workers))
+        chunks = []
+        for first in range(0, len(pairs), chunk_size):
+            last = first + chunk_size
+            chunks.append(pairs[first:last])
+        paths: List[List[int]] = []
+        for chunk_paths in executor.map(
+            _search_chunk, chunks, repeat(delta)
+        ):
+            paths.extend(chunk_paths)
+        return paths
+
+    def submit(
+        self, algorithm: str, start: int, end: int
+    ) -> "Future[Tuple[List[int], int]]":
+        """Starts a single path search in the background.
+
+        Args:
+            algorithm (str): name of the search method of the engine
+            start (int): id of the start tile
+            end (int): id of the end tile
+
+        Returns:
+            Future[Tuple[List[int], int]]: future of the tile ids of the
+                path and the number of tiles expanded
+        """
+        executor, delta = self._start()
+        return executor.submit(_search_one, algorithm, start, end, delta)
+
+    def close(self) -> None:
+        """Stops the processes of the pool.
+
+        Searches that have not started yet are cancelled, the caller does
+        not wait for running ones.
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
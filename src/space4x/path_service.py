@@ -0,0 +1,443 @@
+import logging
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, List, Sequence, Tuple, Union
+
+import numpy as np  # type: ignore
+
+import space4x.constants
+from space4x.cooperative import CooperativePlanner
+from space4x.flow_field import FlowField
+from space4x.hex_grid_core import HexGridCore
+from space4x.hierarchical import HierarchicalPathFinder
+from space4x.incremental_planner import IncrementalPlanner
+from space4x.path_pool import PathPool, PathRequest
+from space4x.path_trace import PathTraceRecorder
+from space4x.profiler import FrameProfiler
+from space4x.search_engine import SearchEngine
+
+logger = logging.getLogger(__name__)
+
+# Searches of find_path, submit only runs the ones of the SearchEngine
+ALGORITHMS = (
+    "breadth_first_search",
+    "dijkstras_algorithm",
+    "a_star",
+    "bidirectional_search",
+    "hierarchical_a_star",
+)
+
+
+class PathService:
+    """Answers path queries on the tile ids of a grid.
+
+    Nothing in here depends on arcade, the PathFinder of the game converts
+    between HexTiles and tile ids. Found paths are kept in a LRU cache,
+    which is emptied whenever the obstacles on the grid change.
+    """
+
+    def __init__(
+        self,
+        core: HexGridCore,
+        cache_size: int = space4x.constants.path_cache_size,
+    ) -> None:
+        """Initializes the search engine and the empty caches.
+
+        Args:
+            core (HexGridCore): columnar storage of the grid
+            cache_size (int, optional): Maximum number of cached paths.
+                                        Defaults to constants.path_cache_size.
+        """
+        self.core = core
+        self.engine = SearchEngine(core)
+        self.cache_size = cache_size
+        self.flow_field_cache_size = (
+            space4x.constants.flow_field_cache_size
+        )
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self._cache: OrderedDict[Tuple[str, int, int], Tuple[int, ...]] = (
+            OrderedDict()
+        )
+        self._cache_version = core.version
+        self._hierarchical: Union[None, HierarchicalPathFinder] = None
+        self._pool: Union[None, PathPool] = None
+        self._background: Union[None, PathPool] = None
+        self._flow_fields: OrderedDict[Tuple[int, ...], FlowField] = (
+            OrderedDict()
+        )
+        # Times the searches and counts their expansions, if set
+        self.profiler: Union[None, FrameProfiler] = None
+        # Records every query for a later replay, if set
+        self.recorder: Union[None, PathTraceRecorder] = None
+
+    def _check_cache_version(self) -> None:
+        """Empties the caches, if the obstacles on the grid changed."""
+        if self._cache_version != self.core.version:
+            self._cache.clear()
+            self._flow_fields.clear()
+            self._cache_version = self.core.version
+
+    def _searcher(self, algorithm: str) -> Tuple[
+        Callable[[int, int], List[int]],
+        Union[SearchEngine, HierarchicalPathFinder],
+    ]:
+        """Returns the search of an algorithm and the engine running it.
+
+        The clusters of the hierarchical search are set up on first use.
+
+        Args:
+            algorithm (str): name of the search, see ALGORITHMS
+
+        Raises:
+            ValueError: If there is no search of that name.
+
+        Returns:
+            Tuple[Callable[[int, int], List[int]],
+                  Union[SearchEngine, HierarchicalPathFinder]]: search on
+                tile ids and its owner, which counts its expansions
+        """
+        if algorithm not in ALGORITHMS:
+            raise ValueError(f"Unknown path search {algorithm!r}.")
+        if algorithm == "hierarchical_a_star":
+            if self._hierarchical is None:
+                self._hierarchical = HierarchicalPathFinder(
+                    engine=self.engine
+                )
+            return self._hierarchical.find_path, self._hierarchical
+        return getattr(self.engine, algorithm), self.engine
+
+    def find_path(
+        self, algorithm: str, start: int, end: int
+    ) -> Tuple[int, ...]:
+        """Runs a search or answers it from the cache.
+
+        Args:
+            algorithm (str): name of the search, see ALGORITHMS
+            start (int): id of the start tile
+            end (int): id of the end tile
+
+        Returns:
+            Tuple[int, ...]: tile ids that make up the path, empty if the
+                             end cannot be reached
+        """
+        search, engine = self._searcher(algorithm)
+        start_time = time.perf_counter()
+        expansions = 0
+        path: Tuple[int, ...] = ()
+        if self.core.connected(start=start, end=end):
+            key = (algorithm, start, end)
+            cached = self._lookup(key)
+            if cached is not None:
+                path = cached
+            else:
+                path = tuple(search(start, end))
+                expansions = engine.last_expansions
+                if self.profiler is not None:
+                    self.profiler.record(
+                        name=f"path.{algorithm}",
+                        start=start_time,
+                        duration=time.perf_counter() - start_time,
+                        count=expansions,
+                    )
+                self._store(key, path)
+        if self.recorder is not None:
+            self.recorder.observe(self.core)
+            self.recorder.record(
+                algorithm=algorithm,
+                start=start,
+                end=end,
+                version=self.core.version,
+                expansions=expansions,
+                path_length=len(path),
+                latency=time.perf_counter() - start_time,
+            )
+        return path
+
+    def _lookup(
+        self, key: Tuple[str, int, int]
+    ) -> Union[None, Tuple[int, ...]]:
+        """Looks a path up in the cache.
+
+        Args:
+            key (Tuple[str, int, int]): algorithm, start and end tile id
+
+        Returns:
+            Union[None, Tuple[int, ...]]: tile ids of the path or None, if
+                                          it is not cached
+        """
+        self._check_cache_version()
+        try:
+            path = self._cache[key]
+        except KeyError:
+            self.cache_misses += 1
+            return None
+        self.cache_hits += 1
+        self._cache.move_to_end(key)
+        return path
+
+    def _store(
+        self, key: Tuple[str, int, int], path: Tuple[int, ...]
+    ) -> None:
+        """Adds a path to the cache, dropping the least recently used one.
+
+        Args:
+            key (Tuple[str, int, int]): algorithm, start and end tile id
+            path (Tuple[int, ...]): tile ids of the path
+        """
+        self._cache[key] = path
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def incremental_planner(
+        self, start: int, end: int
+    ) -> IncrementalPlanner:
+        """Creates a planner that keeps a path up to date cheaply.
+
+        Meant for ships that follow a path while the grid changes, see
+        IncrementalPlanner.
+
+        Args:
+            start (int): id of the start tile
+            end (int): id of the end tile
+
+        Returns:
+            IncrementalPlanner: planner for the path
+        """
+        return IncrementalPlanner(
+            engine=self.engine, start=start, goal=end
+        )
+
+    def batch_paths(
+        self, pairs: Sequence[Tuple[int, int]], workers: int = 1
+    ) -> List[List[int]]:
+        """Calculates the cheapest paths for many pairs of tiles.
+
+        Every distinct pair is searched once with a bidirectional search,
+        pairs without a connection are answered without searching. The
+        paths do not go through the path cache.
+
+        Args:
+            pairs (Sequence[Tuple[int, int]]): ids of the start and end
+                                               tiles
+            workers (int, optional): Number of processes to spread the
+                searches over. The processes are kept for following
+                batches, also when the grid changes. Defaults to 1, which
+                searches in this process.
+
+        Returns:
+            List[List[int]]: paths in the order of the pairs, empty if the
+                             end cannot be reached
+        """
+        labels = self.core.components()
+        queries = [
+            pair
+            for pair in dict.fromkeys(pairs)
+            if labels[pair[0]] >= 0 and labels[pair[0]] == labels[pair[1]]
+        ]
+
+        if (
+            workers > 1
+            and len(queries) >= space4x.constants.path_pool_min_batch
+        ):
+            if self._pool is None or self._pool.workers != workers:
+                # The background searches of submit keep running
+                if self._pool is not None:
+                    self._pool.close()
+                self._pool = PathPool(core=self.core, workers=workers)
+            found = self._pool.search(queries)
+        else:
+            found = [
+                self.engine.bidirectional_search(start, end)
+                for start, end in queries
+            ]
+
+        paths = dict(zip(queries, found))
+        return [paths.get(pair, []) for pair in pairs]
+
+    def cooperative_paths(
+        self,
+        pairs: Sequence[Tuple[int, int]],
+        horizon: int = space4x.constants.cooperative_horizon,
+    ) -> List[List[int]]:
+        """Calculates paths for a fleet, on which no two ships collide.
+
+        See CooperativePlanner.plan_all.
+
+        Args:
+            pairs (Sequence[Tuple[int, int]]): ids of the start and end
+                                               tile per ship
+            horizon (int, optional): Number of ticks to coordinate.
+                Defaults to constants.cooperative_horizon.
+
+        Returns:
+            List[List[int]]: tile id per tick and ship, empty if the end
+                             cannot be reached
+        """
+        planner = CooperativePlanner(engine=self.engine, horizon=horizon)
+        return planner.plan_all(pairs)
+
+    def submit(self, algorithm: str, start: int, end: int) -> PathRequest:
+        """Starts a path search in a background process.
+
+        The game loop stays responsive no matter how long the search takes.
+        Cached paths and ends that cannot be reached are answered right
+        away.
+
+        Args:
+            algorithm (str): name of a search of the SearchEngine, e.g.
+                             "a_star"
+            start (int): id of the start tile
+            end (int): id of the end tile
+
+        Returns:
+            PathRequest: request to poll with collect
+        """
+        core = self.core
+        if self.recorder is not None:
+            # The grid may change before the request is collected
+            self.recorder.observe(core)
+        if not core.connected(start=start, end=end):
+            path: Union[None, Tuple[int, ...]] = ()
+        else:
+            path = self._lookup((algorithm, start, end))
+        if path is None:
+            if self._background is None:
+                self._background = PathPool(
+                    core=core,
+                    workers=space4x.constants.path_service_workers,
+                )
+            future = self._background.submit(algorithm, start, end)
+        else:
+            future = Future()
+            future.set_result((list(path), 0))
+        return PathRequest(
+            algorithm=algorithm,
+            start=start,
+            end=end,
+            version=core.version,
+            future=future,
+        )
+
+    def collect(
+        self, request: PathRequest
+    ) -> Union[None, Tuple[int, ...]]:
+        """Returns the path of a finished background search.
+
+        A failed search is logged. If its process died, new processes are
+        started by the next submit.
+
+        Args:
+            request (PathRequest): request returned by submit
+
+        Returns:
+            Union[None, Tuple[int, ...]]: tile ids that make up the path
+                                          or None, if the search is still
+                                          running, was cancelled, failed
+                                          or the grid changed since it
+                                          started
+        """
+        if not request.done() or request.future.cancelled():
+            return None
+        exception = request.future.exception()
+        if exception is not None:
+            logger.error(
+                "Background %s search from tile %d to %d failed",
+                request.algorithm,
+                request.start,
+                request.end,
+                exc_info=exception,
+            )
+            if (
+                isinstance(exception, BrokenProcessPool)
+                and self._background is not None
+            ):
+                self._background.close()
+                self._background = None
+            return None
+        if request.version != self.core.version:
+            return None
+        result, expansions = request.future.result()
+        if self.profiler is not None:
+            self.profiler.record(
+                name=f"path_request.{request.algorithm}",
+                start=request.submitted_at,
+                duration=time.perf_counter() - request.submitted_at,
+                count=expansions,
+            )
+        if self.recorder is not None:
+            self.recorder.record(
+                algorithm=request.algorithm,
+                start=request.start,
+                end=request.end,
+                version=request.version,
+                expansions=expansions,
+                path_length=len(result),
+                latency=time.perf_counter() - request.submitted_at,
+            )
+        path = tuple(result)
+        self._check_cache_version()
+        self._store((request.algorithm, request.start, request.end), path)
+        return path
+
+    def close(self) -> None:
+        """Stops the worker processes, if there are any."""
+        for pool in (self._pool, self._background):
+            if pool is not None:
+                pool.close()
+        self._pool = None
+        self._background = None
+
+    def reachable_within(
+        self, start: int, steps: int
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Determines every tile reachable within a number of moves.
+
+        Args:
+            start (int): id of the start tile
+            steps (int): Maximum number of moves
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: ids of the reachable tiles and
+                                           the number of moves to each
+        """
+        return self.engine.reachable_within(start=start, steps=steps)
+
+    def flow_field(self, targets: Sequence[int]) -> FlowField:
+        """Returns the flow field towards a destination.
+
+        The field is computed once per destination and cached until the
+        obstacles on the grid change.
+
+        Args:
+            targets (Sequence[int]): ids of the destination tiles, e.g.
+                                     the tiles around a star
+
+        Returns:
+            FlowField: distances and next hops towards the destination
+        """
+        self._check_cache_version()
+        key = tuple(sorted(set(targets)))
+        try:
+            flow_field = self._flow_fields[key]
+        except KeyError:
+            flow_field = self.engine.flow_field(targets=key)
+            self._flow_fields[key] = flow_field
+            if len(self._flow_fields) > self.flow_field_cache_size:
+                self._flow_fields.popitem(last=False)
+        else:
+            self._flow_fields.move_to_end(key)
+        return flow_field
+
+    def distance_field(self, start: int) -> np.ndarray:
+        """Calculates the cost of the cheapest path to every tile.
+
+        Args:
+            start (int): id of the start tile
+
+        Returns:
+            np.ndarray: path cost per tile id, inf if it cannot be reached
+        """
+        return self.engine.distance_field(sources=[start])
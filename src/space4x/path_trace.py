@@ -0,0 +1,244 @@
+from array import array
+from typing import Dict, List, Tuple, Union
+
+import numpy as np  # type: ignore
+
+from space4x.hex_grid_core import GridDelta, GridSnapshot, HexGridCore
+from space4x.save_format import read_columns, write_columns
+
+# Columns of a trace, one entry per query
+_columns = (
+    ("algorithm", "B"),
+    ("start", "i"),
+    ("end", "i"),
+    ("version", "i"),
+    ("expansions", "i"),
+    ("path_length", "i"),
+    ("latency", "d"),
+)
+
+
+class PathTraceRecorder:
+    """Records the path queries of a game session.
+
+    Every query is appended to flat Python arrays, one per column, which
+    costs a few bytes and no allocation per query. The grid is copied when
+    it is first observed, after that only the changed tiles of every new
+    version are kept. The trace is written in the save file format, so it
+    can be replayed later with every query on the grid it ran on.
+    """
+
+    def __init__(self) -> None:
+        """Creates an empty trace."""
+        self.algorithms: List[str] = []
+        self._algorithm_codes: Dict[str, int] = dict()
+        self._columns: Dict[str, array] = {
+            name: array(typecode) for name, typecode in _columns
+        }
+        # Grid when it was first observed and the changes of every version
+        # observed after that
+        self._grid: Union[None, GridSnapshot] = None
+        self._deltas: List[GridDelta] = []
+
+    def observe(self, core: HexGridCore) -> None:
+        """Keeps the state of the grid a query runs on.
+
+        Has to be called whenever a query is started, before the grid
+        changes again.
+
+        Args:
+            core (HexGridCore): grid of the game
+        """
+        if self._grid is None:
+            self._grid = core.snapshot()
+            return
+        version = (
+            self._deltas[-1].version
+            if self._deltas
+            else self._grid.version
+        )
+        if core.version == version:
+            return
+        delta = core.delta_since(version)
+        if delta is None:
+            # The change log does not reach back that far
+            delta = GridDelta(
+                version=core.version,
+                tile_ids=np.arange(core.size, dtype=np.int32),
+                passable=core.passable.copy(),
+                move_cost=core.move_cost.copy(),
+            )
+        self._deltas.append(delta)
+
+    def __len__(self) -> int:
+        """Returns the number of recorded queries.
+
+        Returns:
+            int: Number of queries
+        """
+        return len(self._columns["start"])
+
+    def record(
+        self,
+        algorithm: str,
+        start: int,
+        end: int,
+        version: int,
+        expansions: int,
+        path_length: int,
+        latency: float,
+    ) -> None:
+        """Appends a query to the trace.
+
+        Args:
+            algorithm (str): name of the search
+            start (int): id of the start tile
+            end (int): id of the end tile
+            version (int): grid version the query ran on
+            expansions (int): number of tiles expanded, 0 for cache hits
+            path_length (int): number of tiles of the path, 0 if the end
+                               cannot be reached
+            latency (float): time until the path was known in seconds
+        """
+        try:
+            code = self._algorithm_codes[algorithm]
+        except KeyError:
+            code = len(self.algorithms)
+            self.algorithms.append(algorithm)
+            self._algorithm_codes[algorithm] = code
+        columns = self._columns
+        columns["algorithm"].append(code)
+        columns["start"].append(start)
+        columns["end"].append(end)
+        columns["version"].append(version)
+        columns["expansions"].append(expansions)
+        columns["path_length"].append(path_length)
+        columns["latency"].append(latency)
+
+    def clear(self) -> None:
+        """Drops all recorded queries, algorithms and grid changes."""
+        self.algorithms = []
+        self._algorithm_codes = dict()
+        for column in self._columns.values():
+            del column[:]
+        self._grid = None
+        self._deltas = []
+
+    def save(self, path: str, core: HexGridCore) -> None:
+        """Writes the trace and the grid changes to a file.
+
+        Args:
+            path (str): path of the file
+            core (HexGridCore): grid the queries ran on
+        """
+        if self._grid is None:
+            self._grid = core.snapshot()
+        grid = self._grid
+        deltas = self._deltas
+        change_offsets = np.zeros(len(deltas) + 1, dtype=np.int64)
+        np.cumsum(
+            [len(delta.tile_ids) for delta in deltas],
+            out=change_offsets[1:],
+        )
+        columns = {
+            name: (
+                np.frombuffer(column, dtype=np.dtype(typecode))
+                if len(column) > 0
+                else np.zeros(0, dtype=np.dtype(typecode))
+            )
+            for (name, typecode), column in zip(
+                _columns, self._columns.values()
+            )
+        }
+        columns.update(
+            {
+                "passable": grid.passable,
+                "move_cost": grid.move_cost,
+                "change_versions": np.array(
+                    [delta.version for delta in deltas], dtype=np.int32
+                ),
+                "change_offsets": change_offsets,
+                "change_tiles": _concatenate(
+                    [delta.tile_ids for delta in deltas], np.int32
+                ),
+                "change_passable": _concatenate(
+                    [delta.passable for delta in deltas], np.bool_
+                ),
+                "change_move_cost": _concatenate(
+                    [delta.move_cost for delta in deltas], np.float32
+                ),
+            }
+        )
+        write_columns(
+            path=path,
+            meta={
+                "dim_x": grid.dim_x,
+                "dim_y": grid.dim_y,
+                "grid_version": grid.version,
+                "algorithms": self.algorithms,
+            },
+            columns=columns,
+        )
+
+
+def _concatenate(arrays: List[np.ndarray], dtype: type) -> np.ndarray:
+    """Joins arrays, which may be none.
+
+    Args:
+        arrays (List[np.ndarray]): arrays to join
+        dtype (type): type of the elements
+
+    Returns:
+        np.ndarray: joined array
+    """
+    if not arrays:
+        return np.zeros(0, dtype=dtype)
+    return np.concatenate(arrays).astype(dtype, copy=False)
+
+
+def load_trace(
+    path: str,
+) -> Tuple[HexGridCore, List[str], Dict[str, np.ndarray], List[GridDelta]]:
+    """Reads a trace written by PathTraceRecorder.save.
+
+    Applying the changes in order to the grid brings it to the version of
+    the following queries.
+
+    Args:
+        path (str): path of the file
+
+    Raises:
+        ValueError: If the file is not a trace.
+
+    Returns:
+        Tuple[HexGridCore, List[str], Dict[str, np.ndarray], List[GridDelta]]:
+            grid when the first query ran, names of the algorithms, the
+            query columns, the algorithm column indexes the names, and the
+            changes of every later version of the grid, oldest first
+    """
+    meta, columns = read_columns(path)
+    if "algorithms" not in meta or "change_versions" not in columns:
+        raise ValueError(f"{path} is not a path trace.")
+    core = HexGridCore.from_snapshot(
+        GridSnapshot(
+            dim_x=meta["dim_x"],
+            dim_y=meta["dim_y"],
+            version=meta["grid_version"],
+            passable=columns["passable"],
+            move_cost=columns["move_cost"],
+        )
+    )
+    offsets = columns["change_offsets"].tolist()
+    deltas = [
+        GridDelta(
+            version=version,
+            tile_ids=columns["change_tiles"][first:last],
+            passable=columns["change_passable"][first:last],
+            move_cost=columns["change_move_cost"][first:last],
+        )
+        for version, first, last in zip(
+            columns["change_versions"].tolist(), offsets[:-1], offsets[1:]
+        )
+    ]
+    queries = {name: columns[name] for name, _ in _columns}
+    return core, meta["algorithms"], queries, deltas
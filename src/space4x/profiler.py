@@ -0,0 +1,203 @@
+import json
+import time
+from typing import ContextManager, Dict, List, Tuple
+
+import numpy as np  # type: ignore
+
+import space4x.constants
+
+
+class _NullSection:
+    """Section of a disabled profiler, does nothing."""
+
+    def __enter__(self) -> None:
+        pass
+
+    def __exit__(self, *_exc_info: object) -> None:
+        pass
+
+
+_null_section = _NullSection()
+
+
+class _Section:
+    """Times one named section into the profiler's ring buffer."""
+
+    def __init__(self, profiler: "FrameProfiler", name: str) -> None:
+        """Creates a reusable timer for a section.
+
+        Args:
+            profiler (FrameProfiler): profiler recording the section
+            name (str): name of the section
+        """
+        self.profiler = profiler
+        self.name = name
+        self._start = 0.0
+
+    def __enter__(self) -> None:
+        self._start = time.perf_counter()
+
+    def __exit__(self, *_exc_info: object) -> None:
+        self.profiler.record(
+            name=self.name,
+            start=self._start,
+            duration=time.perf_counter() - self._start,
+        )
+
+
+class _RingBuffer:
+    """The last samples of a section: start, duration and a count."""
+
+    def __init__(self, capacity: int) -> None:
+        """Allocates the buffer.
+
+        Args:
+            capacity (int): number of samples kept
+        """
+        self.start = np.zeros(capacity, dtype=np.float64)
+        self.duration = np.zeros(capacity, dtype=np.float64)
+        self.count = np.zeros(capacity, dtype=np.int64)
+        # Number of samples recorded so far, the next one is written to
+        # recorded % capacity
+        self.recorded = 0
+
+    def filled(self) -> slice:
+        """Returns the part of the buffer that holds samples.
+
+        Returns:
+            slice: valid entries
+        """
+        return slice(0, min(self.recorded, len(self.duration)))
+
+
+class FrameProfiler:
+    """Times named sections of the game loop.
+
+    The samples of every section are kept in a fixed size ring buffer, so
+    recording never allocates. Percentiles are only calculated on demand,
+    and a disabled profiler hands out a shared section that does nothing,
+    so instrumented code costs close to nothing while it is off.
+    """
+
+    def __init__(
+        self,
+        capacity: int = space4x.constants.profiler_capacity,
+        enabled: bool = False,
+    ) -> None:
+        """Creates an empty profiler.
+
+        Args:
+            capacity (int, optional): Number of samples kept per section.
+                Defaults to constants.profiler_capacity.
+            enabled (bool, optional): Record from the start.
+                Defaults to False.
+        """
+        self.capacity = capacity
+        self.enabled = enabled
+        self._buffers: Dict[str, _RingBuffer] = dict()
+        self._sections: Dict[str, _Section] = dict()
+        # Reference point of the timestamps in a trace
+        self._origin = time.perf_counter()
+
+    def section(self, name: str) -> ContextManager[None]:
+        """Returns a context manager timing a section.
+
+        Args:
+            name (str): name of the section
+
+        Returns:
+            ContextManager[None]: timer, does nothing if the profiler is
+                                  off
+        """
+        if not self.enabled:
+            return _null_section
+        try:
+            return self._sections[name]
+        except KeyError:
+            section = _Section(profiler=self, name=name)
+            self._sections[name] = section
+            return section
+
+    def record(
+        self, name: str, start: float, duration: float, count: int = 0
+    ) -> None:
+        """Adds a sample to a section.
+
+        Args:
+            name (str): name of the section
+            start (float): time.perf_counter() at the start
+            duration (float): duration in seconds
+            count (int, optional): Work done in the section, e.g. the
+                tiles expanded by a path search. Defaults to 0.
+        """
+        if not self.enabled:
+            return
+        try:
+            buffer = self._buffers[name]
+        except KeyError:
+            buffer = _RingBuffer(self.capacity)
+            self._buffers[name] = buffer
+        index = buffer.recorded % self.capacity
+        buffer.start[index] = start
+        buffer.duration[index] = duration
+        buffer.count[index] = count
+        buffer.recorded += 1
+
+    def clear(self) -> None:
+        """Drops all samples."""
+        self._buffers.clear()
+
+    def summary(self) -> List[Tuple[str, float, float, float]]:
+        """Calculates the percentiles of every section.
+
+        Returns:
+            List[Tuple[str, float, float, float]]: name, median and 99th
+                percentile of the duration in seconds and the mean count,
+                sorted by name
+        """
+        rows = []
+        for name in sorted(self._buffers):
+            buffer = self._buffers[name]
+            filled = buffer.filled()
+            p50, p99 = np.percentile(buffer.duration[filled], (50, 99))
+            rows.append(
+                (
+                    name,
+                    float(p50),
+                    float(p99),
+                    float(buffer.count[filled].mean()),
+                )
+            )
+        return rows
+
+    def dump(self, path: str) -> None:
+        """Writes the samples to a trace file.
+
+        The file uses the Chrome trace event format, it can be opened in
+        chrome://tracing or Perfetto.
+
+        Args:
+            path (str): path of the file
+        """
+        events = []
+        for name, buffer in self._buffers.items():
+            filled = buffer.filled()
+            for start, duration, count in zip(
+                buffer.start[filled].tolist(),
+                buffer.duration[filled].tolist(),
+                buffer.count[filled].tolist(),
+            ):
+                events.append(
+                    {
+                        "name": name,
+                        "ph": "X",
+                        "ts": (start - self._origin) * 1e6,
+                        "dur": duration * 1e6,
+                        "pid": 0,
+                        "tid": 0,
+                        "args": {"count": count},
+                    }
+                )
+        events.sort(key=lambda event: event["ts"])
+        with open(path, "w") as trace_file:
+            json.dump({"traceEvents": events}, trace_file)
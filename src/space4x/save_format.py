@@ -0,0 +1,191 @@
+import json
+import os
+import struct
+import tempfile
+from typing import Any, Dict, Sequence, Tuple
+
+import numpy as np  # type: ignore
+
+# A save file starts with the magic bytes, the format version and the
+# length of a JSON header, which describes the metadata and where each
+# column is stored. The columns follow as raw little-endian arrays, each
+# aligned, so they can be memory mapped directly.
+MAGIC = b"S4XSAVE\0"
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+
+_prefix = struct.Struct("<8sII")
+
+
+def _align(position: int) -> int:
+    """Rounds a file position up to the next column boundary.
+
+    Args:
+        position (int): position in bytes
+
+    Returns:
+        int: aligned position
+    """
+    return -(-position // ALIGNMENT) * ALIGNMENT
+
+
+def pack_strings(
+    strings: Sequence[bytes],
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Packs strings into a string table.
+
+    Args:
+        strings (Sequence[bytes]): encoded strings
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: start offset of every string plus the
+                                       end of the last one, and the
+                                       concatenated bytes
+    """
+    lengths = np.fromiter(
+        (len(string) for string in strings),
+        dtype=np.int64,
+        count=len(strings),
+    )
+    offsets = np.zeros(len(strings) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    data = np.frombuffer(b"".join(strings), dtype=np.uint8)
+    return offsets, data
+
+
+def unpack_strings(offsets: np.ndarray, data: np.ndarray) -> np.ndarray:
+    """Turns a string table into an array of fixed width byte strings.
+
+    If all strings have the same length, the array is a view of the data
+    and nothing is copied.
+
+    Args:
+        offsets (np.ndarray): offsets as returned by pack_strings
+        data (np.ndarray): bytes as returned by pack_strings
+
+    Returns:
+        np.ndarray: byte strings
+    """
+    number_of_strings = len(offsets) - 1
+    lengths = np.diff(offsets)
+    if number_of_strings == 0:
+        return np.zeros(0, dtype="S1")
+    width = int(lengths.max())
+    if width > 0 and (lengths == width).all():
+        return (
+            data.reshape(number_of_strings, width)
+            .view(f"S{width}")
+            .ravel()
+        )
+    raw = data.tobytes()
+    return np.array(
+        [
+            raw[start:end]
+            for start, end in zip(
+                offsets[:-1].tolist(), offsets[1:].tolist()
+            )
+        ],
+        dtype=f"S{max(width, 1)}",
+    )
+
+
+def write_columns(
+    path: str, meta: Dict[str, Any], columns: Dict[str, np.ndarray]
+) -> None:
+    """Writes metadata and columns to a save file.
+
+    An existing file is only replaced once the new one is complete, so
+    columns that are memory mapped from it stay valid.
+
+    Args:
+        path (str): path of the file
+        meta (Dict[str, Any]): JSON serializable metadata
+        columns (Dict[str, np.ndarray]): arrays to store
+    """
+    layout = dict()
+    position = 0
+    arrays = []
+    for name, column in columns.items():
+        array = np.ascontiguousarray(column)
+        array = array.astype(array.dtype.newbyteorder("<"), copy=False)
+        position = _align(position)
+        layout[name] = {
+            "dtype": array.dtype.str,
+            "shape": list(array.shape),
+            "offset": position,
+        }
+        arrays.append((position, array))
+        position += array.nbytes
+    header = json.dumps({"meta": meta, "columns": layout}).encode("utf-8")
+    data_start = _align(_prefix.size + len(header))
+
+    # The columns may be memory mapped from the file that is replaced, so
+    # they are written to a new file, which is moved into place at the end.
+    # Truncating the mapped file would invalidate their pages.
+    descriptor, temporary_path = tempfile.mkstemp(
+        dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp"
+    )
+    try:
+        with os.fdopen(descriptor, "wb") as save_file:
+            save_file.write(
+                _prefix.pack(MAGIC, FORMAT_VERSION, len(header))
+            )
+            save_file.write(header)
+            for offset, array in arrays:
+                save_file.seek(data_start + offset)
+                save_file.write(array.tobytes())
+            save_file.truncate(data_start + position)
+        os.replace(temporary_path, path)
+    except BaseException:
+        os.remove(temporary_path)
+        raise
+
+
+def read_columns(
+    path: str,
+) -> Tuple[Dict[str, Any], Dict[str, np.ndarray]]:
+    """Opens a save file and memory maps its columns.
+
+    The columns are mapped copy-on-write: they can be changed in memory,
+    the file is never written.
+
+    Args:
+        path (str): path of the file
+
+    Raises:
+        ValueError: If the file is not a save file or was written by a
+                    newer version of the format.
+
+    Returns:
+        Tuple[Dict[str, Any], Dict[str, np.ndarray]]: metadata and columns
+    """
+    with open(path, "rb") as save_file:
+        prefix = save_file.read(_prefix.size)
+        if len(prefix) < _prefix.size:
+            raise ValueError(f"{path} is not a save file.")
+        magic, version, header_length = _prefix.unpack(prefix)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a save file.")
+        if version > FORMAT_VERSION:
+            raise ValueError(
+                f"{path} uses save format version {version}, only "
+                f"versions up to {FORMAT_VERSION} are supported."
+            )
+        header = json.loads(save_file.read(header_length).decode("utf-8"))
+    data_start = _align(_prefix.size + header_length)
+
+    columns = dict()
+    for name, column in header["columns"].items():
+        dtype = np.dtype(column["dtype"])
+        shape = tuple(column["shape"])
+        if int(np.prod(shape)) == 0:
+            columns[name] = np.zeros(shape, dtype=dtype)
+            continue
+        columns[name] = np.memmap(
+            path,
+            dtype=dtype,
+            mode="c",
+            offset=data_start + column["offset"],
+            shape=shape,
+        )
+    return header["meta"], columns
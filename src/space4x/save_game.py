@@ -0,0 +1,178 @@
+from typing import List, Sequence, Tuple
+
+import numpy as np  # type: ignore
+
+import space4x.constants
+from space4x.chunked_world import ChunkedWorld
+from space4x.hex_grid import HexGrid
+from space4x.hex_grid_core import HexGridCore
+from space4x.save_format import (
+    pack_strings,
+    read_columns,
+    unpack_strings,
+    write_columns,
+)
+from space4x.simulation import Simulation
+from space4x.spaceship import Spaceship
+from space4x.star_field import StarField
+
+
+def save_game(
+    path: str, simulation: Simulation, ships: Sequence[Spaceship]
+) -> None:
+    """Saves the grid, the stars and the ships of a game.
+
+    Of a streamed world only the seed and the stars on the grid are
+    saved, the other chunks are generated again.
+
+    Args:
+        path (str): path of the save file
+        simulation (Simulation): simulation of the game
+        ships (Sequence[Spaceship]): spaceships of the game
+    """
+    core = simulation.core
+    name_offsets, name_data = pack_strings(simulation.star_names.tolist())
+
+    ship_tiles = np.array(
+        [simulation.ship_tiles[ship.ship] for ship in ships],
+        dtype=np.int32,
+    )
+    paths = [simulation.ship_paths[ship.ship] for ship in ships]
+    path_offsets = np.zeros(len(ships) + 1, dtype=np.int64)
+    np.cumsum([len(path) for path in paths], out=path_offsets[1:])
+    path_tiles = np.array(
+        [tile_id for path in paths for tile_id in path], dtype=np.int32
+    )
+
+    write_columns(
+        path=path,
+        meta={
+            "dim_x": core.dim_x,
+            "dim_y": core.dim_y,
+            "seed": simulation.seed,
+            "world_seed": (
+                None if simulation.world is None else simulation.world.seed
+            ),
+            "resource_types": list(space4x.constants.star_resource_types),
+        },
+        columns={
+            "star_id": core.star_id,
+            "passable": core.passable,
+            "move_cost": core.move_cost,
+            "component_labels": core.components(),
+            "star_tile_ids": simulation.star_tile_ids,
+            "star_name_offsets": name_offsets,
+            "star_name_data": name_data,
+            "star_timer": simulation.star_timer,
+            "star_resources": simulation.star_resources,
+            "ship_tile_ids": ship_tiles,
+            "ship_angle": np.array(
+                [ship.angle for ship in ships], dtype=np.float64
+            ),
+            "ship_timer": np.array(
+                [ship.timer for ship in ships], dtype=np.float64
+            ),
+            "ship_path_offsets": path_offsets,
+            "ship_path_tiles": path_tiles,
+        },
+    )
+
+
+def _resources(
+    resources: np.ndarray, resource_types: Sequence[str]
+) -> np.ndarray:
+    """Matches saved resource columns to the current resource types.
+
+    Args:
+        resources (np.ndarray): saved resource amounts
+        resource_types (Sequence[str]): saved resource types
+
+    Returns:
+        np.ndarray: resource amounts, 0 for types that were not saved
+    """
+    current_types = list(space4x.constants.star_resource_types)
+    if list(resource_types) == current_types:
+        return resources
+    matched = np.zeros((len(resources), len(current_types)), np.int64)
+    for index, resource_type in enumerate(current_types):
+        if resource_type in resource_types:
+            matched[:, index] = resources[
+                :, list(resource_types).index(resource_type)
+            ]
+    return matched
+
+
+def load_game(
+    path: str,
+) -> Tuple[Simulation, HexGrid, StarField, List[Spaceship]]:
+    """Loads the grid, the stars and the ships of a saved game.
+
+    The columns of the save file are memory mapped, so only the pages that
+    are actually used are read, and no per-tile or per-star objects are
+    created.
+
+    Args:
+        path (str): path of the save file
+
+    Raises:
+        ValueError: If the file is not a save file or was written by a
+                    newer version of the format.
+
+    Returns:
+        Tuple[Simulation, HexGrid, StarField, List[Spaceship]]:
+            simulation, hex grid, star field and spaceships
+    """
+    meta, columns = read_columns(path)
+    core = HexGridCore.from_columns(
+        dim_x=meta["dim_x"],
+        dim_y=meta["dim_y"],
+        star_id=columns["star_id"],
+        passable=columns["passable"],
+        move_cost=columns["move_cost"],
+        component_labels=columns["component_labels"],
+    )
+    # Older saves have no streamed world
+    world_seed = meta.get("world_seed")
+    simulation = Simulation(
+        seed=meta["seed"],
+        core=core,
+        world=(
+            None if world_seed is None else ChunkedWorld(seed=world_seed)
+        ),
+        star_columns={
+            "tile_ids": columns["star_tile_ids"],
+            "names": unpack_strings(
+                offsets=columns["star_name_offsets"],
+                data=columns["star_name_data"],
+            ),
+            "timer": columns["star_timer"],
+            "resources": _resources(
+                resources=columns["star_resources"],
+                resource_types=meta["resource_types"],
+            ),
+        },
+    )
+    hex_grid = HexGrid(core=core)
+    star_field = StarField(
+        hex_grid=hex_grid,
+        seed=meta["seed"],
+        columns=simulation.star_columns,
+    )
+
+    ships = []
+    path_offsets = columns["ship_path_offsets"].tolist()
+    path_tiles = columns["ship_path_tiles"]
+    for index, tile_id in enumerate(columns["ship_tile_ids"].tolist()):
+        ship = simulation.add_ship(tile_id)
+        simulation.ship_timers[ship] = float(columns["ship_timer"][index])
+        first, last = path_offsets[index], path_offsets[index + 1]
+        # Older saves start the path with the tile of the ship
+        simulation.set_path(
+            ship=ship, path=path_tiles[first:last].tolist()
+        )
+        spaceship = Spaceship(
+            hex_grid=hex_grid, simulation=simulation, ship=ship
+        )
+        spaceship.angle = float(columns["ship_angle"][index])
+        ships.append(spaceship)
+    return simulation, hex_grid, star_field, ships
@@ -0,0 +1,528 @@
+from array import array
+from collections import deque
+from heapq import heappop, heappush
+from typing import List, Sequence, Tuple, Union
+
+import numpy as np  # type: ignore
+
+from space4x.flow_field import FlowField
+from space4x.hex_grid_core import HexGridCore
+
+
+def _to_array(typecode: str, values: np.ndarray) -> array:
+    """Copies a NumPy array into a flat Python array.
+
+    Indexing a Python array from Python code is considerably faster than
+    indexing a NumPy array, while it is just as compact in memory.
+
+    Args:
+        typecode (str): typecode of the Python array
+        values (np.ndarray): values to copy
+
+    Returns:
+        array: Python array holding the values
+    """
+    flat = array(typecode)
+    flat.frombytes(
+        np.ascontiguousarray(values, dtype=np.dtype(typecode)).tobytes()
+    )
+    return flat
+
+
+class SearchEngine:
+    """Path searches on the tile ids of a HexGridCore.
+
+    The neighbor table is built once in CSR layout (indptr/indices). The
+    cost, parent and bookkeeping arrays are allocated once and reused by
+    every query: an entry only counts for the current query, if its stamp
+    matches the query's stamp, so nothing has to be cleared in between.
+    """
+
+    def __init__(self, core: HexGridCore) -> None:
+        """Builds the neighbor table and the search arrays for a grid.
+
+        Args:
+            core (HexGridCore): columnar storage of the grid
+        """
+        self.core = core
+        self.neighbor_table = core.neighbors
+        valid = self.neighbor_table >= 0
+        self.indptr = np.zeros(core.size + 1, dtype=np.int32)
+        np.cumsum(valid.sum(axis=1), out=self.indptr[1:])
+        self.indices = self.neighbor_table[valid].astype(np.int32)
+
+        self._indptr = _to_array("i", self.indptr)
+        self._indices = _to_array("i", self.indices)
+        self._cube_x = _to_array("i", core.cube_x)
+        self._cube_y = _to_array("i", core.cube_y)
+        self._cube_z = _to_array("i", core.cube_z)
+
+        self._cost = array("d", bytes(8 * core.size))
+        self._parent = array("i", bytes(4 * core.size))
+        self._seen = array("i", bytes(4 * core.size))
+        self._closed = array("i", bytes(4 * core.size))
+        # Second set for the backward half of bidirectional searches
+        self._backward_cost = array("d", bytes(8 * core.size))
+        self._backward_parent = array("i", bytes(4 * core.size))
+        self._backward_seen = array("i", bytes(4 * core.size))
+        self._backward_closed = array("i", bytes(4 * core.size))
+        self._stamp = 0
+        # Scratch space of _unique
+        self._scratch = np.empty(core.size, dtype=np.int64)
+        # Step distances of reachable_within, -1 outside of a query
+        self._steps = np.full(core.size, -1, dtype=np.int32)
+
+        # Number of tiles expanded by the last query
+        self.last_expansions = 0
+
+    def _next_stamp(self) -> int:
+        """Starts a new query.
+
+        Returns:
+            int: stamp of the new query
+        """
+        if self._stamp == np.iinfo(np.int32).max:
+            size = self.core.size
+            self._seen = array("i", bytes(4 * size))
+            self._closed = array("i", bytes(4 * size))
+            self._backward_seen = array("i", bytes(4 * size))
+            self._backward_closed = array("i", bytes(4 * size))
+            self._stamp = 0
+        self._stamp += 1
+        return self._stamp
+
+    def _unique(self, tile_ids: np.ndarray) -> np.ndarray:
+        """Removes duplicates from an array of tile ids without sorting.
+
+        Args:
+            tile_ids (np.ndarray): tile ids
+
+        Returns:
+            np.ndarray: tile ids, each only once
+        """
+        positions = np.arange(tile_ids.size)
+        self._scratch[tile_ids] = positions
+        return tile_ids[self._scratch[tile_ids] == positions]
+
+    def _reconstruct_path(self, start: int, end: int) -> List[int]:
+        """Walks the parent array back from the end to the start.
+
+        Args:
+            start (int): id of the start tile
+            end (int): id of the end tile
+
+        Returns:
+            List[int]: tile ids from start to end
+        """
+        parent = self._parent
+        path = [end]
+        current = end
+        while current != start:
+            current = parent[current]
+            path.append(current)
+        path.reverse()
+        return path
+
+    def breadth_first_search(self, start: int, end: int) -> List[int]:
+        """Calculates the path with the fewest moves between two tiles.
+
+        Uses the Breadth first search, which ignores movement costs.
+
+        Args:
+            start (int): id of the start tile
+            end (int): id of the end tile
+
+        Returns:
+            List[int]: tile ids that make up the path, empty if the end
+                       cannot be reached
+        """
+        stamp = self._next_stamp()
+        indptr, indices = self._indptr, self._indices
+        passable = memoryview(self.core.passable)
+        seen, parent = self._seen, self._parent
+
+        seen[start] = stamp
+        frontier = deque([start])
+        expansions = 0
+        while frontier:
+            current = frontier.popleft()
+            expansions += 1
+            # Early exit
+            if current == end:
+                self.last_expansions = expansions
+                return self._reconstruct_path(start, end)
+            first, last = indptr[current], indptr[current + 1]
+            for neighbor in indices[first:last]:
+                if seen[neighbor] != stamp and passable[neighbor]:
+                    seen[neighbor] = stamp
+                    parent[neighbor] = current
+                    frontier.append(neighbor)
+        self.last_expansions = expansions
+        return []
+
+    def dijkstras_algorithm(self, start: int, end: int) -> List[int]:
+        """Calculates the shortest path between two tiles.
+
+        Uses the Dijkstra's algorithm.
+
+        Args:
+            start (int): id of the start tile
+            end (int): id of the end tile
+
+        Returns:
+            List[int]: tile ids that make up the path, empty if the end
+                       cannot be reached
+        """
+        return self._best_first_search(start, end, use_heuristic=False)
+
+    def a_star(self, start: int, end: int) -> List[int]:
+        """Calculates the shortest path between two tiles.
+
+        Uses the A-Star algorithm.
+
+        Args:
+            start (int): id of the start tile
+            end (int): id of the end tile
+
+        Returns:
+            List[int]: tile ids that make up the path, empty if the end
+                       cannot be reached
+        """
+        return self._best_first_search(start, end, use_heuristic=True)
+
+    def _best_first_search(
+        self, start: int, end: int, use_heuristic: bool
+    ) -> List[int]:
+        """Shared implementation of Dijkstra's algorithm and A-Star.
+
+        The cost of a path is the sum of the movement costs of the tiles
+        moved onto.
+
+        Args:
+            start (int): id of the start tile
+            end (int): id of the end tile
+            use_heuristic (bool): True for A-Star, False for Dijkstra
+
+        Returns:
+            List[int]: tile ids that make up the path, empty if the end
+                       cannot be reached
+        """
+        stamp = self._next_stamp()
+        indptr, indices = self._indptr, self._indices
+        passable = memoryview(self.core.passable)
+        move_cost = memoryview(self.core.move_cost)
+        cost, parent = self._cost, self._parent
+        seen, closed = self._seen, self._closed
+        cube_x, cube_y, cube_z = self._cube_x, self._cube_y, self._cube_z
+        end_x, end_y, end_z = cube_x[end], cube_y[end], cube_z[end]
+        # Every move costs at least the lowest movement cost, so the
+        # scaled hex distance never overestimates.
+        heuristic_scale = self.core.min_move_cost
+
+        seen[start] = stamp
+        cost[start] = 0.0
+        frontier: List[Tuple[float, int]] = [(0.0, start)]
+        expansions = 0
+        while frontier:
+            current = heappop(frontier)[1]
+            if closed[current] == stamp:
+                continue
+            closed[current] = stamp
+            expansions += 1
+            # Early exit
+            if current == end:
+                self.last_expansions = expansions
+                return self._reconstruct_path(start, end)
+            current_cost = cost[current]
+            first, last = indptr[current], indptr[current + 1]
+            for neighbor in indices[first:last]:
+                if not passable[neighbor]:
+                    continue
+                new_cost = current_cost + move_cost[neighbor]
+                if seen[neighbor] != stamp or new_cost < cost[neighbor]:
+                    seen[neighbor] = stamp
+                    cost[neighbor] = new_cost
+                    parent[neighbor] = current
+                    priority = new_cost
+                    if use_heuristic:
+                        priority += heuristic_scale * max(
+                            abs(cube_x[neighbor] - end_x),
+                            abs(cube_y[neighbor] - end_y),
+                            abs(cube_z[neighbor] - end_z),
+                        )
+                    heappush(frontier, (priority, neighbor))
+        self.last_expansions = expansions
+        return []
+
+    def bidirectional_search(self, start: int, end: int) -> List[int]:
+        """Calculates the shortest path between two tiles.
+
+        Runs A-Star from the start and backwards from the end at once,
+        always advancing the side with the smaller frontier. Both sides use
+        the average of the distance towards the end and the distance from
+        the start as heuristic, which keeps them consistent with each
+        other, so the search can stop as soon as the sum of both frontier
+        minima reaches the cheapest path found where the sides met.
+
+        Args:
+            start (int): id of the start tile
+            end (int): id of the end tile
+
+        Returns:
+            List[int]: tile ids that make up the path, empty if the end
+                       cannot be reached
+        """
+        if start == end:
+            return [start]
+        passable = memoryview(self.core.passable)
+        if not passable[end]:
+            self.last_expansions = 0
+            return []
+        stamp = self._next_stamp()
+        indptr, indices = self._indptr, self._indices
+        move_cost = memoryview(self.core.move_cost)
+        cost, parent = self._cost, self._parent
+        seen, closed = self._seen, self._closed
+        backward_cost, backward_parent = (
+            self._backward_cost,
+            self._backward_parent,
+        )
+        backward_seen, backward_closed = (
+            self._backward_seen,
+            self._backward_closed,
+        )
+        cube_x, cube_y, cube_z = self._cube_x, self._cube_y, self._cube_z
+        start_x, start_y, start_z = (
+            cube_x[start],
+            cube_y[start],
+            cube_z[start],
+        )
+        end_x, end_y, end_z = cube_x[end], cube_y[end], cube_z[end]
+        scale = self.core.min_move_cost / 2
+
+        def potential(tile_id: int) -> float:
+            """Half the distance to the end minus half the distance to the
+            start."""
+            x, y, z = cube_x[tile_id], cube_y[tile_id], cube_z[tile_id]
+            return scale * (
+                max(abs(x - end_x), abs(y - end_y), abs(z - end_z))
+                - max(abs(x - start_x), abs(y - start_y), abs(z - start_z))
+            )
+
+        seen[start] = stamp
+        cost[start] = 0.0
+        backward_seen[end] = stamp
+        backward_cost[end] = 0.0
+        forward: List[Tuple[float, int]] = [(potential(start), start)]
+        backward: List[Tuple[float, int]] = [(-potential(end), end)]
+        best = float("inf")
+        meeting = -1
+        expansions = 0
+        while forward and backward:
+            if forward[0][0] + backward[0][0] >= best:
+                break
+            if len(forward) <= len(backward):
+                current = heappop(forward)[1]
+                if closed[current] == stamp:
+                    continue
+                closed[current] = stamp
+                expansions += 1
+                current_cost = cost[current]
+                first, last = indptr[current], indptr[current + 1]
+                for neighbor in indices[first:last]:
+                    if not passable[neighbor]:
+                        continue
+                    new_cost = current_cost + move_cost[neighbor]
+                    if (
+                        seen[neighbor] == stamp
+                        and new_cost >= cost[neighbor]
+                    ):
+                        continue
+                    seen[neighbor] = stamp
+                    cost[neighbor] = new_cost
+                    parent[neighbor] = current
+                    heappush(
+                        forward, (new_cost + potential(neighbor), neighbor)
+                    )
+                    if backward_seen[neighbor] == stamp:
+                        total = new_cost + backward_cost[neighbor]
+                        if total < best:
+                            best, meeting = total, neighbor
+            else:
+                current = heappop(backward)[1]
+                if backward_closed[current] == stamp:
+                    continue
+                backward_closed[current] = stamp
+                expansions += 1
+                # Moving from a neighbor onto the current tile
+                new_cost = backward_cost[current] + move_cost[current]
+                first, last = indptr[current], indptr[current + 1]
+                for neighbor in indices[first:last]:
+                    if not passable[neighbor] and neighbor != start:
+                        continue
+                    if (
+                        backward_seen[neighbor] == stamp
+                        and new_cost >= backward_cost[neighbor]
+                    ):
+                        continue
+                    backward_seen[neighbor] = stamp
+                    backward_cost[neighbor] = new_cost
+                    backward_parent[neighbor] = current
+                    heappush(
+                        backward,
+                        (new_cost - potential(neighbor), neighbor),
+                    )
+                    if seen[neighbor] == stamp:
+                        total = cost[neighbor] + new_cost
+                        if total < best:
+                            best, meeting = total, neighbor
+        self.last_expansions = expansions
+        if meeting < 0:
+            return []
+        path = self._reconstruct_path(start, meeting)
+        current = meeting
+        while current != end:
+            current = backward_parent[current]
+            path.append(current)
+        return path
+
+    def reachable_within(
+        self, start: int, steps: int
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Finds all tiles reachable from a tile within a number of moves.
+
+        Expands the whole frontier at once per move, using the neighbor
+        table.
+
+        Args:
+            start (int): id of the start tile
+            steps (int): maximum number of moves
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: ids of the reachable tiles
+                                           (including the start) and the
+                                           number of moves to each
+        """
+        distance = self._steps
+        passable = self.core.passable
+        distance[start] = 0
+        frontier = np.array([start], dtype=np.int32)
+        rings = [frontier]
+        for step in range(1, steps + 1):
+            candidates = self.neighbor_table[frontier].ravel()
+            candidates = candidates[candidates >= 0]
+            candidates = candidates[
+                passable[candidates] & (distance[candidates] < 0)
+            ]
+            frontier = np.unique(candidates)
+            if frontier.size == 0:
+                break
+            distance[frontier] = step
+            rings.append(frontier)
+        tile_ids = np.concatenate(rings)
+        distances = distance[tile_ids]
+        distance[tile_ids] = -1
+        return tile_ids, distances
+
+    def distance_field(
+        self,
+        sources: Sequence[int],
+        reverse: bool = False,
+        regions: Union[None, np.ndarray] = None,
+    ) -> np.ndarray:
+        """Calculates the path cost between a set of tiles and every tile.
+
+        Relaxes the edges of all pending tiles of the cheapest cost bucket
+        at once, until no cost improves anymore (a bucketed, vectorized
+        variant of Dijkstra's algorithm). With uniform movement costs this
+        is a multi-source breadth first search.
+
+        Args:
+            sources (Sequence[int]): ids of the source tiles
+            reverse (bool, optional): If True, the cost of moving from
+                                      every tile to the nearest source is
+                                      calculated instead of the cost of
+                                      moving from the sources to every
+                                      tile. Defaults to False.
+            regions (Union[None, np.ndarray], optional): Region id per
+                tile. If given, only moves between tiles of the same
+                region are allowed. Defaults to None.
+
+        Returns:
+            np.ndarray: path cost to/from the nearest source, inf for
+                        tiles that cannot be reached
+        """
+        distance = np.full(self.core.size, np.inf)
+        passable = self.core.passable
+        move_cost = self.core.move_cost
+        bucket_width = self.core.min_move_cost
+        pending = self._unique(np.asarray(sources, dtype=np.int32))
+        distance[pending] = 0
+        while pending.size > 0:
+            # Only the tiles in the cheapest bucket are relaxed, which
+            # keeps tiles from being improved over and over again.
+            pending_distance = distance[pending]
+            in_bucket = pending_distance <= (
+                pending_distance.min() + bucket_width
+            )
+            active, pending = pending[in_bucket], pending[~in_bucket]
+
+            neighbors = self.neighbor_table[active]
+            valid = neighbors >= 0
+            origins = np.broadcast_to(active[:, None], neighbors.shape)[
+                valid
+            ]
+            neighbors = neighbors[valid]
+            valid = passable[neighbors]
+            if regions is not None:
+                valid &= regions[neighbors] == regions[origins]
+            origins, neighbors = origins[valid], neighbors[valid]
+            if reverse:
+                # Moving from the neighbor onto the active tile
+                candidates = distance[origins] + move_cost[origins]
+            else:
+                candidates = distance[origins] + move_cost[neighbors]
+            improved = candidates < distance[neighbors]
+            neighbors, candidates = (
+                neighbors[improved],
+                candidates[improved],
+            )
+            pending = self._unique(np.concatenate((pending, neighbors)))
+            # A tile may have several candidates, of which an arbitrary
+            # one is assigned. Repeat with the cheaper ones left over.
+            while neighbors.size > 0:
+                distance[neighbors] = candidates
+                cheaper = candidates < distance[neighbors]
+                neighbors, candidates = (
+                    neighbors[cheaper],
+                    candidates[cheaper],
+                )
+        return distance
+
+    def flow_field(self, targets: Sequence[int]) -> FlowField:
+        """Calculates the flow field towards a set of destination tiles.
+
+        Args:
+            targets (Sequence[int]): ids of the destination tiles
+
+        Returns:
+            FlowField: distances and next hops towards the destination
+        """
+        distance = self.distance_field(sources=targets, reverse=True)
+        next_hop = np.full(self.core.size, -1, dtype=np.int32)
+        moving = np.flatnonzero(np.isfinite(distance) & (distance > 0))
+        neighbors = self.neighbor_table[moving]
+        neighbor_distance = np.where(
+            neighbors >= 0,
+            distance[neighbors] + self.core.move_cost[neighbors],
+            np.inf,
+        )
+        next_hop[moving] = neighbors[
+            np.arange(moving.size), np.argmin(neighbor_distance, axis=1)
+        ]
+        return FlowField(
+            targets=targets,
+            distance=distance,
+            next_hop=next_hop,
+            version=self.core.version,
+        )
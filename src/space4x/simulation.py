@@ -0,0 +1,586 @@
+import time
+from typing import Dict, List, NamedTuple, Sequence, Union
+
+import numpy as np  # type: ignore
+
+import space4x.constants
+from space4x.chunked_world import Chunk, ChunkKey, ChunkedWorld
+from space4x.hex_grid_core import HexGridCore
+from space4x.incremental_planner import IncrementalPlanner
+from space4x.path_service import PathService
+from space4x.star_data import generate_stars, mine_stars
+
+
+class StreamedChunks(NamedTuple):
+    """The changes to the grid made by streaming the world."""
+
+    # Tiles that got a star
+    added_tile_ids: np.ndarray
+    # Stars that were removed, their ids may already be reused by added
+    # stars
+    removed_star_ids: np.ndarray
+    # Tiles of the chunks that are no longer kept around any position
+    dropped_tile_ids: np.ndarray
+
+
+class Simulation:
+    """The game without a window: grid, stars, ships and the tick loop.
+
+    Nothing in here depends on arcade, the state is kept in the grid core,
+    NumPy columns and lists of tile ids. The game runs on a Simulation as
+    well, its Spaceship and StarField only show the state kept here. Ships
+    move one hex every 1 / space_ship_speed seconds and repair their paths
+    when the grid changes.
+
+    The stars either cover the whole grid from the start, or are streamed
+    from a ChunkedWorld: only the stars of the chunks around the camera and
+    the ships are placed on the grid. Searches treat the rest of the grid
+    as empty space, and the paths of the ships are repaired as chunks are
+    placed on the grid in front of them.
+    """
+
+    def __init__(
+        self,
+        dim_x: int = space4x.constants.hex_grid_dim_x,
+        dim_y: int = space4x.constants.hex_grid_dim_y,
+        seed: Union[None, int] = None,
+        core: Union[None, HexGridCore] = None,
+        star_columns: Union[None, Dict[str, np.ndarray]] = None,
+        world: Union[None, ChunkedWorld] = None,
+    ) -> None:
+        """Creates a grid and the stars on it.
+
+        Args:
+            dim_x (int, optional): Number of columns.
+                Defaults to constants.hex_grid_dim_x.
+            dim_y (int, optional): Number of rows.
+                Defaults to constants.hex_grid_dim_y.
+            seed (Union[None, int], optional): Seed of the random
+                generator, the same seed runs the same simulation.
+                Defaults to None, which runs a different one each time.
+            core (Union[None, HexGridCore], optional): Existing tiles, e.g.
+                of a loaded game. Defaults to None, which creates a new
+                grid of dim_x times dim_y tiles.
+            star_columns (Union[None, Dict[str, np.ndarray]], optional):
+                Columns of existing stars, see star_columns, whose star
+                ids are already stored in the core. Defaults to None,
+                which creates new stars.
+            world (Union[None, ChunkedWorld], optional): World to stream
+                the stars from, see stream. The star columns then have a
+                row for every star the loaded chunks can hold, rows with a
+                tile id of -1 are free. Defaults to None, which places
+                stars on the whole grid.
+        """
+        self.seed = seed
+        self.rng = np.random.default_rng(seed)
+        if core is None:
+            core = HexGridCore(dim_x=dim_x, dim_y=dim_y)
+        self.core = core
+        self.path_service = PathService(core)
+        self.world = world
+        # Ids of the stars placed on the grid per chunk of the world
+        self._chunk_stars: Dict[ChunkKey, np.ndarray] = dict()
+        # Chunks of the positions of the latest stream
+        self._streamed: List[ChunkKey] = []
+        # Free rows of the star columns, taken from the end
+        self._free_star_ids: List[int] = []
+        self.peak_chunks = 0
+
+        if star_columns is None and world is not None:
+            capacity = world.max_chunks * world.stars_per_chunk
+            self.star_tile_ids = np.full(capacity, -1, dtype=np.int32)
+            self.star_names = np.zeros(capacity, dtype="S5")
+            self.star_resources = np.zeros(
+                (capacity, len(space4x.constants.star_resource_types)),
+                dtype=np.int64,
+            )
+            self.star_timer = np.zeros(capacity, dtype=np.float64)
+        elif star_columns is None:
+            number_of_stars = int(
+                space4x.constants.star_to_hex_ratio * self.core.size
+            )
+            self.star_tile_ids, self.star_names, self.star_resources = (
+                generate_stars(
+                    rng=self.rng,
+                    number_of_tiles=self.core.size,
+                    number_of_stars=number_of_stars,
+                    number_of_resource_types=len(
+                        space4x.constants.star_resource_types
+                    ),
+                )
+            )
+            self.star_timer = np.zeros(number_of_stars, dtype=np.float64)
+            self.core.set_stars(
+                tile_ids=self.star_tile_ids,
+                star_ids=np.arange(number_of_stars, dtype=np.int32),
+            )
+        else:
+            self.star_tile_ids = star_columns["tile_ids"]
+            self.star_names = star_columns["names"]
+            self.star_timer = star_columns["timer"]
+            self.star_resources = star_columns["resources"]
+        if world is not None:
+            # Saved names of a grid without stars are narrower
+            self.star_names = self.star_names.astype("S5", copy=False)
+            used = np.flatnonzero(self.star_tile_ids >= 0)
+            tile_ids = self.star_tile_ids[used]
+            chunk_x = self.core.offset_x[tile_ids] // world.chunk_size
+            chunk_y = self.core.offset_y[tile_ids] // world.chunk_size
+            for key in set(zip(chunk_x.tolist(), chunk_y.tolist())):
+                self._chunk_stars[key] = used[
+                    (chunk_x == key[0]) & (chunk_y == key[1])
+                ].astype(np.int32)
+            self._free_star_ids = np.flatnonzero(self.star_tile_ids < 0)[
+                ::-1
+            ].tolist()
+
+        # Tile, remaining path (without the current tile), target tile,
+        # timer and planner of every ship, indexed by ship id
+        self.ship_tiles: List[int] = []
+        self.ship_paths: List[List[int]] = []
+        self.ship_goals: List[int] = []
+        self.ship_timers: List[float] = []
+        self.ship_planners: List[Union[None, IncrementalPlanner]] = []
+        self._ship_versions: List[int] = []
+
+        self.ticks = 0
+        self.elapsed_time = 0.0
+        # Number of hexes moved by all ships
+        self.moves = 0
+
+    @property
+    def star_columns(self) -> Dict[str, np.ndarray]:
+        """Columns of the stars, indexed by star id.
+
+        The StarField of the game shows these columns, the stars are mined
+        in them by tick.
+
+        Returns:
+            Dict[str, np.ndarray]: "tile_ids", "names", "timer" and
+                                   "resources"
+        """
+        return {
+            "tile_ids": self.star_tile_ids,
+            "names": self.star_names,
+            "timer": self.star_timer,
+            "resources": self.star_resources,
+        }
+
+    @property
+    def number_of_ships(self) -> int:
+        """Number of ships.
+
+        Returns:
+            int: Number of ships
+        """
+        return len(self.ship_tiles)
+
+    def add_ship(self, tile_id: int) -> int:
+        """Places a new ship on a tile.
+
+        Args:
+            tile_id (int): id of the tile
+
+        Returns:
+            int: id of the ship
+        """
+        self.ship_tiles.append(tile_id)
+        self.ship_paths.append([])
+        self.ship_goals.append(tile_id)
+        self.ship_timers.append(0.0)
+        self.ship_planners.append(None)
+        self._ship_versions.append(self.core.version)
+        return len(self.ship_tiles) - 1
+
+    def set_path(self, ship: int, path: Sequence[int]) -> None:
+        """Sets the path for a ship to follow.
+
+        A planner, which repairs the path incrementally, is only created
+        once the grid changes while the ship follows it.
+
+        Args:
+            ship (int): id of the ship
+            path (Sequence[int]): tile ids to move onto, may start with the
+                                  tile of the ship, like found paths do
+        """
+        remaining = list(path)
+        if len(remaining) > 0 and remaining[0] == self.ship_tiles[ship]:
+            remaining.pop(0)
+        self.ship_paths[ship] = remaining
+        self.ship_goals[ship] = (
+            remaining[-1] if len(remaining) > 0 else self.ship_tiles[ship]
+        )
+        self.ship_planners[ship] = None
+        self._ship_versions[ship] = self.core.version
+
+    def send_ship(self, ship: int, goal: int) -> bool:
+        """Sends a ship to a tile.
+
+        The path is found with A-Star, see set_path.
+
+        Args:
+            ship (int): id of the ship
+            goal (int): id of the target tile
+
+        Returns:
+            bool: True, if the target can be reached.
+        """
+        path = self.path_service.find_path(
+            algorithm="a_star", start=self.ship_tiles[ship], end=goal
+        )
+        self.set_path(ship=ship, path=path)
+        return len(path) > 0
+
+    def _replan(self, ship: int) -> None:
+        """Repairs the path of a ship after the grid changed.
+
+        A planner starts over after many changes, e.g. a streamed chunk,
+        the path is then searched again with A-Star, which is faster.
+
+        Args:
+            ship (int): id of the ship
+        """
+        changes = self.core.changes_since(self._ship_versions[ship])
+        self._ship_versions[ship] = self.core.version
+        if (
+            changes is None
+            or len(changes) > space4x.constants.incremental_replan_limit
+        ):
+            self.ship_planners[ship] = None
+            found = self.path_service.find_path(
+                algorithm="a_star",
+                start=self.ship_tiles[ship],
+                end=self.ship_goals[ship],
+            )
+            self.ship_paths[ship] = list(found[1:])
+            return
+        planner = self.ship_planners[ship]
+        if planner is None:
+            planner = self.path_service.incremental_planner(
+                start=self.ship_tiles[ship], end=self.ship_goals[ship]
+            )
+            self.ship_planners[ship] = planner
+        else:
+            planner.move_to(self.ship_tiles[ship])
+        path = planner.path()
+        self.ship_paths[ship] = path[1:]
+        if len(path) <= 1:
+            self.ship_planners[ship] = None
+
+    def _local_tiles(
+        self, chunk: Chunk, star_ids: np.ndarray
+    ) -> np.ndarray:
+        """Returns the ids of the tiles of stars within their chunk.
+
+        Args:
+            chunk (Chunk): chunk of the stars
+            star_ids (np.ndarray): ids of stars on the grid
+
+        Returns:
+            np.ndarray: local tile ids, see Chunk
+        """
+        tile_ids = self.star_tile_ids[star_ids]
+        origin_x, origin_y = chunk.origin
+        return (self.core.offset_x[tile_ids] - origin_x) * chunk.size + (
+            self.core.offset_y[tile_ids] - origin_y
+        )
+
+    def _store_chunk_stars(self) -> None:
+        """Writes the state of the stars on the grid back to their chunks.
+
+        A chunk is marked dirty, once its stars were mined.
+        """
+        world: ChunkedWorld = self.world  # type: ignore
+        for chunk in world:
+            star_ids = self._chunk_stars.get(
+                (chunk.chunk_x, chunk.chunk_y)
+            )
+            if star_ids is None or len(star_ids) == 0:
+                continue
+            rows = chunk.star_id[self._local_tiles(chunk, star_ids)]
+            resources = self.star_resources[star_ids]
+            if not np.array_equal(chunk.resources[rows], resources):
+                chunk.resources[rows] = resources
+                chunk.dirty = True
+            chunk.timer[rows] = self.star_timer[star_ids]
+
+    def _place_chunk_stars(self, chunk: Chunk) -> np.ndarray:
+        """Copies the stars of a chunk on the grid into free rows.
+
+        Args:
+            chunk (Chunk): chunk loaded by the world
+
+        Returns:
+            np.ndarray: ids of the new stars
+        """
+        star_x, star_y = chunk.star_offsets()
+        tile_ids = self.core.tile_ids_from_offset(x=star_x, y=star_y)
+        # A ship on the tile of a star would be stuck, the star is left out
+        rows = np.flatnonzero(
+            (tile_ids >= 0) & ~np.isin(tile_ids, self.ship_tiles)
+        )
+        star_ids = np.array(
+            [self._free_star_ids.pop() for _ in range(len(rows))],
+            dtype=np.int32,
+        )
+        self.star_tile_ids[star_ids] = tile_ids[rows]
+        self.star_names[star_ids] = chunk.names[rows]
+        self.star_resources[star_ids] = chunk.resources[rows]
+        self.star_timer[star_ids] = chunk.timer[rows]
+        self._chunk_stars[(chunk.chunk_x, chunk.chunk_y)] = star_ids
+        return star_ids
+
+    def _chunk_tiles(self, key: ChunkKey) -> np.ndarray:
+        """Returns the ids of the tiles of a chunk that are on the grid.
+
+        Args:
+            key (ChunkKey): chunk coordinate
+
+        Returns:
+            np.ndarray: tile ids
+        """
+        size = self.world.chunk_size  # type: ignore
+        columns, rows = np.divmod(np.arange(size * size), size)
+        tile_ids = self.core.tile_ids_from_offset(
+            x=columns + key[0] * size, y=rows + key[1] * size
+        )
+        return tile_ids[tile_ids >= 0]
+
+    def stream(
+        self,
+        tile_ids: Sequence[int],
+        radius: int = space4x.constants.world_load_radius,
+    ) -> Union[None, StreamedChunks]:
+        """Keeps the stars around the camera and the ships on the grid.
+
+        Meant to be called every frame, the world is only streamed once a
+        position moved into another chunk. The stars of newly loaded chunks
+        are placed on the grid, the stars of evicted chunks are removed,
+        after their state was written back to the chunks.
+
+        Args:
+            tile_ids (Sequence[int]): tiles of the camera and the ships,
+                                      -1 is skipped
+            radius (int, optional): Number of hexes around a position.
+                Defaults to constants.world_load_radius.
+
+        Returns:
+            Union[None, StreamedChunks]: changes to the grid or None, if
+                                         the world was not streamed
+        """
+        world: ChunkedWorld = self.world  # type: ignore
+        positions = [
+            (
+                int(self.core.offset_x[tile_id]),
+                int(self.core.offset_y[tile_id]),
+            )
+            for tile_id in tile_ids
+            if tile_id >= 0
+        ]
+        chunks = [world.chunk_of(x, y) for x, y in positions]
+        if chunks == self._streamed:
+            return None
+        self._streamed = chunks
+        self._store_chunk_stars()
+        world.stream(positions, radius=radius)
+        self.peak_chunks = max(self.peak_chunks, len(world))
+
+        loaded = {(chunk.chunk_x, chunk.chunk_y): chunk for chunk in world}
+        dropped = [key for key in self._chunk_stars if key not in loaded]
+        removed = [self._chunk_stars.pop(key) for key in dropped]
+        removed_star_ids = np.concatenate(
+            [np.zeros(0, dtype=np.int32)] + removed
+        )
+        if len(removed_star_ids) > 0:
+            self.core.remove_stars(self.star_tile_ids[removed_star_ids])
+            self.star_tile_ids[removed_star_ids] = -1
+            self._free_star_ids.extend(removed_star_ids[::-1].tolist())
+        added_star_ids = np.concatenate(
+            [np.zeros(0, dtype=np.int32)]
+            + [
+                self._place_chunk_stars(chunk)
+                for key, chunk in loaded.items()
+                if key not in self._chunk_stars
+            ]
+        )
+        added_tile_ids = self.star_tile_ids[added_star_ids]
+        if len(added_tile_ids) > 0:
+            self.core.set_stars(
+                tile_ids=added_tile_ids, star_ids=added_star_ids
+            )
+        return StreamedChunks(
+            added_tile_ids=added_tile_ids,
+            removed_star_ids=removed_star_ids,
+            dropped_tile_ids=np.concatenate(
+                [np.zeros(0, dtype=np.int32)]
+                + [self._chunk_tiles(key) for key in dropped]
+            ),
+        )
+
+    def tick(self, delta_time: float = 1 / 60) -> None:
+        """Advances the simulation.
+
+        Every star is mined once a second. A ship, whose time has come,
+        repairs its path if the grid changed and moves onto the next tile
+        of it.
+
+        Args:
+            delta_time (float, optional): Time elapsed since last call.
+                                          Defaults to 1/60.
+        """
+        mine_stars(
+            timer=self.star_timer,
+            resources=self.star_resources,
+            delta_time=delta_time,
+        )
+        move_time = 1 / space4x.constants.space_ship_speed
+        version = self.core.version
+        for ship in range(len(self.ship_tiles)):
+            self.ship_timers[ship] += delta_time
+            if not self.ship_timers[ship] > move_time:
+                continue
+            self.ship_timers[ship] = 0.0
+            path = self.ship_paths[ship]
+            if len(path) > 0 and self._ship_versions[ship] != version:
+                self._replan(ship)
+                path = self.ship_paths[ship]
+            if len(path) > 0:
+                self.ship_tiles[ship] = path.pop(0)
+                self.moves += 1
+                if len(path) == 0:
+                    self.ship_planners[ship] = None
+        self.ticks += 1
+        self.elapsed_time += delta_time
+
+    def random_passable_tile(self) -> int:
+        """Draws a random passable tile.
+
+        Returns:
+            int: id of the tile
+        """
+        passable = np.flatnonzero(self.core.passable)
+        return int(passable[self.rng.integers(len(passable))])
+
+
+def _run(
+    simulation: Simulation,
+    ticks: int,
+    ships: int,
+    delta_time: float,
+) -> Dict[str, float]:
+    """Runs a simulation, ships are sent on when they arrive.
+
+    Ships start on random tiles and are sent to a new random tile
+    whenever they have arrived. If the stars are streamed, they are
+    streamed around the ships before every tick.
+
+    Args:
+        simulation (Simulation): simulation to run
+        ticks (int): number of ticks to simulate
+        ships (int): Number of ships
+        delta_time (float): Simulated time per tick
+
+    Returns:
+        Dict[str, float]: statistics of the run
+    """
+    for _ in range(ships):
+        simulation.add_ship(simulation.random_passable_tile())
+
+    start_time = time.perf_counter()
+    for _ in range(ticks):
+        if simulation.world is not None:
+            simulation.stream(simulation.ship_tiles)
+        for ship in range(simulation.number_of_ships):
+            if len(simulation.ship_paths[ship]) == 0:
+                simulation.send_ship(
+                    ship=ship, goal=simulation.random_passable_tile()
+                )
+        simulation.tick(delta_time)
+    wall_time = time.perf_counter() - start_time
+
+    return {
+        "ticks": simulation.ticks,
+        "simulated_seconds": simulation.elapsed_time,
+        "wall_seconds": wall_time,
+        "ticks_per_second": (
+            simulation.ticks / wall_time if wall_time > 0 else float("inf")
+        ),
+        "ships": simulation.number_of_ships,
+        "moves": simulation.moves,
+        "stars": int(np.count_nonzero(simulation.star_tile_ids >= 0)),
+        "resources_left": int(simulation.star_resources.sum()),
+    }
+
+
+def run_headless(
+    ticks: int,
+    seed: Union[None, int] = None,
+    ships: int = space4x.constants.headless_ships,
+    delta_time: float = 1 / 60,
+) -> Dict[str, float]:
+    """Runs a simulation without a window.
+
+    Args:
+        ticks (int): number of ticks to simulate
+        seed (Union[None, int], optional): Seed of the random generator.
+            Defaults to None.
+        ships (int, optional): Number of ships.
+            Defaults to constants.headless_ships.
+        delta_time (float, optional): Simulated time per tick.
+            Defaults to 1/60.
+
+    Returns:
+        Dict[str, float]: statistics of the run
+    """
+    return _run(
+        simulation=Simulation(seed=seed),
+        ticks=ticks,
+        ships=ships,
+        delta_time=delta_time,
+    )
+
+
+def run_world(
+    ticks: int,
+    seed: Union[None, int] = None,
+    ships: int = space4x.constants.headless_ships,
+    delta_time: float = 1 / 60,
+) -> Dict[str, float]:
+    """Runs a simulation, whose stars are streamed, without a window.
+
+    Uses the grid size of the game, see constants.world_grid_dim_x.
+
+    Args:
+        ticks (int): number of ticks to simulate
+        seed (Union[None, int], optional): World seed. Defaults to None,
+                                           which uses 0.
+        ships (int, optional): Number of ships.
+            Defaults to constants.headless_ships.
+        delta_time (float, optional): Simulated time per tick.
+            Defaults to 1/60.
+
+    Returns:
+        Dict[str, float]: statistics of the run
+    """
+    world = ChunkedWorld(seed=seed or 0)
+    simulation = Simulation(
+        dim_x=space4x.constants.world_grid_dim_x,
+        dim_y=space4x.constants.world_grid_dim_y,
+        seed=seed,
+        world=world,
+    )
+    statistics = _run(
+        simulation=simulation,
+        ticks=ticks,
+        ships=ships,
+        delta_time=delta_time,
+    )
+    statistics.update(
+        {
+            "chunks_generated": world.chunks_generated,
+            "chunks_in_memory": len(world),
+            "peak_chunks": simulation.peak_chunks,
+            "world_bytes": world.nbytes,
+        }
+    )
+    return statistics
@@ -1,43 +1,89 @@
 import math
-from typing import List
+from typing import List, Set
 
 import arcade  # type: ignore
 
 import space4x.constants
 import space4x.resources
 from space4x.hex_grid import HexGrid, HexTile
+from space4x.simulation import Simulation
 
 
 class Spaceship(arcade.Sprite):
-    """A basic starship."""
+    """A basic starship.
 
-    def __init__(self, hex_grid: HexGrid, x: int, y: int) -> None:
-        """Creates a starship at a given offset coordinate.
+    The sprite shows a ship of the Simulation, which moves it along its
+    path. The hexes of the remaining path are highlighted.
+    """
+
+    def __init__(
+        self, hex_grid: HexGrid, simulation: Simulation, ship: int
+    ) -> None:
+        """Creates the sprite of a ship of the simulation.
 
         Args:
             hex_grid (HexGrid): hex grid of the game.
-            x (int): x Coordinate (offset)
-            y (int): y Coordinate (offset)
+            simulation (Simulation): simulation moving the ship
+            ship (int): id of the ship in the simulation
         """
         super().__init__(
             filename=space4x.resources.space_ship_img,
             scale=space4x.constants.space_ship_img_scale,
         )
         self.hex_grid = hex_grid
-        hex_tile: HexTile = self.hex_grid.get_Tile_by_xy(
-            x=x, y=y
-        )  # type: ignore
+        self.simulation = simulation
+        self.ship = ship
+        self.tile_id = simulation.ship_tiles[ship]
+        self._place(hex_grid.get_Tile_by_id(self.tile_id))
+        # Tile ids of the highlighted path
+        self._marked: Set[int] = set()
+
+    @property
+    def path(self) -> List[HexTile]:
+        """HexTiles the ship still moves onto, without its current one."""
+        return [
+            self.hex_grid.get_Tile_by_id(tile_id)
+            for tile_id in self.simulation.ship_paths[self.ship]
+        ]
+
+    @property
+    def timer(self) -> float:
+        """Time since the ship last moved."""
+        return self.simulation.ship_timers[self.ship]
+
+    @timer.setter
+    def timer(self, timer: float) -> None:
+        self.simulation.ship_timers[self.ship] = timer
+
+    def _place(self, hex_tile: HexTile) -> None:
+        """Moves the sprite onto a HexTile.
+
+        Args:
+            hex_tile (HexTile): new position
+        """
         self.offset_coordinate = hex_tile.offset_coordinate
         self.cube_coordinate = hex_tile.cube_coordinate
         self.center_x = hex_tile.center_x
         self.center_y = hex_tile.center_y
-        self.path: List[HexTile] = []
-        self.timer: float = 0
+
+    def _mark_path(self) -> None:
+        """Highlights the remaining path, only changed hexes are touched."""
+        path = set(self.simulation.ship_paths[self.ship])
+        for tile_id in self._marked - path:
+            self.hex_grid.set_highlighted(
+                tile_id=tile_id, highlighted=False
+            )
+        for tile_id in path - self._marked:
+            self.hex_grid.set_highlighted(
+                tile_id=tile_id, highlighted=True
+            )
+        self._marked = path
 
     def update(self, delta_time: float = 1 / 60) -> None:
         """Updates the status of the spaceship.
 
-        Such as position, angle, etc.
+        Such as position, angle, etc. The ship is moved by the simulation,
+        the sprite follows it and turns towards the hex it moved onto.
 
         Args:
             delta_time (float, optional): Time elapsed since last call.
@@ -45,20 +91,9 @@ class Spaceship(arcade.Sprite):
         """
         super().update()
 
-        self.timer += delta_time
-        if not self.timer > 1 / space4x.constants.space_ship_speed:
-            return
-
-        self.timer = 0
-
-        if not len(self.path) == 0:
-            current_target: HexTile = self.path[0]
-            if (current_target.center_x == self.center_x) and (
-                current_target.center_y == self.center_y
-            ):
-                self.path.pop(0)
-                return
-            current_target.set_texture(0)
+        tile_id = self.simulation.ship_tiles[self.ship]
+        if tile_id != self.tile_id:
+            current_target = self.hex_grid.get_Tile_by_id(tile_id)
             self.angle = (
                 math.atan2(
                     self.center_y - current_target.center_y,
@@ -68,15 +103,20 @@ class Spaceship(arcade.Sprite):
                 / math.pi
                 + 90
             )
-            self.offset_coordinate = current_target.offset_coordinate
-            self.cube_coordinate = current_target.cube_coordinate
-            self.center_x = current_target.center_x
-            self.center_y = current_target.center_y
+            self.tile_id = tile_id
+            self._place(current_target)
+        self._mark_path()
 
     def set_path(self, path: List[HexTile]) -> None:
         """Sets the path for the spaceship to follow.
 
+        The path is repaired by the simulation when the grid changes.
+
         Args:
-            path (List[HexTile]): Path to follow
+            path (List[HexTile]): Path to follow, may start with the hex of
+                                  the spaceship
         """
-        self.path = path
+        self.simulation.set_path(
+            ship=self.ship, path=[hex_tile.tile_id for hex_tile in path]
+        )
+        self._mark_path()
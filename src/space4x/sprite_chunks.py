@@ -0,0 +1,396 @@
+import math
+from collections import OrderedDict
+from itertools import chain
+from typing import Dict, Iterator, Set, Union
+
+import arcade  # type: ignore
+from arcade.gl import geometry  # type: ignore
+
+import numpy as np  # type: ignore
+
+from pyglet import gl  # type: ignore
+
+import space4x.constants
+from space4x.hex_grid_core import HexGridCore
+
+# Draws a cached chunk texture as a quad in world coordinates, using the
+# projection of the camera
+_vertex_shader = """
+#version 330
+
+uniform Projection {
+    uniform mat4 matrix;
+} proj;
+
+in vec2 in_vert;
+in vec2 in_uv;
+out vec2 v_uv;
+
+void main() {
+    gl_Position = proj.matrix * vec4(in_vert, 0.0, 1.0);
+    v_uv = in_uv;
+}
+"""
+_fragment_shader = """
+#version 330
+
+uniform sampler2D texture0;
+
+in vec2 v_uv;
+out vec4 f_color;
+
+void main() {
+    f_color = texture(texture0, v_uv);
+}
+"""
+
+
+class _CachedChunk:
+    """Offscreen texture holding the rendered sprites of one chunk."""
+
+    def __init__(
+        self,
+        ctx: arcade.ArcadeContext,
+        left: float,
+        bottom: float,
+        right: float,
+        top: float,
+    ) -> None:
+        """Allocates the texture and the quad it is drawn with.
+
+        Args:
+            ctx (arcade.ArcadeContext): OpenGL context of the window
+            left (float): left border of the chunk (pixel)
+            bottom (float): bottom border of the chunk (pixel)
+            right (float): right border of the chunk (pixel)
+            top (float): top border of the chunk (pixel)
+        """
+        width = math.ceil(right - left)
+        height = math.ceil(top - bottom)
+        # World rectangle covered by the texture, one texel per pixel
+        self.projection = (left, left + width, bottom, bottom + height)
+        self.texture = ctx.texture(
+            (width, height),
+            components=4,
+            filter=(ctx.NEAREST, ctx.NEAREST),
+        )
+        self.framebuffer = ctx.framebuffer(
+            color_attachments=[self.texture]
+        )
+        self.quad = geometry.quad_2d(
+            size=(width, height),
+            pos=(left + width / 2, bottom + height / 2),
+        )
+
+    def render(
+        self, ctx: arcade.ArcadeContext, sprite_list: arcade.SpriteList
+    ) -> None:
+        """Renders the sprites of the chunk into the texture.
+
+        The texture holds premultiplied colors, so it has to be drawn with
+        the blend function (ONE, ONE_MINUS_SRC_ALPHA). The sprites are
+        blended as usual into the color channels and drawn a second time
+        into the alpha channel only, where their coverage adds up. A
+        single pass would multiply the alpha channel by itself.
+
+        Args:
+            ctx (arcade.ArcadeContext): OpenGL context of the window
+            sprite_list (arcade.SpriteList): sprites of the chunk
+        """
+        framebuffer = ctx.active_framebuffer
+        projection = ctx.projection_2d
+        # Binds and unbinds the framebuffer itself, within a with block
+        # it would restore this framebuffer instead of the previous one
+        self.framebuffer.clear()
+        self.framebuffer.use()
+        ctx.projection_2d = self.projection
+        gl.glColorMask(True, True, True, False)
+        sprite_list.draw()
+        gl.glColorMask(False, False, False, True)
+        sprite_list.draw(blend_function=(ctx.ONE, ctx.ONE_MINUS_SRC_ALPHA))
+        gl.glColorMask(True, True, True, True)
+        framebuffer.use()
+        ctx.projection_2d = projection
+
+
+class SpriteChunks:
+    """Sprites on the hex grid, split into square chunks of hexes.
+
+    Every chunk has its own sprite list. Only the chunks whose bounds
+    intersect the viewport are drawn, so the cost of drawing depends on
+    the area of the screen, not on the size of the map.
+
+    The sprites of a chunk are rendered once into an offscreen texture,
+    which is drawn as a single quad afterwards. A chunk is only rendered
+    again when it is marked dirty, e.g. because a sprite was added to it.
+    The textures of the chunks drawn least recently are dropped once more
+    than cache_size of them exist. If more chunks are visible, the ones
+    beyond cache_size are drawn directly instead of replacing textures
+    every frame.
+    """
+
+    def __init__(
+        self,
+        core: HexGridCore,
+        chunk_size: int = space4x.constants.render_chunk_size,
+        cache_size: int = space4x.constants.render_cache_size,
+    ) -> None:
+        """Divides a grid into chunks.
+
+        Args:
+            core (HexGridCore): columnar storage of the grid
+            chunk_size (int, optional): Width and height of a chunk in
+                hexes. Defaults to constants.render_chunk_size.
+            cache_size (int, optional): Number of chunk textures kept,
+                0 draws the sprite lists directly every frame.
+                Defaults to constants.render_cache_size.
+        """
+        self.core = core
+        self.chunk_size = chunk_size
+        self.cache_size = cache_size
+        self.chunks_x = -(-core.dim_x // chunk_size)
+        self.chunks_y = -(-core.dim_y // chunk_size)
+
+        # Offset coordinates of the first and last hexes of every chunk
+        chunk_x, chunk_y = np.divmod(
+            np.arange(self.chunks_x * self.chunks_y), self.chunks_y
+        )
+        first_x = core.min_x + chunk_x * chunk_size
+        first_y = core.min_y + chunk_y * chunk_size
+        last_x = (
+            np.minimum(first_x + chunk_size, core.min_x + core.dim_x) - 1
+        )
+        last_y = (
+            np.minimum(first_y + chunk_size, core.min_y + core.dim_y) - 1
+        )
+        self._first = (first_x, first_y)
+        self._last = (last_x, last_y)
+        # Pixel bounds of every chunk, one step of slack on every side
+        # covers the hexagons around the centers and the row shift
+        origin = space4x.constants.hex_grid_origin_offset
+        self.left = first_x * core.column_step - core.column_step
+        self.right = (
+            last_x * core.column_step
+            + core.even_row_shift
+            + core.column_step
+        )
+        self.top = origin - first_y * core.row_step + core.row_step
+        self.bottom = origin - last_y * core.row_step - core.row_step
+
+        self._lists: Dict[int, arcade.SpriteList] = dict()
+        # Chunks whose sprites have all been created
+        self.populated: Set[int] = set()
+        # Chunks whose cached texture is out of date
+        self.dirty: Set[int] = set()
+        self._cache: OrderedDict[int, _CachedChunk] = OrderedDict()
+        # Created on the first draw, when the window exists
+        self._ctx: Union[None, arcade.ArcadeContext] = None
+        self._program: Union[None, arcade.gl.Program] = None
+
+    def chunk_of(self, tile_id: int) -> int:
+        """Returns the chunk containing a tile.
+
+        Args:
+            tile_id (int): id of the tile
+
+        Returns:
+            int: id of the chunk
+        """
+        column, row = divmod(tile_id, self.core.dim_y)
+        return (column // self.chunk_size) * self.chunks_y + (
+            row // self.chunk_size
+        )
+
+    def tile_ids(self, chunk: int) -> np.ndarray:
+        """Returns the ids of all tiles of a chunk.
+
+        Args:
+            chunk (int): id of the chunk
+
+        Returns:
+            np.ndarray: tile ids
+        """
+        core = self.core
+        columns = np.arange(
+            self._first[0][chunk] - core.min_x,
+            self._last[0][chunk] - core.min_x + 1,
+        )
+        rows = np.arange(
+            self._first[1][chunk] - core.min_y,
+            self._last[1][chunk] - core.min_y + 1,
+        )
+        return (columns[:, None] * core.dim_y + rows[None, :]).ravel()
+
+    def chunks_in_rect(
+        self, left: float, bottom: float, width: float, height: float
+    ) -> np.ndarray:
+        """Returns the chunks intersecting a rectangle.
+
+        Args:
+            left (float): left border (pixel)
+            bottom (float): bottom border (pixel)
+            width (float): width of the rectangle (pixel)
+            height (float): height of the rectangle (pixel)
+
+        Returns:
+            np.ndarray: ids of the chunks
+        """
+        return np.flatnonzero(
+            (self.right >= left)
+            & (self.left <= left + width)
+            & (self.top >= bottom)
+            & (self.bottom <= bottom + height)
+        )
+
+    def add(self, sprite: arcade.Sprite, tile_id: int) -> None:
+        """Adds a sprite to the chunk of its tile.
+
+        Args:
+            sprite (arcade.Sprite): sprite to add
+            tile_id (int): id of the tile of the sprite
+        """
+        chunk = self.chunk_of(tile_id)
+        try:
+            sprite_list = self._lists[chunk]
+        except KeyError:
+            sprite_list = arcade.SpriteList(use_spatial_hash=False)
+            self._lists[chunk] = sprite_list
+        sprite_list.append(sprite)
+        self.dirty.add(chunk)
+
+    def remove(self, sprite: arcade.Sprite, tile_id: int) -> None:
+        """Removes a sprite from the chunk of its tile.
+
+        The chunk is no longer populated, so missing sprites are created
+        again once it is on screen.
+
+        Args:
+            sprite (arcade.Sprite): sprite to remove
+            tile_id (int): id of the tile of the sprite
+        """
+        chunk = self.chunk_of(tile_id)
+        self._lists[chunk].remove(sprite)
+        self.populated.discard(chunk)
+        self.dirty.add(chunk)
+
+    def clear(self, chunk: int) -> None:
+        """Drops all sprites of a chunk and its texture.
+
+        Args:
+            chunk (int): id of the chunk
+        """
+        self._lists.pop(chunk, None)
+        self.populated.discard(chunk)
+        self.dirty.discard(chunk)
+        self._cache.pop(chunk, None)
+
+    def mark_dirty(self, tile_id: int) -> None:
+        """Renders the chunk of a tile again before it is drawn next.
+
+        Has to be called when a sprite of the chunk changes its look.
+
+        Args:
+            tile_id (int): id of a tile of the chunk
+        """
+        self.dirty.add(self.chunk_of(tile_id))
+
+    def _cached_chunk(
+        self, chunk: int, sprite_list: arcade.SpriteList
+    ) -> _CachedChunk:
+        """Returns the up to date texture of a chunk.
+
+        Args:
+            chunk (int): id of the chunk
+            sprite_list (arcade.SpriteList): sprites of the chunk
+
+        Returns:
+            _CachedChunk: texture of the chunk
+        """
+        ctx: arcade.ArcadeContext = self._ctx  # type: ignore
+        try:
+            cached = self._cache[chunk]
+        except KeyError:
+            cached = _CachedChunk(
+                ctx=ctx,
+                left=float(self.left[chunk]),
+                bottom=float(self.bottom[chunk]),
+                right=float(self.right[chunk]),
+                top=float(self.top[chunk]),
+            )
+            self._cache[chunk] = cached
+            if len(self._cache) > self.cache_size:
+                # Dropping the last reference frees the texture and the
+                # framebuffer right away, arcade deletes them when they are
+                # garbage collected. Deleting them here as well would
+                # delete their ids a second time, by then maybe in use by
+                # another texture.
+                self._cache.popitem(last=False)
+            cached.render(ctx=ctx, sprite_list=sprite_list)
+            self.dirty.discard(chunk)
+        else:
+            self._cache.move_to_end(chunk)
+            if chunk in self.dirty:
+                cached.render(ctx=ctx, sprite_list=sprite_list)
+                self.dirty.discard(chunk)
+        return cached
+
+    def draw(
+        self, left: float, bottom: float, width: float, height: float
+    ) -> None:
+        """Draws the chunks intersecting the viewport.
+
+        Args:
+            left (float): left border of the viewport (pixel)
+            bottom (float): bottom border of the viewport (pixel)
+            width (float): width of the viewport (pixel)
+            height (float): height of the viewport (pixel)
+        """
+        lists = self._lists
+        chunks = self.chunks_in_rect(
+            left=left, bottom=bottom, width=width, height=height
+        ).tolist()
+        if self.cache_size == 0:
+            for chunk in chunks:
+                sprite_list = lists.get(chunk)
+                if sprite_list is not None:
+                    sprite_list.draw()
+            return
+        if self._ctx is None:
+            self._ctx = arcade.get_window().ctx
+            self._program = self._ctx.program(
+                vertex_shader=_vertex_shader,
+                fragment_shader=_fragment_shader,
+            )
+        ctx = self._ctx
+        blend_func = ctx.blend_func
+        ctx.enable(ctx.BLEND)
+        cached_chunks = 0
+        for chunk in chunks:
+            sprite_list = lists.get(chunk)
+            if sprite_list is None:
+                continue
+            if cached_chunks == self.cache_size:
+                sprite_list.draw()
+                continue
+            cached_chunks += 1
+            cached = self._cached_chunk(chunk, sprite_list)
+            # Drawing sprites sets the blend function, so it is set again
+            # for every texture
+            ctx.blend_func = ctx.ONE, ctx.ONE_MINUS_SRC_ALPHA
+            cached.texture.use(0)
+            cached.quad.render(self._program)
+        ctx.blend_func = blend_func
+
+    def __len__(self) -> int:
+        """Returns the number of sprites.
+
+        Returns:
+            int: Number of sprites
+        """
+        return sum(
+            len(sprite_list) for sprite_list in self._lists.values()
+        )
+
+    def __iter__(self) -> Iterator[arcade.Sprite]:
+        """Return an iterable object of all sprites."""
+        return chain.from_iterable(self._lists.values())
@@ -1,41 +1,95 @@
+from typing import TYPE_CHECKING
+
 import arcade  # type: ignore
-import numpy as np  # type: ignore
 
 import space4x.constants
 import space4x.resources
 
+if TYPE_CHECKING:
+    from space4x.star_field import StarField
+
 
 class Star(arcade.Sprite):
-    """A basic star class."""
+    """A basic star class.
+
+    The simulated state of a star lives in the columns of its StarField,
+    the star only reads and writes its own row.
+    """
 
-    def __init__(self, center_x: int, center_y: int) -> None:
-        """Creates a star at a given (pixel) position.
+    def __init__(self, star_field: "StarField", index: int) -> None:
+        """Creates the sprite of a star of a star field.
+
+        The star is placed at the center of its hex tile.
 
         Args:
-            center_x (int): pixel position x
-            center_y (int): pixel position y
+            star_field (StarField): star field holding the state
+            index (int): row of the star in the columns of the star field
         """
         super().__init__(
             filename=space4x.resources.star_img,
             scale=space4x.constants.star_img_scale,
         )
-        self.center_x = center_x
-        self.center_y = center_y
+        self.star_field = star_field
+        self.index = index
+        tile_id = int(star_field.tile_ids[index])
+        self.tile_id = tile_id
+        self.center_x = float(star_field.hex_grid.core.center_x[tile_id])
+        self.center_y = float(star_field.hex_grid.core.center_y[tile_id])
+
+    @property
+    def name(self) -> str:
+        """Name of the star."""
+        return self.star_field.names[self.index].decode("ascii")
 
-        self.name: str = "".join(
-            [chr(i) for i in np.random.randint(65, 91, 5)]
+    def get_resource(self, resource_type: str) -> int:
+        """Returns the amount of a resource left on the star.
+
+        Args:
+            resource_type (str): one of constants.star_resource_types
+
+        Returns:
+            int: amount of the resource
+        """
+        return int(
+            self.star_field.resources[
+                self.index, self.star_field.resource_index[resource_type]
+            ]
         )
-        self.amount_iron_ore: int = np.random.randint(0, 1e4)
-        self.amount_bio_mass: int = np.random.randint(0, 1e4)
-
-        self.timer: float = 0
-
-    def update(self, delta_time: float = 1 / 60) -> None:
-        if not self.timer >= 1:
-            self.timer += delta_time
-            return
-        if self.amount_iron_ore > 0:
-            self.amount_iron_ore -= 1
-        if self.amount_bio_mass > 0:
-            self.amount_bio_mass -= 1
-        self.timer = 0
+
+    def set_resource(self, resource_type: str, amount: int) -> None:
+        """Sets the amount of a resource left on the star.
+
+        Args:
+            resource_type (str): one of constants.star_resource_types
+            amount (int): amount of the resource
+        """
+        self.star_field.resources[
+            self.index, self.star_field.resource_index[resource_type]
+        ] = amount
+
+    @property
+    def amount_iron_ore(self) -> int:
+        """Amount of iron ore left on the star."""
+        return self.get_resource("iron_ore")
+
+    @amount_iron_ore.setter
+    def amount_iron_ore(self, amount: int) -> None:
+        self.set_resource("iron_ore", amount)
+
+    @property
+    def amount_bio_mass(self) -> int:
+        """Amount of biomass left on the star."""
+        return self.get_resource("bio_mass")
+
+    @amount_bio_mass.setter
+    def amount_bio_mass(self, amount: int) -> None:
+        self.set_resource("bio_mass", amount)
+
+    @property
+    def timer(self) -> float:
+        """Time since the resources were last mined."""
+        return float(self.star_field.timer[self.index])
+
+    @timer.setter
+    def timer(self, timer: float) -> None:
+        self.star_field.timer[self.index] = timer
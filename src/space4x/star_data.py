@@ -0,0 +1,66 @@
+from typing import Tuple
+
+import numpy as np  # type: ignore
+
+
+def generate_stars(
+    rng: np.random.Generator,
+    number_of_tiles: int,
+    number_of_stars: int,
+    number_of_resource_types: int,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Draws the positions, names and resources of stars at once.
+
+    Args:
+        rng (np.random.Generator): random generator to draw from
+        number_of_tiles (int): number of tiles to place the stars on
+        number_of_stars (int): number of stars
+        number_of_resource_types (int): number of resource columns
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray]: distinct tile ids, names
+                                                   (five capital letters)
+                                                   and resource amounts
+    """
+    tile_ids = rng.choice(
+        number_of_tiles, size=number_of_stars, replace=False
+    ).astype(np.int32)
+    names = (
+        rng.integers(65, 91, size=(number_of_stars, 5), dtype=np.uint8)
+        .view("S5")
+        .ravel()
+    )
+    resources = rng.integers(
+        0,
+        1e4,
+        size=(number_of_stars, number_of_resource_types),
+        dtype=np.int64,
+    )
+    return tile_ids, names, resources
+
+
+def mine_stars(
+    timer: np.ndarray, resources: np.ndarray, delta_time: float
+) -> int:
+    """Advances the timers of stars and mines the ones that are due.
+
+    Once a second a star is mined: one unit of every resource left is
+    removed and its timer starts over. The arrays are changed in place.
+
+    Args:
+        timer (np.ndarray): time since each star was last mined
+        resources (np.ndarray): resource amounts, one row per star
+        delta_time (float): Time elapsed since last call
+
+    Returns:
+        int: Number of resource units removed
+    """
+    mined = np.flatnonzero(timer >= 1)
+    timer += delta_time
+    timer[mined] = 0
+    if mined.size == 0:
+        return 0
+    mined_resources = resources[mined]
+    left = mined_resources > 0
+    resources[mined] = mined_resources - left
+    return int(left.sum())
@@ -1,54 +1,191 @@
-from typing import Iterator, Set
+from typing import Dict, Iterator, Union
 
-import arcade  # type: ignore
 import numpy as np  # type: ignore
 
 import space4x.constants
 import space4x.resources
-from space4x.hex_grid import HexGrid, HexTile
+from space4x.hex_grid import HexGrid
+from space4x.sprite_chunks import SpriteChunks
 from space4x.star import Star
+from space4x.star_data import generate_stars
 
 
-class StarField(arcade.SpriteList):
-    """A star field consisting of multiple stars."""
+class StarField:
+    """A star field consisting of multiple stars.
 
-    def __init__(self, hex_grid: HexGrid) -> None:
+    The state of all stars is kept in NumPy columns, indexed by the id of
+    a star. In the game these are the columns of the Simulation, which
+    mines all stars at once. Star sprites are only created when a star is
+    accessed or becomes visible, and are kept in chunks, so only the ones
+    on screen are drawn.
+    """
+
+    def __init__(
+        self,
+        hex_grid: HexGrid,
+        seed: Union[None, int] = None,
+        columns: Union[None, Dict[str, np.ndarray]] = None,
+    ) -> None:
         """Creates a star field on a given hex field.
 
         Args:
             hex_grid (HexGrid): Hex grid of the game
+            seed (Union[None, int], optional): Seed of the random
+                generator, the same seed creates the same star field.
+                Defaults to None, which creates a different one each time.
+            columns (Union[None, Dict[str, np.ndarray]], optional): Columns
+                of existing stars ("tile_ids", "names", "timer" and
+                "resources"), e.g. of the Simulation of the game, whose
+                star ids are already stored in the grid. Defaults to None,
+                which creates new stars.
         """
-        super().__init__()
         self.hex_grid = hex_grid
-        self._create_stars()
+        self.seed = seed
+        # Column of every resource type in the resources array
+        self.resource_index: Dict[str, int] = {
+            resource_type: index
+            for index, resource_type in enumerate(
+                space4x.constants.star_resource_types
+            )
+        }
+        self.tile_ids = np.zeros(0, dtype=np.int32)
+        self.names = np.zeros(0, dtype="S5")
+        self.timer = np.zeros(0, dtype=np.float64)
+        self.resources = np.zeros(
+            (0, len(self.resource_index)), dtype=np.int64
+        )
+        self._stars: Dict[int, Star] = dict()
+        self.sprites = SpriteChunks(hex_grid.core)
+        if columns is None:
+            self._create_stars()
+        else:
+            self.tile_ids = columns["tile_ids"]
+            self.names = columns["names"]
+            self.timer = columns["timer"]
+            self.resources = columns["resources"]
+            self.hex_grid.star_lookup = self.get_star
 
     def _create_stars(self) -> None:
-        """Initializes stars at random positions (hex tiles)."""
-        number_of_hexes = len(self.hex_grid)
+        """Initializes stars at random positions (hex tiles).
+
+        The positions, names and resources of all stars are drawn at once.
+        """
+        rng = np.random.default_rng(self.seed)
+        number_of_hexes = self.hex_grid.core.size
         number_of_stars = int(
             space4x.constants.star_to_hex_ratio * number_of_hexes
         )
-        hex_ids: Set[int] = set()
-        while len(hex_ids) < number_of_stars:
-            if (
-                hex_id := np.random.randint(
-                    low=0, high=number_of_hexes - 1
-                )
-            ) not in hex_ids:
-                hex_ids.add(hex_id)
-        for hex_id in hex_ids:
-            hex_tile: HexTile = self.hex_grid[hex_id]
-            center_x = hex_tile.center_x
-            center_y = hex_tile.center_y
-            new_star = Star(center_x=center_x, center_y=center_y)
-            self.append(new_star)
-            hex_tile.set_star(star=new_star)
+        self.tile_ids, self.names, self.resources = generate_stars(
+            rng=rng,
+            number_of_tiles=number_of_hexes,
+            number_of_stars=number_of_stars,
+            number_of_resource_types=len(self.resource_index),
+        )
+        self.timer = np.zeros(number_of_stars, dtype=np.float64)
+        self.hex_grid.core.set_stars(
+            tile_ids=self.tile_ids,
+            star_ids=np.arange(number_of_stars, dtype=np.int32),
+        )
+        self.hex_grid.star_lookup = self.get_star
+
+    @property
+    def number_of_stars(self) -> int:
+        """Number of stars, including the ones without a sprite so far.
+
+        Returns:
+            int: Number of stars
+        """
+        return len(self.tile_ids)
+
+    def get_star(self, star_id: int) -> Star:
+        """Returns the Star for a given star id.
+
+        The Star is created and appended to the star field on first access.
+
+        Args:
+            star_id (int): id of the star
+
+        Returns:
+            Star: Star with that id
+        """
+        try:
+            return self._stars[star_id]
+        except KeyError:
+            new_star = Star(star_field=self, index=star_id)
+            self._stars[star_id] = new_star
+            self.sprites.add(new_star, int(self.tile_ids[star_id]))
+            return new_star
+
+    def replace_stars(
+        self, removed_star_ids: np.ndarray, added_tile_ids: np.ndarray
+    ) -> None:
+        """Updates the Stars after stars were streamed onto the grid.
+
+        The Stars of removed stars are dropped, their ids may be reused by
+        added stars. The chunks of added stars are populated again once
+        they are on screen.
+
+        Args:
+            removed_star_ids (np.ndarray): ids of the removed stars
+            added_tile_ids (np.ndarray): tiles of the added stars
+        """
+        for star_id in removed_star_ids.tolist():
+            star = self._stars.pop(star_id, None)
+            if star is not None:
+                self.sprites.remove(star, star.tile_id)
+        for tile_id in added_tile_ids.tolist():
+            self.sprites.populated.discard(self.sprites.chunk_of(tile_id))
+
+    def create_stars_in_rect(
+        self, left: float, bottom: float, width: float, height: float
+    ) -> None:
+        """Makes sure all Stars inside a rectangle exist.
+
+        The stars are created for whole chunks, so a chunk is only checked
+        once.
+
+        Args:
+            left (float): left border (pixel)
+            bottom (float): bottom border (pixel)
+            width (float): width of the rectangle (pixel)
+            height (float): height of the rectangle (pixel)
+        """
+        sprites = self.sprites
+        star_id_column = self.hex_grid.core.star_id
+        for chunk in sprites.chunks_in_rect(
+            left=left, bottom=bottom, width=width, height=height
+        ).tolist():
+            if chunk in sprites.populated:
+                continue
+            star_ids = star_id_column[sprites.tile_ids(chunk)]
+            for star_id in star_ids[star_ids >= 0].tolist():
+                if star_id not in self._stars:
+                    self.get_star(star_id)
+            sprites.populated.add(chunk)
+
+    def draw(
+        self, left: float, bottom: float, width: float, height: float
+    ) -> None:
+        """Draws the Stars of the chunks inside the viewport.
+
+        Args:
+            left (float): left border of the viewport (pixel)
+            bottom (float): bottom border of the viewport (pixel)
+            width (float): width of the viewport (pixel)
+            height (float): height of the viewport (pixel)
+        """
+        self.sprites.draw(
+            left=left, bottom=bottom, width=width, height=height
+        )
+
+    def __len__(self) -> int:
+        """Returns the number of Stars created so far.
+
+        Returns:
+            int: Number of Stars
+        """
+        return len(self._stars)
 
     def __iter__(self) -> Iterator[Star]:
         """Return an iterable object of sprites."""
-        return iter(self.sprite_list)
-
-    def update(self, delta_time: float = 1 / 60) -> None:
-        """Updates every star in the star field."""
-        for star in self.sprite_list:
-            star.update(delta_time=delta_time)
+        return iter(self.sprites)
@@ -0,0 +1,53 @@
+from typing import List
+
+import numpy as np  # type: ignore
+
+from space4x.hex_grid_core import HexGridCore
+
+# Whole numbers keep the sums of the costs exact, so the costs of paths
+# found by different searches can be compared with ==
+MOVE_COSTS = (1.0, 2.0, 3.0, 5.0)
+
+
+def weighted_grid(
+    dim_x: int, dim_y: int, seed: int, star_ratio: float = 0.0
+) -> HexGridCore:
+    """Creates a grid with random movement costs and random stars.
+
+    Args:
+        dim_x (int): number of columns
+        dim_y (int): number of rows
+        seed (int): seed of the costs and stars
+        star_ratio (float, optional): Share of the tiles with a star.
+                                      Defaults to 0.0.
+
+    Returns:
+        HexGridCore: grid
+    """
+    core = HexGridCore(dim_x=dim_x, dim_y=dim_y)
+    generator = np.random.default_rng(seed)
+    stars = np.flatnonzero(generator.random(core.size) < star_ratio)
+    core.set_stars(
+        tile_ids=stars, star_ids=np.arange(stars.size, dtype=np.int32)
+    )
+    core.set_move_cost(
+        tile_ids=np.arange(core.size),
+        costs=generator.choice(MOVE_COSTS, size=core.size),
+    )
+    return core
+
+
+def path_cost(core: HexGridCore, path: List[int]) -> float:
+    """Checks that a path is walkable and returns its cost.
+
+    Args:
+        core (HexGridCore): grid
+        path (List[int]): tile ids from start to end
+
+    Returns:
+        float: sum of the movement costs of the tiles moved onto
+    """
+    for source, target in zip(path, path[1:]):
+        assert target in core.neighbor_ids(source)
+        assert core.passable[target]
+    return float(core.move_cost[path[1:]].sum())
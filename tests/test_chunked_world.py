@@ -0,0 +1,70 @@
+import numpy as np  # type: ignore
+
+from space4x.chunked_world import ChunkedWorld
+
+
+def test_chunks_do_not_depend_on_the_order_of_generation() -> None:
+    first = ChunkedWorld(seed=7, chunk_size=16)
+    second = ChunkedWorld(seed=7, chunk_size=16)
+    first.get_chunk(3, -2)
+    first.get_chunk(-5, 4)
+    second.get_chunk(-5, 4)
+    second.get_chunk(3, -2)
+    for key in ((3, -2), (-5, 4)):
+        np.testing.assert_array_equal(
+            first.get_chunk(*key).star_tiles,
+            second.get_chunk(*key).star_tiles,
+        )
+        np.testing.assert_array_equal(
+            first.get_chunk(*key).resources,
+            second.get_chunk(*key).resources,
+        )
+
+
+def test_stream_evicts_chunks_far_from_every_position() -> None:
+    world = ChunkedWorld(seed=1, chunk_size=16, max_chunks=64)
+    world.stream([(0, 0)], radius=16)
+    assert world.chunk_of(0, 0) in {(c.chunk_x, c.chunk_y) for c in world}
+    world.stream([(1000, 1000)], radius=16)
+    for chunk in world:
+        assert world.distance((chunk.chunk_x, chunk.chunk_y)) <= 16
+
+
+def test_limit_evicts_the_farthest_chunk_first() -> None:
+    world = ChunkedWorld(seed=1, chunk_size=16, max_chunks=9)
+    world.stream([(8, 8)], radius=16)
+    assert len(world) == 9
+    # Loading a far chunk drops the one farthest from the position
+    world.get_chunk(10, 0)
+    keys = {(chunk.chunk_x, chunk.chunk_y) for chunk in world}
+    assert len(keys) == 9
+    assert (10, 0) in keys
+
+
+def test_only_changed_chunks_are_spilled(tmp_path: object) -> None:
+    world = ChunkedWorld(
+        seed=1, chunk_size=16, max_chunks=4, spill_dir=str(tmp_path)
+    )
+    world.stream([(0, 0)], radius=8)
+    # Timers advance, but nothing is mined yet
+    world.update(delta_time=0.5)
+    assert not any(chunk.dirty for chunk in world)
+    world.stream([(1000, 1000)], radius=8)
+    assert world.chunks_spilled == 0
+
+    world.stream([(0, 0)], radius=8)
+    for _ in range(3):
+        world.update(delta_time=0.6)
+    mined = {
+        (chunk.chunk_x, chunk.chunk_y): chunk.resources.copy()
+        for chunk in world
+        if chunk.dirty
+    }
+    assert len(mined) > 0
+    world.stream([(1000, 1000)], radius=8)
+    assert world.chunks_spilled == len(mined)
+    world.stream([(0, 0)], radius=8)
+    for key, resources in mined.items():
+        np.testing.assert_array_equal(
+            world.get_chunk(*key).resources, resources
+        )
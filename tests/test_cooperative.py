@@ -0,0 +1,85 @@
+from typing import List, Tuple
+
+import numpy as np  # type: ignore
+
+from space4x.cooperative import CooperativePlanner
+from space4x.hex_grid_core import HexGridCore
+from space4x.search_engine import SearchEngine
+
+
+def _position(path: List[int], start: int, tick: int) -> int:
+    # Ships stop on their last tile, ships without a path stay put
+    if not path:
+        return start
+    return path[min(tick, len(path) - 1)]
+
+
+def _plan(
+    core: HexGridCore, pairs: List[Tuple[int, int]], horizon: int
+) -> List[List[int]]:
+    planner = CooperativePlanner(SearchEngine(core), horizon=horizon)
+    paths = planner.plan_all(pairs)
+    for (start, goal), path in zip(pairs, paths):
+        assert path[0] == start and path[-1] == goal
+        for source, target in zip(path, path[1:]):
+            assert target == source or target in core.neighbor_ids(source)
+            assert core.passable[target]
+    for tick in range(horizon):
+        here = [
+            _position(path, start, tick)
+            for path, (start, _) in zip(paths, pairs)
+        ]
+        there = [
+            _position(path, start, tick + 1)
+            for path, (start, _) in zip(paths, pairs)
+        ]
+        # No two ships on one tile, and no two ships swapping tiles
+        assert len(set(there)) == len(there)
+        moves = {
+            (source, target)
+            for source, target in zip(here, there)
+            if source != target
+        }
+        assert not any(
+            (target, source) in moves for source, target in moves
+        )
+    return paths
+
+
+def test_ships_crossing_a_gap_do_not_collide() -> None:
+    core = HexGridCore(dim_x=12, dim_y=10)
+    # A wall across the grid with a gap of two tiles in the middle
+    wall = core.tile_ids_from_offset(
+        x=np.zeros(core.dim_y - 2, dtype=np.int64),
+        y=np.array(
+            [y for y in range(core.min_y, -core.min_y) if y not in (0, 1)]
+        ),
+    )
+    core.set_stars(tile_ids=wall, star_ids=np.arange(wall.size))
+    left = core.min_x + 1
+    right = core.min_x + core.dim_x - 2
+    pairs = []
+    for y in range(core.min_y + 1, -core.min_y - 1, 2):
+        pairs.append(
+            (
+                core.tile_id_from_offset(x=left, y=y),
+                core.tile_id_from_offset(x=right, y=-y),
+            )
+        )
+        pairs.append(
+            (
+                core.tile_id_from_offset(x=right, y=y),
+                core.tile_id_from_offset(x=left, y=-y),
+            )
+        )
+    paths = _plan(core, pairs, horizon=48)
+    # Somebody had to wait for the gap
+    assert any(len(set(path)) < len(path) for path in paths)
+
+
+def test_ships_swapping_places_do_not_collide() -> None:
+    core = HexGridCore(dim_x=8, dim_y=8)
+    generator = np.random.default_rng(11)
+    tiles = generator.choice(core.size, size=12, replace=False).tolist()
+    pairs = list(zip(tiles, tiles[::-1]))
+    _plan(core, pairs, horizon=32)
@@ -0,0 +1,158 @@
+import numpy as np  # type: ignore
+
+from space4x.hex_grid_core import HexGridCore
+
+
+def test_offset_lookups_invert_the_tile_coordinates() -> None:
+    core = HexGridCore(dim_x=7, dim_y=6)
+    tile_ids = np.arange(core.size, dtype=np.int32)
+    for tile_id in tile_ids.tolist():
+        assert (
+            core.tile_id_from_offset(
+                x=int(core.offset_x[tile_id]),
+                y=int(core.offset_y[tile_id]),
+            )
+            == tile_id
+        )
+    np.testing.assert_array_equal(
+        core.tile_ids_from_offset(x=core.offset_x, y=core.offset_y),
+        tile_ids,
+    )
+
+
+def test_cube_lookups_invert_the_tile_coordinates() -> None:
+    core = HexGridCore(dim_x=7, dim_y=6)
+    tile_ids = np.arange(core.size, dtype=np.int32)
+    np.testing.assert_array_equal(
+        core.cube_x + core.cube_y + core.cube_z, 0
+    )
+    for tile_id in tile_ids.tolist():
+        assert (
+            core.tile_id_from_cube(
+                x=int(core.cube_x[tile_id]),
+                y=int(core.cube_y[tile_id]),
+                z=int(core.cube_z[tile_id]),
+            )
+            == tile_id
+        )
+    np.testing.assert_array_equal(
+        core.tile_ids_from_cube(
+            x=core.cube_x, y=core.cube_y, z=core.cube_z
+        ),
+        tile_ids,
+    )
+
+
+def test_lookups_outside_the_grid_return_minus_one() -> None:
+    core = HexGridCore(dim_x=7, dim_y=6)
+    max_x = core.min_x + core.dim_x - 1
+    max_y = core.min_y + core.dim_y - 1
+    outside_x = [core.min_x - 1, max_x + 1, 0, 0]
+    outside_y = [0, 0, core.min_y - 1, max_y + 1]
+    for x, y in zip(outside_x, outside_y):
+        assert core.tile_id_from_offset(x=x, y=y) == -1
+    np.testing.assert_array_equal(
+        core.tile_ids_from_offset(
+            x=np.array(outside_x), y=np.array(outside_y)
+        ),
+        -1,
+    )
+    # Cube coordinates have to add up to zero
+    assert core.tile_id_from_cube(x=0, y=0, z=1) == -1
+    np.testing.assert_array_equal(
+        core.tile_ids_from_cube(
+            x=np.array([0, 1]), y=np.array([0, 0]), z=np.array([1, 0])
+        ),
+        -1,
+    )
+
+
+def test_pixel_lookups_find_the_tile_around_its_center() -> None:
+    core = HexGridCore(dim_x=7, dim_y=6)
+    tile_ids = np.arange(core.size, dtype=np.int32)
+    for tile_id in tile_ids.tolist():
+        assert (
+            core.tile_id_at_pixel(
+                x=float(core.center_x[tile_id]),
+                y=float(core.center_y[tile_id]),
+            )
+            == tile_id
+        )
+    np.testing.assert_array_equal(
+        core.tile_ids_at_pixels(x=core.center_x, y=core.center_y),
+        tile_ids,
+    )
+    # Slightly off the center still hits the same tile
+    np.testing.assert_array_equal(
+        core.tile_ids_at_pixels(
+            x=core.center_x + 0.2 * core.column_step,
+            y=core.center_y - 0.2 * core.row_step,
+        ),
+        tile_ids,
+    )
+
+
+def test_pixel_lookups_agree_off_the_grid() -> None:
+    core = HexGridCore(dim_x=7, dim_y=6)
+    generator = np.random.default_rng(3)
+    x = generator.uniform(
+        core.center_x.min() - 3 * core.column_step,
+        core.center_x.max() + 3 * core.column_step,
+        size=500,
+    )
+    y = generator.uniform(
+        core.center_y.min() - 3 * core.row_step,
+        core.center_y.max() + 3 * core.row_step,
+        size=500,
+    )
+    tile_ids = core.tile_ids_at_pixels(x=x, y=y)
+    assert (tile_ids == -1).any()
+    assert (tile_ids >= 0).any()
+    assert tile_ids.tolist() == [
+        core.tile_id_at_pixel(x=float(x_i), y=float(y_i))
+        for x_i, y_i in zip(x, y)
+    ]
+
+
+def _assert_same_partition(
+    labels: np.ndarray, expected: np.ndarray
+) -> None:
+    np.testing.assert_array_equal(labels < 0, expected < 0)
+    # Labels may be numbered differently, but must group the same tiles
+    pairs = np.unique(np.stack([labels, expected]), axis=1)
+    assert pairs.shape[1] == len(np.unique(labels))
+    assert pairs.shape[1] == len(np.unique(expected))
+
+
+def test_component_labels_stay_correct_after_adding_and_removing() -> None:
+    core = HexGridCore(dim_x=12, dim_y=10)
+    generator = np.random.default_rng(7)
+    core.components()
+    for step in range(400):
+        tile_id = int(generator.integers(core.size))
+        if core.has_star(tile_id):
+            core.remove_star(tile_id)
+        else:
+            core.set_star(tile_id=tile_id, star_id=step)
+        labels = core.components().copy()
+        # A loaded grid labels its components from scratch
+        relabeled = HexGridCore.from_snapshot(core.snapshot())
+        _assert_same_partition(labels, relabeled.components())
+    assert len(np.unique(labels[labels >= 0])) > 1
+
+
+def test_connected_follows_a_wall_being_closed_and_opened() -> None:
+    core = HexGridCore(dim_x=10, dim_y=10)
+    wall = core.tile_ids_from_offset(
+        x=np.full(core.dim_y, 0), y=np.arange(core.min_y, -core.min_y)
+    )
+    left = core.tile_id_from_offset(x=core.min_x, y=0)
+    right = core.tile_id_from_offset(x=core.min_x + core.dim_x - 1, y=0)
+    for star_id, tile_id in enumerate(wall.tolist()):
+        assert core.connected(left, right)
+        core.set_star(tile_id=tile_id, star_id=star_id)
+    assert not core.connected(left, right)
+    assert not core.connected(left, int(wall[0]))
+    core.remove_star(int(wall[3]))
+    assert core.connected(left, right)
+    assert core.connected(left, int(wall[3]))
@@ -0,0 +1,37 @@
+import numpy as np  # type: ignore
+
+from space4x.incremental_planner import IncrementalPlanner
+from space4x.search_engine import SearchEngine
+
+from tests.helpers import MOVE_COSTS, path_cost, weighted_grid
+
+
+def test_replanned_paths_cost_as_much_as_a_star() -> None:
+    for seed in range(3):
+        core = weighted_grid(dim_x=20, dim_y=16, seed=seed)
+        generator = np.random.default_rng(seed)
+        engine = SearchEngine(core)
+        start = core.tile_id_from_offset(x=core.min_x, y=0)
+        goal = core.tile_id_from_offset(x=core.min_x + core.dim_x - 1, y=0)
+        planner = IncrementalPlanner(engine, start=start, goal=goal)
+        star_id = 0
+        while planner.start != goal:
+            path = planner.path()
+            expected = engine.a_star(planner.start, goal)
+            if not expected:
+                assert path == []
+                break
+            assert path[0] == planner.start and path[-1] == goal
+            assert path_cost(core, path) == path_cost(core, expected)
+            # Block the path ahead and change the costs around it
+            for tile_id in path[2:-1]:
+                if generator.random() < 0.2:
+                    core.set_star(tile_id=tile_id, star_id=star_id)
+                    star_id += 1
+            changed = generator.choice(core.size, size=5)
+            core.set_move_cost(
+                tile_ids=changed,
+                costs=generator.choice(MOVE_COSTS, size=5),
+            )
+            planner.move_to(path[1])
+        assert star_id > 0
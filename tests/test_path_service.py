@@ -0,0 +1,103 @@
+import logging
+from concurrent.futures import Future
+from typing import List
+
+import pytest
+
+from space4x.hex_grid_core import HexGridCore
+from space4x.path_pool import PathRequest
+from space4x.path_service import PathService
+
+from tests.helpers import path_cost
+
+
+def _row(core: HexGridCore, y: int = 0) -> List[int]:
+    return [
+        core.tile_id_from_offset(x=x, y=y)
+        for x in range(core.min_x, core.min_x + core.dim_x)
+    ]
+
+
+def test_repeated_queries_are_served_from_the_cache() -> None:
+    core = HexGridCore(dim_x=10, dim_y=8)
+    service = PathService(core)
+    row = _row(core)
+    path = service.find_path("a_star", row[0], row[-1])
+    assert (service.cache_hits, service.cache_misses) == (0, 1)
+    assert path[0] == row[0] and path[-1] == row[-1]
+    assert service.find_path("a_star", row[0], row[-1]) == path
+    assert (service.cache_hits, service.cache_misses) == (1, 1)
+    # Other algorithms and other ends are separate entries
+    service.find_path("dijkstras_algorithm", row[0], row[-1])
+    service.find_path("a_star", row[0], row[-2])
+    assert (service.cache_hits, service.cache_misses) == (1, 3)
+
+
+def test_the_least_recently_used_path_is_dropped() -> None:
+    core = HexGridCore(dim_x=10, dim_y=8)
+    service = PathService(core, cache_size=2)
+    row = _row(core)
+    service.find_path("a_star", row[0], row[1])
+    service.find_path("a_star", row[0], row[2])
+    # Using the first path again makes the second the oldest
+    service.find_path("a_star", row[0], row[1])
+    service.find_path("a_star", row[0], row[3])
+    assert (service.cache_hits, service.cache_misses) == (1, 3)
+    service.find_path("a_star", row[0], row[1])
+    service.find_path("a_star", row[0], row[3])
+    assert (service.cache_hits, service.cache_misses) == (3, 3)
+    service.find_path("a_star", row[0], row[2])
+    assert (service.cache_hits, service.cache_misses) == (3, 4)
+
+
+def test_changes_to_the_grid_force_a_fresh_search() -> None:
+    core = HexGridCore(dim_x=10, dim_y=8)
+    service = PathService(core)
+    row = _row(core)
+    start, end = row[0], row[-1]
+    path = service.find_path("a_star", start, end)
+    obstacle = path[len(path) // 2]
+
+    core.set_star(tile_id=obstacle, star_id=0)
+    blocked = service.find_path("a_star", start, end)
+    assert (service.cache_hits, service.cache_misses) == (0, 2)
+    assert obstacle not in blocked
+    assert blocked[0] == start and blocked[-1] == end
+
+    core.remove_star(obstacle)
+    assert service.find_path("a_star", start, end) == path
+    assert (service.cache_hits, service.cache_misses) == (0, 3)
+
+    # Expensive tiles are avoided as well
+    core.set_move_cost(tile_ids=obstacle, costs=100.0)
+    detour = service.find_path("a_star", start, end)
+    assert (service.cache_hits, service.cache_misses) == (0, 4)
+    assert obstacle not in detour
+    assert path_cost(core, list(detour)) == path_cost(core, list(blocked))
+    assert service.find_path("a_star", start, end) == detour
+    assert (service.cache_hits, service.cache_misses) == (1, 4)
+
+
+def test_unknown_searches_are_rejected() -> None:
+    service = PathService(HexGridCore(dim_x=4, dim_y=4))
+    with pytest.raises(ValueError):
+        service.find_path("depth_first_search", 0, 1)
+
+
+def test_failed_background_searches_are_logged(
+    caplog: pytest.LogCaptureFixture,
+) -> None:
+    core = HexGridCore(dim_x=4, dim_y=4)
+    service = PathService(core)
+    future: Future = Future()
+    future.set_exception(RuntimeError("worker failed"))
+    request = PathRequest(
+        algorithm="a_star",
+        start=0,
+        end=1,
+        version=core.version,
+        future=future,
+    )
+    with caplog.at_level(logging.ERROR, logger="space4x.path_service"):
+        assert service.collect(request) is None
+    assert "a_star search from tile 0 to 1 failed" in caplog.text
@@ -0,0 +1,83 @@
+import pathlib
+
+import numpy as np  # type: ignore
+
+from space4x.hex_grid_core import HexGridCore
+from space4x.path_trace import PathTraceRecorder, load_trace
+from space4x.search_engine import SearchEngine
+
+
+def _query(
+    recorder: PathTraceRecorder,
+    engine: SearchEngine,
+    algorithm: str,
+    start: int,
+    end: int,
+) -> None:
+    recorder.observe(engine.core)
+    path = getattr(engine, algorithm)(start, end)
+    recorder.record(
+        algorithm=algorithm,
+        start=start,
+        end=end,
+        version=engine.core.version,
+        expansions=engine.last_expansions,
+        path_length=len(path),
+        latency=0.0,
+    )
+
+
+def test_queries_replay_on_the_grid_they_ran_on(
+    tmp_path: pathlib.Path,
+) -> None:
+    core = HexGridCore(dim_x=20, dim_y=20)
+    engine = SearchEngine(core)
+    recorder = PathTraceRecorder()
+    start = core.tile_id_from_offset(x=core.min_x, y=core.min_y + 19)
+    end = core.tile_id_from_offset(x=core.min_x + 19, y=core.min_y + 19)
+    _query(recorder, engine, "a_star", start, end)
+    # A wall with a gap at the top makes the same query longer
+    wall = core.tile_ids_from_offset(
+        x=np.full(19, core.min_x + 10),
+        y=np.arange(core.min_y + 1, core.min_y + 20),
+    )
+    core.set_stars(tile_ids=wall, star_ids=np.arange(19, dtype=np.int32))
+    _query(recorder, engine, "a_star", start, end)
+    core.set_move_cost(tile_ids=start + 1, costs=5.0)
+    _query(recorder, engine, "a_star", start, end)
+    path = str(tmp_path / "paths.trace")
+    recorder.save(path=path, core=core)
+
+    replayed, algorithms, queries, deltas = load_trace(path)
+    assert algorithms == ["a_star"]
+    assert len(deltas) == 2
+    replay = SearchEngine(replayed)
+    lengths = []
+    for version in queries["version"].tolist():
+        for delta in deltas:
+            if replayed.version < delta.version <= version:
+                replayed.apply_delta(delta)
+        lengths.append(len(replay.a_star(start, end)))
+    assert lengths == queries["path_length"].tolist()
+    assert lengths[0] < lengths[1]
+    np.testing.assert_array_equal(replayed.passable, core.passable)
+    np.testing.assert_array_equal(replayed.move_cost, core.move_cost)
+
+
+def test_clear_drops_algorithms_and_grid(tmp_path: pathlib.Path) -> None:
+    core = HexGridCore(dim_x=8, dim_y=8)
+    engine = SearchEngine(core)
+    recorder = PathTraceRecorder()
+    _query(recorder, engine, "a_star", 0, 20)
+    core.set_star(tile_id=10, star_id=0)
+    recorder.clear()
+    _query(recorder, engine, "breadth_first_search", 0, 20)
+    path = str(tmp_path / "paths.trace")
+    recorder.save(path=path, core=core)
+
+    replayed, algorithms, queries, deltas = load_trace(path)
+    assert len(recorder) == 1
+    assert algorithms == ["breadth_first_search"]
+    assert queries["algorithm"].tolist() == [0]
+    assert deltas == []
+    assert not replayed.passable[10]
@@ -0,0 +1,92 @@
+import os
+import pathlib
+from typing import Dict
+
+import numpy as np  # type: ignore
+
+import pytest
+
+import space4x.constants
+from space4x.save_format import read_columns, write_columns
+
+
+def _columns(seed: int) -> Dict[str, np.ndarray]:
+    generator = np.random.default_rng(seed)
+    return {
+        "tiles": generator.integers(0, 1000, size=5000, dtype=np.int32),
+        "cost": generator.random(5000, dtype=np.float32),
+        "empty": np.zeros(0, dtype=np.int64),
+    }
+
+
+def test_columns_round_trip(tmp_path: pathlib.Path) -> None:
+    path = str(tmp_path / "game.s4x")
+    columns = _columns(seed=1)
+    write_columns(path, meta={"seed": 1}, columns=columns)
+    meta, loaded = read_columns(path)
+    assert meta == {"seed": 1}
+    for name, column in columns.items():
+        np.testing.assert_array_equal(loaded[name], column)
+        assert loaded[name].dtype == column.dtype
+
+
+def test_saving_over_a_loaded_file_keeps_its_columns(
+    tmp_path: pathlib.Path,
+) -> None:
+    path = str(tmp_path / "game.s4x")
+    write_columns(path, meta={}, columns=_columns(seed=1))
+    _, loaded = read_columns(path)
+    # Saving the mapped columns over their own file must neither crash nor
+    # change them
+    write_columns(path, meta={"saved": 2}, columns=loaded)
+    np.testing.assert_array_equal(loaded["tiles"], _columns(1)["tiles"])
+    write_columns(path, meta={"saved": 3}, columns=_columns(seed=2))
+    np.testing.assert_array_equal(loaded["cost"], _columns(1)["cost"])
+    meta, reloaded = read_columns(path)
+    assert meta == {"saved": 3}
+    np.testing.assert_array_equal(reloaded["tiles"], _columns(2)["tiles"])
+    assert os.listdir(str(tmp_path)) == ["game.s4x"]
+
+
+def test_save_game_round_trip_over_a_loaded_file(
+    tmp_path: pathlib.Path,
+) -> None:
+    pytest.importorskip("arcade")
+    from space4x.hex_grid import HexGrid
+    from space4x.save_game import load_game, save_game
+    from space4x.simulation import Simulation
+    from space4x.spaceship import Spaceship
+    from space4x.star_field import StarField
+
+    path = str(tmp_path / "game.s4x")
+    simulation = Simulation(dim_x=24, dim_y=20, seed=5)
+    hex_grid = HexGrid(core=simulation.core)
+    star_field = StarField(
+        hex_grid=hex_grid, seed=5, columns=simulation.star_columns
+    )
+    start = hex_grid.core.tile_id_from_offset(x=3, y=4)
+    ship = Spaceship(
+        hex_grid=hex_grid,
+        simulation=simulation,
+        ship=simulation.add_ship(start),
+    )
+    ship.set_path([hex_grid.get_Tile_by_id(tile_id) for tile_id in (5, 6)])
+    save_game(path, simulation, [ship])
+
+    loaded, _, _, loaded_ships = load_game(path)
+    save_game(path, loaded, loaded_ships)
+    loaded, grid, stars, ships = load_game(path)
+
+    np.testing.assert_array_equal(grid.core.star_id, hex_grid.core.star_id)
+    np.testing.assert_array_equal(
+        grid.core.move_cost, hex_grid.core.move_cost
+    )
+    np.testing.assert_array_equal(stars.names, star_field.names)
+    assert ships[0].offset_coordinate.x == 3
+    assert ships[0].offset_coordinate.y == 4
+    assert [tile.tile_id for tile in ships[0].path] == [5, 6]
+    # The loaded ship is moved by the loaded simulation
+    loaded.tick(1 / space4x.constants.space_ship_speed + 0.01)
+    ships[0].update()
+    assert ships[0].tile_id == 5
+    assert [tile.tile_id for tile in ships[0].path] == [6]
@@ -0,0 +1,97 @@
+import numpy as np  # type: ignore
+
+from space4x.hex_grid_core import HexGridCore
+from space4x.hierarchical import HierarchicalPathFinder
+from space4x.path_pool import PathPool
+from space4x.search_engine import SearchEngine
+
+from tests.helpers import path_cost, weighted_grid
+
+
+def _weighted_grid(seed: int) -> HexGridCore:
+    core = weighted_grid(dim_x=16, dim_y=14, seed=seed, star_ratio=0.2)
+    # A corner tile walled off from the rest of the grid
+    core.remove_star(0)
+    for neighbor_id in core.neighbor_ids(0):
+        core.set_star(tile_id=neighbor_id, star_id=core.size)
+    return core
+
+
+def test_every_search_returns_the_samepath_cost() -> None:
+    for seed in range(4):
+        core = _weighted_grid(seed)
+        engine = SearchEngine(core)
+        hierarchical = HierarchicalPathFinder(engine, cluster_size=4)
+        generator = np.random.default_rng(seed)
+        passable = np.flatnonzero(core.passable)
+        pairs = generator.choice(passable, size=(25, 2)).tolist()
+        for start, end in pairs + [[0, pairs[0][1]], [pairs[0][0], 0]]:
+            cost = engine.distance_field(sources=[start])[end]
+            to_end = engine.flow_field(targets=[end])
+            paths = [
+                engine.dijkstras_algorithm(start, end),
+                engine.a_star(start, end),
+                engine.bidirectional_search(start, end),
+                to_end.path(start),
+            ]
+            if not np.isfinite(cost):
+                assert not core.connected(start=start, end=end)
+                assert paths == [[], [], [], []]
+                assert hierarchical.find_path(start, end) == []
+                continue
+            for path in paths:
+                assert path[0] == start and path[-1] == end
+                assert path_cost(core, path) == cost
+            assert to_end.distance[start] == cost
+            # HPA* is only close to optimal
+            path = hierarchical.find_path(start, end)
+            assert path[0] == start and path[-1] == end
+            assert path_cost(core, path) >= cost
+
+
+def test_breadth_first_search_returns_the_fewest_moves() -> None:
+    core = _weighted_grid(seed=5)
+    engine = SearchEngine(core)
+    start = int(np.flatnonzero(core.passable)[0])
+    tile_ids, steps = engine.reachable_within(start=start, steps=core.size)
+    moves = dict(zip(tile_ids.tolist(), steps.tolist()))
+    for end in np.flatnonzero(core.passable).tolist():
+        path = engine.breadth_first_search(start, end)
+        if end not in moves:
+            assert path == []
+            continue
+        path_cost(core, path)
+        assert len(path) - 1 == moves[end]
+
+
+def test_path_pool_returns_the_same_path_costs_after_changes() -> None:
+    core = _weighted_grid(seed=6)
+    engine = SearchEngine(core)
+    generator = np.random.default_rng(6)
+    pairs = [
+        (int(start), int(end))
+        for start, end in generator.choice(
+            np.flatnonzero(core.passable), size=(20, 2)
+        )
+    ]
+    pool = PathPool(core, workers=2)
+    try:
+        for change in range(3):
+            paths = pool.search(pairs)
+            assert len(paths) == len(pairs)
+            for (start, end), path in zip(pairs, paths):
+                expected = engine.a_star(start, end)
+                if not expected:
+                    assert path == []
+                    continue
+                assert path[0] == start and path[-1] == end
+                assert path_cost(core, path) == path_cost(core, expected)
+            path, _ = pool.submit("a_star", *pairs[0]).result()
+            assert path == engine.a_star(*pairs[0])
+            # The workers have to pick up the changed tiles
+            middle = engine.a_star(*pairs[change])[1:-1]
+            if middle:
+                core.set_star(tile_id=middle[0], star_id=core.size)
+            core.set_move_cost(tile_ids=pairs[change][1], costs=4.0)
+    finally:
+        pool.close()
@@ -0,0 +1,181 @@
+import numpy as np  # type: ignore
+
+import space4x.constants
+from space4x.chunked_world import ChunkedWorld
+from space4x.hex_grid_core import HexGridCore
+from space4x.simulation import Simulation
+
+from tests.helpers import path_cost
+
+# A little longer than the time a ship needs for one hex
+MOVE_TIME = 1 / space4x.constants.space_ship_speed + 1e-3
+
+
+def _simulation() -> Simulation:
+    core = HexGridCore(dim_x=12, dim_y=10)
+    simulation = Simulation(core=core, seed=3)
+    # Clear the generated stars, the tests place their own
+    for tile_id in simulation.star_tile_ids.tolist():
+        core.remove_star(tile_id)
+    return simulation
+
+
+def test_ships_move_one_hex_per_interval() -> None:
+    simulation = _simulation()
+    core = simulation.core
+    start = core.tile_id_from_offset(x=core.min_x, y=0)
+    goal = core.tile_id_from_offset(x=core.min_x + 5, y=0)
+    ship = simulation.add_ship(start)
+    assert simulation.send_ship(ship=ship, goal=goal)
+    path = list(simulation.ship_paths[ship])
+    # The path holds the tiles still to move onto
+    assert path[0] != start and path[-1] == goal
+    assert len(path) == 5
+
+    # Not due yet
+    simulation.tick(MOVE_TIME / 2)
+    assert simulation.ship_tiles[ship] == start
+    for tile_id in path:
+        simulation.tick(MOVE_TIME)
+        assert simulation.ship_tiles[ship] == tile_id
+    assert simulation.ship_paths[ship] == []
+    assert simulation.moves == len(path)
+    simulation.tick(MOVE_TIME)
+    assert simulation.ship_tiles[ship] == goal
+
+
+def test_set_path_skips_the_tile_of_the_ship() -> None:
+    simulation = _simulation()
+    core = simulation.core
+    start = core.tile_id_from_offset(x=0, y=0)
+    ship = simulation.add_ship(start)
+    path = simulation.path_service.find_path(
+        "a_star", start, core.tile_id_from_offset(x=3, y=0)
+    )
+    simulation.set_path(ship=ship, path=path)
+    assert simulation.ship_paths[ship] == list(path[1:])
+    simulation.set_path(ship=ship, path=path[1:])
+    assert simulation.ship_paths[ship] == list(path[1:])
+
+
+def test_ships_go_around_stars_placed_on_their_path() -> None:
+    simulation = _simulation()
+    core = simulation.core
+    start = core.tile_id_from_offset(x=core.min_x, y=0)
+    goal = core.tile_id_from_offset(x=core.min_x + core.dim_x - 1, y=0)
+    ship = simulation.add_ship(start)
+    simulation.send_ship(ship=ship, goal=goal)
+    simulation.tick(MOVE_TIME)
+    blocked = simulation.ship_paths[ship][2]
+    core.set_star(tile_id=blocked, star_id=0)
+
+    visited = [simulation.ship_tiles[ship]]
+    while simulation.ship_tiles[ship] != goal:
+        simulation.tick(MOVE_TIME)
+        visited.append(simulation.ship_tiles[ship])
+        assert len(visited) < core.size
+    assert blocked not in visited
+    expected = simulation.path_service.find_path(
+        "a_star", visited[0], goal
+    )
+    assert path_cost(core, visited) == path_cost(core, list(expected))
+
+
+# Hexes streamed around a position of the streamed tests
+RADIUS = 8
+
+
+def _streamed_simulation() -> Simulation:
+    world = ChunkedWorld(seed=2, chunk_size=8, max_chunks=32)
+    return Simulation(dim_x=48, dim_y=48, seed=2, world=world)
+
+
+def _tile(simulation: Simulation, x: int, y: int) -> int:
+    # Offset coordinates counted from the corner of the grid
+    core = simulation.core
+    return core.tile_id_from_offset(x=core.min_x + x, y=core.min_y + y)
+
+
+def test_streamed_stars_follow_the_positions() -> None:
+    simulation = _streamed_simulation()
+    core = simulation.core
+    assert np.all(core.star_id < 0)
+    ship = simulation.add_ship(_tile(simulation, x=4, y=4))
+
+    first = simulation.stream(simulation.ship_tiles, radius=RADIUS)
+    assert first is not None and len(first.added_tile_ids) > 0
+    # Nothing to do until a position moves into another chunk
+    assert simulation.stream(simulation.ship_tiles, radius=RADIUS) is None
+    simulation.ship_tiles[ship] = _tile(simulation, x=44, y=44)
+    second = simulation.stream(simulation.ship_tiles, radius=RADIUS)
+    assert second is not None
+    assert len(second.removed_star_ids) > 0
+    assert len(second.dropped_tile_ids) > 0
+
+    # The grid and the star columns agree
+    on_grid = np.flatnonzero(simulation.star_tile_ids >= 0)
+    assert np.count_nonzero(core.star_id >= 0) == len(on_grid)
+    np.testing.assert_array_equal(
+        core.star_id[simulation.star_tile_ids[on_grid]], on_grid
+    )
+    assert not core.passable[simulation.star_tile_ids[on_grid]].any()
+    # Only the stars around the ship are left
+    assert core.star_id[second.dropped_tile_ids].max() < 0
+    assert core.star_id[_tile(simulation, x=4, y=4)] < 0
+
+
+def test_no_star_is_streamed_under_a_ship() -> None:
+    simulation = _streamed_simulation()
+    world = simulation.world
+    assert world is not None
+    chunk = world.get_chunk(0, 0)
+    star_x, star_y = chunk.star_offsets()
+    tile_id = simulation.core.tile_id_from_offset(
+        x=int(star_x[0]), y=int(star_y[0])
+    )
+    simulation.add_ship(tile_id)
+    simulation.stream(simulation.ship_tiles, radius=RADIUS)
+    assert simulation.core.star_id[tile_id] < 0
+    assert simulation.core.passable[tile_id]
+
+
+def test_mined_streamed_stars_are_written_back_to_their_chunks() -> None:
+    simulation = _streamed_simulation()
+    simulation.add_ship(_tile(simulation, x=4, y=4))
+    simulation.stream(simulation.ship_tiles, radius=RADIUS)
+    world = simulation.world
+    assert world is not None
+    before = {
+        (chunk.chunk_x, chunk.chunk_y): chunk.resources.sum()
+        for chunk in world
+    }
+    # Stars are mined on the tick after their timer passed a second
+    simulation.tick(1.5)
+    simulation.tick(0.1)
+    simulation.ship_tiles[0] = _tile(simulation, x=20, y=4)
+    simulation.stream(simulation.ship_tiles, radius=RADIUS)
+    mined = [
+        chunk
+        for chunk in world
+        if chunk.dirty
+        and chunk.resources.sum() < before[(chunk.chunk_x, chunk.chunk_y)]
+    ]
+    assert len(mined) > 0
+
+
+def test_ships_go_around_streamed_stars() -> None:
+    simulation = _streamed_simulation()
+    core = simulation.core
+    start = _tile(simulation, x=1, y=20)
+    goal = _tile(simulation, x=46, y=20)
+    ship = simulation.add_ship(start)
+    # The path is searched before the stars in front of the ship are on
+    # the grid
+    simulation.send_ship(ship=ship, goal=goal)
+    visited = [start]
+    while simulation.ship_tiles[ship] != goal:
+        simulation.stream(simulation.ship_tiles, radius=RADIUS)
+        simulation.tick(MOVE_TIME)
+        visited.append(simulation.ship_tiles[ship])
+        assert core.star_id[visited[-1]] < 0
+        assert len(visited) < core.size